@@ -0,0 +1,151 @@
+# app/article_cache.py
+
+"""
+文章详情缓存：按文章 ID 缓存与浏览者无关的部分（文章字段、计数、评论列表）
+
+- 容量按估算的内存大小限制（Markdown 正文长短差异很大，按条数限制无法控制内存），超出时按 LRU 淘汰；
+  单篇（含评论）超过 ARTICLE_CACHE_MAX_ITEM_BYTES 的文章不缓存
+- 评论列表只对登录用户返回：匿名请求未命中时只缓存文章字段，登录用户第一次访问时再补充评论
+- 写事务提交后按文章 ID 精确失效：更新 / 删除文章、修改分类、评论增删改、点赞 / 收藏；
+  其它 worker 的写入经失效事件在轮询后失效（见 app/invalidation.py），管理脚本的写入由 TTL 兜底
+- 失效与查询并发：查询前取逻辑时钟，写回时该文章在此之后被失效过则放弃写回（不会把失效前读到的旧数据写回缓存）；
+  失效记录只保留最近的一批，更早开始的查询一律不写回
+- 缓存的值只读共享，命中时不复制
+"""
+from imports import sys, time, threading, OrderedDict, Optional
+from .config import ARTICLE_CACHE_MAX_BYTES, ARTICLE_CACHE_MAX_ITEM_BYTES, ARTICLE_CACHE_TTL
+
+
+
+_OBJECT_OVERHEAD = 200         # 每个字典 / 模型实例的固定开销估算（字节）
+_MAX_INVALIDATION_RECORDS = 10000
+
+
+
+def estimate_size(fields: dict, comments: Optional[list]) -> int:
+    """估算一篇文章缓存条目占用的内存（字符串按实际大小，其余按固定开销）"""
+    size = _OBJECT_OVERHEAD + sum(sys.getsizeof(value) for value in fields.values())
+    for comment in comments or ():
+        size += _OBJECT_OVERHEAD + sys.getsizeof(comment.content) + sys.getsizeof(comment.user_name)
+    return size
+
+
+
+class CachedArticle:
+    """文章字段（dict）与评论列表（未加载时为 None）"""
+    __slots__ = ("fields", "comments", "size", "expires")
+
+    def __init__(self, fields: dict, comments: Optional[list], size: int, expires: float):
+        self.fields = fields
+        self.comments = comments
+        self.size = size
+        self.expires = expires
+
+
+
+class ArticleCache:
+    """文章 ID -> CachedArticle，按估算内存大小 LRU 淘汰，按文章 ID 失效"""
+
+    def __init__(self, max_bytes: int = ARTICLE_CACHE_MAX_BYTES, max_item_bytes: int = ARTICLE_CACHE_MAX_ITEM_BYTES,
+                 ttl: float = ARTICLE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._clock = 0                         # 每次失效加一
+        self._invalidated: OrderedDict = OrderedDict()  # 文章 ID -> 最近一次失效时的时钟
+        self._floor = 0                         # 已丢弃的失效记录中最大的时钟
+        self._stats = {
+            "hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0,
+            "stale_discarded": 0, "oversized": 0,
+        }
+
+    @property
+    def clock(self) -> int:
+        """查询前读取，写回时传给 put"""
+        return self._clock
+
+    def get(self, article_id: int) -> Optional[CachedArticle]:
+        with self._lock:
+            entry = self._entries.get(article_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.expires <= time.monotonic():
+                self._remove(article_id)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(article_id)
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, article_id: int, fields: dict, comments: Optional[list], started: int):
+        """写回查询结果；started 为查询前读取的 clock，此后该文章被失效过时放弃写回"""
+        size = estimate_size(fields, comments)
+        with self._lock:
+            if size > self.max_item_bytes:
+                self._stats["oversized"] += 1
+                return
+            if started < self._floor or self._invalidated.get(article_id, 0) > started:
+                self._stats["stale_discarded"] += 1
+                return
+            self._remove(article_id)
+            self._entries[article_id] = CachedArticle(fields, comments, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, article_id: int):
+        """文章相关的写事务提交后调用（任意线程）"""
+        with self._lock:
+            self._clock += 1
+            self._invalidated[article_id] = self._clock
+            self._invalidated.move_to_end(article_id)
+            while len(self._invalidated) > _MAX_INVALIDATION_RECORDS:
+                _, clock = self._invalidated.popitem(last=False)
+                self._floor = clock
+            if self._remove(article_id):
+                self._stats["invalidations"] += 1
+
+    def invalidate_all(self):
+        """整体失效（跨 worker 的整体失效事件），此前开始的查询一律不写回"""
+        with self._lock:
+            self._clock += 1
+            self._floor = self._clock
+            self._invalidated.clear()
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, article_id: int) -> bool:
+        entry = self._entries.pop(article_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_item_bytes": self.max_item_bytes,
+            "ttl_seconds": self.ttl,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+            **self._stats,
+        }
+
+
+
+article_cache = ArticleCache()
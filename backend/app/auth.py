@@ -2,14 +2,18 @@
 
 from imports import (
     Optional, Union, uuid,
-    CryptContext, JWTError, jwt, datetime, timedelta,
+    JWTError, jwt, datetime, timedelta,
     timezone, HTTPException, status, Depends, Request,
-    HTTPBearer, HTTPAuthorizationCredentials, logging, os, Session
+    HTTPBearer, HTTPAuthorizationCredentials, logging, os, Session,
+    AsyncSession
 )
 
-from .database import get_db
-from .models import User, TokenBlacklist
+from .database import get_read_db, run_db
+from .models import User
+from .token_blacklist import token_blacklist
+from .user_cache import user_cache
 from .utils import get_current_utc_time
+from .config import ADMIN_EMAILS
 
 
 
@@ -21,26 +25,9 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 10
 logger = logging.getLogger(__name__)
 
-# 配置密码哈希上下文
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
 
 
 # -------------------------- 令牌相关 --------------------------
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码是否匹配哈希值"""
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-
-def get_password_hash(password: str) -> str:
-    """生成密码的哈希值（无72字节限制）"""
-    if not password or password.strip() == "":
-        raise ValueError("密码不能为空，且不能全为空格")
-    return pwd_context.hash(password)
-
-
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建JWT访问令牌"""
     # 复制输入数据，避免修改原始字典
@@ -84,9 +71,9 @@ def verify_and_refresh_token(token: str, db: Session, time_tolerance: int = 120)
 
 
 
-def verify_token(token: str, db: Session) -> Union[dict, None]:
+def verify_token(token: str, db: Optional[Session] = None) -> Union[dict, None]:
     """
-    验证JWT令牌并返回payload，新增黑名单检查
+    验证JWT令牌并返回payload，新增黑名单检查（查询内存中的黑名单，不访问数据库）
     - 若令牌无效/过期/在黑名单中，返回None
     - 否则返回解码后的payload
     """
@@ -100,8 +87,7 @@ def verify_token(token: str, db: Session) -> Union[dict, None]:
             return None  # 缺少jti的令牌视为无效
         
         # 3. 检查令牌是否在黑名单中
-        blacklisted_token = db.query(TokenBlacklist).filter(TokenBlacklist.jti == jti).first()
-        if blacklisted_token:
+        if token_blacklist.contains(jti):
             return None  # 令牌已注销，返回无效
         
         # 4. 验证通过，返回payload
@@ -135,9 +121,9 @@ oauth2_scheme = HTTPBearer(auto_error=False)
 
 
 
-def get_current_user(
+async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db),
+    db: Union[AsyncSession, Session] = Depends(get_read_db),
     request: Request = None  # 添加请求对象
 ):
     """从JWT令牌获取当前用户，支持自动刷新（new_token的生产者）"""
@@ -146,7 +132,7 @@ def get_current_user(
     
     token = credentials.credentials
     
-    # 使用自动刷新功能验证令牌
+    # 令牌校验只做 JWT 解码与内存黑名单检查，直接在事件循环中执行
     result = verify_and_refresh_token(token, db)
     if result is None:
         raise HTTPException(
@@ -163,7 +149,22 @@ def get_current_user(
             detail="Invalid authentication credentials",
         )
     
-    # 从数据库获取用户
+    # 优先读取用户缓存，未命中时再查询数据库（async 模式不占用线程池）
+    user = user_cache.get(email)
+    if user is None:
+        user = await run_db(db, _load_active_user, email)
+        user_cache.put(email, user)
+    
+    # 如果需要刷新，将新令牌添加到响应头
+    if result.get("needs_refresh") and hasattr(request, "state"):
+        request.state.new_token = result["new_token"]
+    
+    return user
+
+
+
+def _load_active_user(db: Session, email: str) -> User:
+    """按邮箱查询活跃用户，不存在时返回 401"""
     user = db.query(User).filter(User.email == email, User.is_active == True).first()
     if user is None:
         raise HTTPException(
@@ -171,8 +172,18 @@ def get_current_user(
             detail="User not found or inactive",
         )
     
-    # 如果需要刷新，将新令牌添加到响应头
-    if result.get("needs_refresh") and hasattr(request, "state"):
-        request.state.new_token = result["new_token"]
-    
-    return user
\ No newline at end of file
+    return user
+
+
+
+async def get_current_admin(current_user: Optional[User] = Depends(get_current_user)) -> User:
+    """当前用户必须是管理员（邮箱在 ADMIN_EMAILS 中），用于管理接口"""
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="需要管理员权限")
+    return current_user
@@ -0,0 +1,85 @@
+# app/conditional.py
+
+"""
+条件请求（ETag / Last-Modified -> 304 Not Modified）
+
+- ETag 由行版本号（version）与修改时间（updated_at）等标识拼接后取摘要，是强校验器：
+  同一 ETag 对应逐字节相同的响应体；查询校验器只读取 id / version / updated_at，不读取正文等内容列
+- If-None-Match 优先：请求带 If-None-Match 时忽略 If-Modified-Since（RFC 9110 13.2.2），比较时忽略 W/ 前缀
+- If-Modified-Since 只用于单个资源（文章详情、某篇文章的评论列表以文章的修改时间为准）；
+  主页、分类列表等集合中的行被删除时最大修改时间不会变化，只提供 ETag
+- 响应带 Cache-Control: no-cache（可缓存，但每次使用前都要带校验器重新验证），
+  与登录用户相关的响应为 private，并声明 Vary: Authorization
+"""
+from imports import hashlib, datetime, timezone, Optional, Response, Request, format_datetime, parsedate_to_datetime
+
+
+
+def make_etag(*parts) -> str:
+    """由行版本等标识生成强 ETag（带引号）"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+
+def _as_utc(value: datetime) -> datetime:
+    """数据库读回的时间不带时区，按 UTC 处理"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+
+def validator_time(value: Optional[datetime]) -> Optional[str]:
+    """参与 ETag 计算的修改时间：统一为 UTC 的 ISO 字符串（刚写入的值带时区，从数据库读回的不带）"""
+    return _as_utc(value).isoformat() if value is not None else None
+
+
+
+def row_validator(row) -> tuple:
+    """一行的校验器：(id, 版本号, 修改时间)"""
+    return row.id, row.version, validator_time(row.updated_at)
+
+
+
+def is_conditional(request: Request) -> bool:
+    """请求是否携带校验器（未携带时不必为判断 304 单独查询）"""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """请求携带的校验器与当前资源一致时返回 True"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False  # 格式错误时按无条件请求处理
+    if since.tzinfo is None:
+        return False
+    # HTTP 日期精度为秒
+    return _as_utc(last_modified).replace(microsecond=0) <= since
+
+
+
+def validator_headers(
+    etag: str, last_modified: Optional[datetime] = None, private: bool = False, vary: Optional[str] = None
+) -> dict:
+    """200 与 304 响应共用的缓存相关响应头（vary：响应随之变化的请求头）"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache" if private else "no-cache"}
+    if vary is not None:
+        headers["Vary"] = vary
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+
+def not_modified(headers: dict) -> Response:
+    """304 响应：不带响应体，只返回校验器与缓存相关的响应头"""
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,231 @@
+# app/config.py
+
+"""运行配置：统一从环境变量读取，均提供适用于开发环境的默认值"""
+from imports import os
+
+
+
+def env_int(name: str, default: int) -> int:
+    """读取整数类型的环境变量"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+
+def env_float(name: str, default: float) -> float:
+    """读取浮点类型的环境变量"""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """读取布尔类型的环境变量（1/true/yes/on 视为开启）"""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+
+# -------------------------- 数据库 --------------------------
+# 数据库运行模式（启动时选择，便于两种模式对比压测）：
+#   - sync：同步引擎，查询在 anyio 线程池中执行（默认）
+#   - async：aiosqlite 异步引擎，查询不占用线程池
+# 在启动前运行 cmd 命令：set DATABASE_MODE=async
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+
+# SQLite 调优 profile 总开关（关闭时使用 SQLite / SQLAlchemy 默认配置）
+SQLITE_TUNING_ENABLED = env_bool("SQLITE_TUNING", True)
+
+# 每个新连接建立时执行的 PRAGMA（按顺序执行）
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),            # WAL：读写互不阻塞
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),           # WAL 下 NORMAL 已足够安全
+    "busy_timeout": env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),            # 锁等待时间（毫秒）
+    "mmap_size": env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),        # 内存映射大小（字节）
+    "cache_size": env_int("SQLITE_CACHE_SIZE", -64000),                 # 页缓存，负数单位为 KiB
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),             # 临时表/索引放在内存中
+}
+
+# 连接池大小（仅在调优 profile 开启时生效）
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = env_int("DB_POOL_TIMEOUT", 30)
+
+# 只读连接池大小（GET 路由专用，WAL 下读连接可随线程数扩展）
+DB_READ_POOL_SIZE = env_int("DB_READ_POOL_SIZE", 20)
+DB_READ_MAX_OVERFLOW = env_int("DB_READ_MAX_OVERFLOW", 40)
+
+
+
+# -------------------------- 分页 --------------------------
+PAGE_LIMIT_DEFAULT = env_int("PAGE_LIMIT_DEFAULT", 20)  # 列表接口默认每页条数
+PAGE_LIMIT_MAX = env_int("PAGE_LIMIT_MAX", 100)         # 列表接口每页条数上限
+
+
+
+# -------------------------- 主页缓存 --------------------------
+# /home 的响应（序列化好的 JSON）按 latest_limit 缓存在进程内；文章 / 分类 / 点赞 / 收藏 / 评论的写事务提交后
+# 递增版本号使缓存整体失效，失效后只有一个请求重新查询，其余请求先返回旧内容（stale-while-revalidate）
+HOME_CACHE_ENABLED = env_bool("HOME_CACHE", True)
+HOME_CACHE_TTL = env_float("HOME_CACHE_TTL", 30.0)           # 最长缓存时间（秒），也是管理脚本（或关闭 INVALIDATION_BUS 时其它 worker）写入后生效的最大延迟
+HOME_CACHE_MAX_ENTRIES = env_int("HOME_CACHE_MAX_ENTRIES", 16)  # 最多缓存的 latest_limit 取值数（LRU 淘汰）
+
+
+
+# -------------------------- 文章详情缓存 --------------------------
+# 按文章 ID 缓存与浏览者无关的部分（文章字段、计数、评论列表），相关写事务提交后按文章精确失效；
+# 当前用户的点赞 / 收藏状态每次单独查询
+ARTICLE_CACHE_ENABLED = env_bool("ARTICLE_CACHE", True)
+ARTICLE_CACHE_MAX_BYTES = env_int("ARTICLE_CACHE_MAX_BYTES", 64 * 1024 * 1024)     # 缓存总大小上限（估算的内存字节数，LRU 淘汰）
+ARTICLE_CACHE_MAX_ITEM_BYTES = env_int("ARTICLE_CACHE_MAX_ITEM_BYTES", 1024 * 1024)  # 单篇超过该大小（含评论）时不缓存
+ARTICLE_CACHE_TTL = env_float("ARTICLE_CACHE_TTL", 60.0)  # 最长缓存时间（秒），也是管理脚本（或关闭 INVALIDATION_BUS 时其它 worker）写入后生效的最大延迟
+
+
+
+# -------------------------- 跨 worker 缓存失效 --------------------------
+# 多 worker 部署时，写事务在同一事务中向 cache_invalidations 表追加失效事件，各 worker 的后台线程通过
+# PRAGMA data_version 低成本地检测数据库变化，有变化时再按 id 增量读取事件，失效本进程的主页 / 文章 / 用户缓存；
+# 不依赖外部服务，其它 worker 的缓存最多延迟约一个轮询间隔失效。关闭时只失效本进程，其它 worker 由各缓存的 TTL 兜底
+INVALIDATION_BUS_ENABLED = env_bool("INVALIDATION_BUS", True)
+INVALIDATION_POLL_MS = env_float("INVALIDATION_POLL_MS", 100.0)              # 轮询间隔（毫秒），即跨 worker 失效的最大延迟
+INVALIDATION_MAX_KEYS = env_int("INVALIDATION_MAX_KEYS", 100)                # 单次失效的键数超过该值时改为整个命名空间失效
+INVALIDATION_RETENTION_SECONDS = env_float("INVALIDATION_RETENTION_SECONDS", 600.0)  # 失效事件保留时长（秒）
+INVALIDATION_PURGE_SECONDS = env_float("INVALIDATION_PURGE_SECONDS", 300.0)  # 清理旧事件的间隔（秒）
+
+
+# -------------------------- 全文搜索 --------------------------
+# 全文索引模式（修改后启动时会自动重建索引）：
+#   - cjk：连续的中日韩字符切分为重叠二元组（bigram），中文子串查询可走索引（默认）
+#   - word：仅使用 FTS5 分词器按词切分，适合以英文为主的内容
+SEARCH_FTS_MODE = os.getenv("SEARCH_FTS_MODE", "cjk").lower()
+# FTS5 分词器（修改后启动时会自动重建索引）
+SEARCH_FTS_TOKENIZER = os.getenv("SEARCH_FTS_TOKENIZER", "unicode61 remove_diacritics 2")
+# bm25 列权重：标题 / 正文 / 作者名
+SEARCH_BM25_WEIGHTS = (
+    env_float("SEARCH_WEIGHT_TITLE", 10.0),
+    env_float("SEARCH_WEIGHT_CONTENT", 1.0),
+    env_float("SEARCH_WEIGHT_AUTHOR", 5.0),
+)
+SEARCH_SNIPPET_TOKENS = env_int("SEARCH_SNIPPET_TOKENS", 16)  # 摘要片段的最大词数（word 模式）
+SEARCH_SNIPPET_CHARS = env_int("SEARCH_SNIPPET_CHARS", 64)    # 摘要片段的最大字符数（cjk 模式）
+# 用户名 / 标题三元组索引（容错模糊查找）
+SEARCH_TRIGRAM_THRESHOLD = env_float("SEARCH_TRIGRAM_THRESHOLD", 0.3)  # 查询词三元组覆盖率下限
+SEARCH_TRIGRAM_LIMIT = env_int("SEARCH_TRIGRAM_LIMIT", 200)            # 单次查询最多返回的匹配数
+
+
+
+# -------------------------- 单写线程 --------------------------
+# 开启后所有写事务由单独的写线程串行执行并合并提交（group commit）；关闭时在线程池中逐个提交
+WRITER_QUEUE_ENABLED = env_bool("WRITER_QUEUE", True)
+WRITER_MAX_BATCH = env_int("WRITER_MAX_BATCH", 64)                  # 单次合并提交的最大事务数
+WRITER_BATCH_WAIT_MS = env_float("WRITER_BATCH_WAIT_MS", 0.0)       # 凑批等待时间（毫秒），0 表示不额外等待
+WRITER_MAX_RETRIES = env_int("WRITER_MAX_RETRIES", 5)               # SQLITE_BUSY 最大重试次数
+WRITER_RETRY_BACKOFF_MS = env_float("WRITER_RETRY_BACKOFF_MS", 10.0)  # 重试退避基数（毫秒，指数增长）
+
+
+
+# -------------------------- 令牌黑名单 --------------------------
+# 黑名单常驻内存（启动时加载、登出时更新），鉴权时不再查询数据库
+TOKEN_BLACKLIST_SYNC_SECONDS = env_float("TOKEN_BLACKLIST_SYNC_SECONDS", 2.0)   # 从数据库拉取其它 worker 新增记录的间隔（秒）
+TOKEN_BLACKLIST_PURGE_SECONDS = env_float("TOKEN_BLACKLIST_PURGE_SECONDS", 300.0)  # 清理过期记录的间隔（秒）
+TOKEN_BLACKLIST_PURGE_BATCH = env_int("TOKEN_BLACKLIST_PURGE_BATCH", 500)        # 每批删除的过期记录数
+
+
+
+# -------------------------- 登录用户缓存 --------------------------
+# 鉴权时按令牌 sub（邮箱）缓存用户身份，命中时不查询 users 表
+AUTH_USER_CACHE_SIZE = env_int("AUTH_USER_CACHE_SIZE", 10000)      # 最多缓存的用户数（LRU 淘汰），0 表示关闭
+AUTH_USER_CACHE_TTL = env_float("AUTH_USER_CACHE_TTL", 60.0)       # 缓存有效期（秒），也是关闭 INVALIDATION_BUS 时其它 worker 注销生效的最大延迟
+
+
+
+# -------------------------- 密码哈希 --------------------------
+# pbkdf2 哈希在独立的进程池中执行，登录 / 注册风暴不会占满线程池和 GIL；0 表示退回线程池执行
+AUTH_HASH_WORKERS = env_int("AUTH_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+# 准入控制：同时提交到进程池的哈希任务数上限，超出后排队；排队数或排队时间超限时返回 503
+AUTH_HASH_MAX_INFLIGHT = env_int("AUTH_HASH_MAX_INFLIGHT", max(1, AUTH_HASH_WORKERS) * 2)
+AUTH_HASH_MAX_QUEUE = env_int("AUTH_HASH_MAX_QUEUE", 64)                # 最多排队的哈希任务数
+AUTH_HASH_QUEUE_TIMEOUT = env_float("AUTH_HASH_QUEUE_TIMEOUT", 2.0)     # 最长排队时间（秒）
+
+
+
+# -------------------------- 令牌刷新 --------------------------
+# 令牌自动刷新时新令牌总是放在响应头 X-New-Access-Token 中；
+# 开启后同时拼接到 JSON 对象响应体的 new_token 字段（兼容只读取响应体的旧客户端）
+TOKEN_REFRESH_BODY = env_bool("TOKEN_REFRESH_BODY", False)
+
+
+
+# -------------------------- SQL 查询统计 --------------------------
+# 每个请求统计 SQL 条数、总耗时与重复出现的语句形状（疑似 N+1），结果见 /monitor/queries
+QUERY_STATS_ENABLED = env_bool("QUERY_STATS", True)
+QUERY_STATS_HEADER_ENABLED = env_bool("QUERY_STATS_HEADER", False)          # 开启后通过 X-Query-Stats 响应头返回（调试 / 测试用）
+QUERY_N_PLUS_ONE_THRESHOLD = env_int("QUERY_N_PLUS_ONE_THRESHOLD", 3)      # 同一请求中同一语句形状重复多少次视为疑似 N+1
+QUERY_N_PLUS_ONE_MAX_REPORTS = env_int("QUERY_N_PLUS_ONE_MAX_REPORTS", 200)  # /monitor/queries 最多保留的疑似 N+1 条目数
+
+
+
+# -------------------------- 慢查询日志 --------------------------
+# 耗时超过阈值的语句连同发起路由写入 JSON Lines 文件（绑定参数默认只记录类型与长度）；每种语句形状首次执行时
+# 运行一次 EXPLAIN QUERY PLAN，标记对大表的全表扫描（SCAN），汇总见 /monitor/slow-queries
+SLOW_QUERY_ENABLED = env_bool("SLOW_QUERY_LOG", True)
+SLOW_QUERY_THRESHOLD_MS = env_float("SLOW_QUERY_THRESHOLD_MS", 50.0)         # 慢查询阈值（毫秒）
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "slow_queries.jsonl")  # 日志文件（按大小轮转）
+# 记录绑定参数原值：参数中有令牌、邮箱、密码哈希等敏感数据，仅在本地排查时开启
+SLOW_QUERY_LOG_PARAMS = env_bool("SLOW_QUERY_LOG_PARAMS", False)
+SLOW_QUERY_LOG_MAX_BYTES = env_int("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024)
+SLOW_QUERY_LOG_BACKUPS = env_int("SLOW_QUERY_LOG_BACKUPS", 5)
+SLOW_QUERY_MAX_SHAPES = env_int("SLOW_QUERY_MAX_SHAPES", 1000)               # 内存中最多保留的语句形状数
+# 需要关注全表扫描的表（行数随业务增长）
+SLOW_QUERY_SCAN_TABLES = frozenset(
+    table.strip() for table in os.getenv("SLOW_QUERY_SCAN_TABLES", "articles,comments,likes,collects,messages").split(",")
+    if table.strip()
+)
+
+
+
+# -------------------------- 运行指标（Prometheus） --------------------------
+# 按路由记录请求数、状态码、延迟直方图与数据库耗时，以 Prometheus 文本格式从 /metrics 导出
+METRICS_ENABLED = env_bool("METRICS", True)
+# 延迟直方图的桶上限（秒，逗号分隔，升序）
+METRICS_LATENCY_BUCKETS = tuple(
+    float(bound) for bound in
+    os.getenv("METRICS_LATENCY_BUCKETS", "0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10").split(",")
+)
+
+
+
+# -------------------------- 请求性能剖析 --------------------------
+# 携带有效签名调试头（X-Debug-Profile，由 manage.py profile-token 生成）的请求，
+# 或按采样率随机选中的请求，在 cProfile 下执行；结果写入 PROFILE_DIR，通过 /monitor/profiles 下载（仅管理员）
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")                  # 调试头签名密钥，留空时不接受调试头
+PROFILE_SAMPLE_RATE = env_float("PROFILE_SAMPLE_RATE", 0.0)       # 随机剖析的请求比例（0~1），0 表示关闭
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")                # 剖析结果目录
+PROFILE_MAX_FILES = env_int("PROFILE_MAX_FILES", 100)             # 最多保留的剖析文件数，超出时删除最旧的
+
+
+
+# -------------------------- 流量录制 --------------------------
+# 开启后把每个请求的方法、路径、查询串、匿名化的用户身份、状态码与耗时写入 NDJSON 文件，
+# 用于 benchmarks.traffic_replay 在新的应用实例上按原始节奏回放（默认关闭，只在需要采集时开启）
+TRAFFIC_CAPTURE_ENABLED = env_bool("TRAFFIC_CAPTURE", False)
+# 录制文件（按大小轮转）；{pid} 替换为进程号，多个 worker 各写一个文件，回放时合并
+TRAFFIC_CAPTURE_FILE = os.getenv("TRAFFIC_CAPTURE_FILE", "traffic-{pid}.ndjson")
+TRAFFIC_CAPTURE_MAX_BYTES = env_int("TRAFFIC_CAPTURE_MAX_BYTES", 100 * 1024 * 1024)
+TRAFFIC_CAPTURE_BACKUPS = env_int("TRAFFIC_CAPTURE_BACKUPS", 5)
+# 用户身份匿名化的 HMAC 密钥；多个 worker 需配置相同的值，同一用户才会得到相同的匿名编号（留空时每个进程随机生成）
+TRAFFIC_CAPTURE_SALT = os.getenv("TRAFFIC_CAPTURE_SALT", "")
+TRAFFIC_CAPTURE_MAX_BODY = env_int("TRAFFIC_CAPTURE_MAX_BODY", 64 * 1024)  # 超过该大小（字节）的请求体只记录长度
+# 不录制的路径前缀（监控抓取、文档页面等）
+TRAFFIC_CAPTURE_EXCLUDE = tuple(
+    prefix.strip() for prefix in os.getenv("TRAFFIC_CAPTURE_EXCLUDE", "/metrics,/monitor,/docs,/redoc,/openapi.json").split(",")
+    if prefix.strip()
+)
+
+
+
+# -------------------------- 管理员 --------------------------
+# 可访问管理接口（如剖析结果下载）的用户邮箱，逗号分隔
+ADMIN_EMAILS = frozenset(email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip())
@@ -0,0 +1,73 @@
+# app/counters.py
+
+"""文章冗余计数（like_count / collect_count / comment_count）的维护与校准，以及文章版本号的递增"""
+from imports import Session, func, select, update, Optional
+from .models import Article, Like, Collect, Comment
+
+
+
+# 计数列 -> 来源表
+COUNTER_SOURCES = {
+    "like_count": Like,
+    "collect_count": Collect,
+    "comment_count": Comment,
+}
+
+RECONCILE_BATCH_SIZE = 500
+
+
+
+def bump_article_counter(db: Session, article_id: int, column: str, delta: int):
+    """在当前事务中原子地调整文章计数（UPDATE ... SET col = col + delta）"""
+    counter = getattr(Article, column)
+    db.query(Article).filter(Article.id == article_id).update(
+        {counter: counter + delta}, synchronize_session="evaluate"
+    )
+
+
+
+def bump_article_versions(db: Session, *article_ids: int):
+    """
+    在当前事务中递增文章版本号（并刷新修改时间）：用于只改变文章响应、不改变文章行的写入，
+    如编辑评论、评论者注销（文章详情 / 评论列表的 ETag 以文章版本号为准）
+    """
+    for start in range(0, len(article_ids), RECONCILE_BATCH_SIZE):
+        db.execute(
+            update(Article)
+            .where(Article.id.in_(article_ids[start:start + RECONCILE_BATCH_SIZE]))
+            .values(version=Article.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+
+def reconcile_article_counters(db: Session, article_ids: Optional[list[int]] = None) -> int:
+    """
+    从来源表重新统计并修正文章计数，返回被修正的文章数量
+    - article_ids 为空时校准全部文章
+    - 调用方负责提交事务
+    """
+    actual = {
+        column: select(func.count(source.id))
+            .where(source.article_id == Article.id)
+            .correlate(Article)
+            .scalar_subquery()
+        for column, source in COUNTER_SOURCES.items()
+    }
+    drifted = select(Article.id).where(
+        (Article.like_count != actual["like_count"])
+        | (Article.collect_count != actual["collect_count"])
+        | (Article.comment_count != actual["comment_count"])
+    )
+    if article_ids is not None:
+        drifted = drifted.where(Article.id.in_(article_ids))
+    drifted_ids = db.execute(drifted).scalars().all()
+    # 分批更新，避免 IN 列表超出 SQLite 参数个数上限
+    for start in range(0, len(drifted_ids), RECONCILE_BATCH_SIZE):
+        db.execute(
+            update(Article)
+            .where(Article.id.in_(drifted_ids[start:start + RECONCILE_BATCH_SIZE]))
+            .values(**actual)
+            .execution_options(synchronize_session=False)
+        )
+    return len(drifted_ids)
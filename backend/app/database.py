@@ -1,12 +1,135 @@
 # app/database.py
 
-from imports import create_engine, declarative_base, sessionmaker
+from imports import (
+    create_engine, declarative_base, sessionmaker, Union, Optional, event,
+    create_async_engine, async_sessionmaker, AsyncSession, Session,
+    run_in_threadpool
+)
+from .config import (
+    DATABASE_MODE, SQLITE_TUNING_ENABLED, SQLITE_PRAGMAS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, QUERY_STATS_ENABLED, SLOW_QUERY_ENABLED
+)
+from .fts import register_sqlite_functions
+from .query_stats import install_query_stats
+from .slow_queries import install_slow_query_log
+from .profiling import profile_call
+
+
+
+# -------------------------- 引擎调优 profile --------------------------
+def sqlite_engine_options(tuned: bool = SQLITE_TUNING_ENABLED, readonly: bool = False) -> dict:
+    """调优 profile 对应的 create_engine 参数（连接池大小）"""
+    if not tuned:
+        return {}
+    return {
+        "pool_size": DB_READ_POOL_SIZE if readonly else DB_POOL_SIZE,
+        "max_overflow": DB_READ_MAX_OVERFLOW if readonly else DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+def readonly_pragmas(tuned: bool = SQLITE_TUNING_ENABLED) -> dict:
+    """
+    只读连接执行的 PRAGMA：
+    - journal_mode 是数据库文件级设置，由读写连接负责，只读连接不能也无需修改
+    - query_only 作为第二道保险，拒绝任何写语句
+    """
+    pragmas = {name: value for name, value in SQLITE_PRAGMAS.items() if name != "journal_mode"} if tuned else {}
+    pragmas["query_only"] = 1
+    return pragmas
+
+def install_sqlite_profile(sync_engine, pragmas: dict = SQLITE_PRAGMAS):
+    """通过 connect 事件在每个新建的 DBAPI 连接上执行 PRAGMA"""
+    @event.listens_for(sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def install_sqlite_functions(sync_engine):
+    """通过 connect 事件注册应用自定义 SQL 函数（全文索引触发器依赖 cjk_segment）"""
+    @event.listens_for(sync_engine, "connect")
+    def _register_sqlite_functions(dbapi_connection, connection_record):
+        register_sqlite_functions(dbapi_connection)
+
+def install_transaction_control(sync_engine, begin_statement: str = "BEGIN"):
+    """
+    接管 pysqlite 的事务控制（SQLAlchemy 文档推荐的做法）：
+    - 关闭驱动自带的隐式 BEGIN，改由 begin 事件显式发出，使 SAVEPOINT 正常工作
+    - 写连接可使用 BEGIN IMMEDIATE，在事务开始时即获取写锁，避免读锁升级为写锁时冲突
+    """
+    @event.listens_for(sync_engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql(begin_statement)
+
+def create_sqlite_engine(
+    url: str,
+    tuned: bool = SQLITE_TUNING_ENABLED,
+    readonly: bool = False,
+    begin_statement: Optional[str] = None,
+    **kwargs
+):
+    """
+    创建同步 SQLite 引擎，并按需挂载调优 profile
+    - readonly=True：只读连接池
+    - begin_statement：显式事务开始语句（如 "BEGIN IMMEDIATE"），为空时沿用驱动默认行为
+    """
+    sync_engine = create_engine(url, **sqlite_engine_options(tuned, readonly), **kwargs)
+    install_sqlite_functions(sync_engine)
+    if readonly:
+        install_sqlite_profile(sync_engine, readonly_pragmas(tuned))
+    elif tuned:
+        install_sqlite_profile(sync_engine)
+    if begin_statement:
+        install_transaction_control(sync_engine, begin_statement)
+    if QUERY_STATS_ENABLED:
+        install_query_stats(sync_engine)
+    if SLOW_QUERY_ENABLED:
+        install_slow_query_log(sync_engine)
+    return sync_engine
+
+def create_async_sqlite_engine(url: str, tuned: bool = SQLITE_TUNING_ENABLED, readonly: bool = False, **kwargs):
+    """创建异步 SQLite 引擎（aiosqlite），PRAGMA 挂载在其底层同步引擎上"""
+    async_sqlite_engine = create_async_engine(url, **sqlite_engine_options(tuned, readonly), **kwargs)
+    install_sqlite_functions(async_sqlite_engine.sync_engine)
+    if readonly:
+        install_sqlite_profile(async_sqlite_engine.sync_engine, readonly_pragmas(tuned))
+    elif tuned:
+        install_sqlite_profile(async_sqlite_engine.sync_engine)
+    if QUERY_STATS_ENABLED:
+        install_query_stats(async_sqlite_engine.sync_engine)
+    if SLOW_QUERY_ENABLED:
+        install_slow_query_log(async_sqlite_engine.sync_engine)
+    return async_sqlite_engine
+
+def describe_sqlite_profile(sync_engine) -> dict:
+    """读取连接上实际生效的 PRAGMA 值与连接池状态（用于启动时报告）"""
+    with sync_engine.connect() as conn:
+        effective = {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in SQLITE_PRAGMAS
+        }
+    return {
+        "tuning": "on" if SQLITE_TUNING_ENABLED else "off",
+        "pragmas": effective,
+        "pool": sync_engine.pool.status(),
+    }
 
 
 
 # -------------------------- 极简数据库设置 --------------------------
+if DATABASE_MODE not in ("sync", "async"):
+    raise ValueError(f"DATABASE_MODE 仅支持 sync / async，当前为：{DATABASE_MODE}")
+
 SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -16,4 +139,68 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+
+# -------------------------- 只读会话 --------------------------
+# 只读连接池：mode=ro 打开数据库文件，并在连接上开启 query_only
+READONLY_DATABASE_URL = "sqlite:///file:./sql_app.db?mode=ro&uri=true"
+ASYNC_READONLY_DATABASE_URL = "sqlite+aiosqlite:///file:./sql_app.db?mode=ro&uri=true"
+
+class ReadOnlySession(Session):
+    """只读会话：不自动 flush、提交后不过期对象，且拒绝任何写入"""
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            raise RuntimeError("只读会话不允许写入，请改用 get_db 提供的读写会话")
+
+    def commit(self):
+        raise RuntimeError("只读会话不允许提交，请改用 get_db 提供的读写会话")
+
+# sync 模式：同步只读引擎，查询由 run_db 放入线程池执行
+# async 模式：aiosqlite 只读引擎，查询不占用线程池（aiosqlite 为该模式的必需依赖）
+read_engine = None
+async_read_engine = None
+ReadSessionLocal = None
+AsyncReadSessionLocal = None
+if DATABASE_MODE == "async":
+    async_read_engine = create_async_sqlite_engine(ASYNC_READONLY_DATABASE_URL, readonly=True)
+    AsyncReadSessionLocal = async_sessionmaker(
+        bind=async_read_engine, sync_session_class=ReadOnlySession,
+        autoflush=False, expire_on_commit=False
+    )
+else:
+    read_engine = create_sqlite_engine(READONLY_DATABASE_URL, readonly=True)
+    ReadSessionLocal = sessionmaker(
+        bind=read_engine, class_=ReadOnlySession,
+        autoflush=False, expire_on_commit=False
+    )
+
+async def get_read_db():
+    """
+    只读数据库会话依赖注入函数（供 GET 路由使用）
+    - async 模式：产出只读 AsyncSession，查询经由 aiosqlite 执行
+    - sync 模式：产出只读 Session，查询由 run_db 放入线程池执行
+    会话结束时仅释放连接（回滚隐式读事务），没有提交开销
+    """
+    if AsyncReadSessionLocal is not None:
+        async with AsyncReadSessionLocal() as db:
+            yield db
+    else:
+        db = ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+async def run_db(db: Union[AsyncSession, Session], fn, *args):
+    """
+    在会话上执行同步风格的查询函数 fn(session, *args)
+    - AsyncSession：通过 run_sync 执行（懒加载等 ORM 行为在其中同样可用）
+    - Session：放入线程池执行，避免阻塞事件循环
+    注意：fn 应返回已完全加载的数据（如 Pydantic 模型），序列化阶段不能再触发懒加载
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(profile_call, fn, db, *args)
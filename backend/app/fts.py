@@ -0,0 +1,262 @@
+# app/fts.py
+
+"""
+文章全文索引（SQLite FTS5）
+
+- 由 articles 表上的触发器在插入/更新/删除时同步维护，无需在业务代码中手动更新
+- 查询按 bm25 相关度排序（标题、作者名权重高于正文），支持摘要高亮
+- 索引模式或分词器变化时 ensure_fts_schema 会重建虚拟表并全量回填
+
+两种索引模式（SEARCH_FTS_MODE）：
+- word：external content 表（原文从 articles 表读取），直接使用 FTS5 分词，摘要由 snippet() 生成
+- cjk：unicode61 会把一整串汉字当成一个词，中文子串几乎无法命中。
+  该模式在写入索引前将连续的中日韩字符展开为重叠二元组（"数据库" -> "数据 据库 库"），
+  查询时按同样规则切分为短语（"数据库" -> "数据 据库"），使中文子串查询也能走索引。
+  索引内容与原文不同，因此使用 contentless 表，摘要在 Python 中生成
+"""
+from imports import re, html, text, Integer, Float, String, Optional
+from .config import (
+    SEARCH_FTS_MODE, SEARCH_FTS_TOKENIZER, SEARCH_BM25_WEIGHTS,
+    SEARCH_SNIPPET_TOKENS, SEARCH_SNIPPET_CHARS
+)
+
+
+
+if SEARCH_FTS_MODE not in ("word", "cjk"):
+    raise ValueError(f"SEARCH_FTS_MODE 仅支持 word / cjk，当前为：{SEARCH_FTS_MODE}")
+
+FTS_TABLE = "articles_fts"
+FTS_COLUMNS = ("title", "content", "owner_name")   # 顺序与 bm25 权重、snippet 列号一一对应
+HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE = "<mark>", "</mark>"
+# FTS5 生成摘要时先用私用区字符占位，转义原文后再换成 <mark> 标记（原文不经转义直接拼接标记会造成存储型 XSS）
+_MARK_OPEN, _MARK_CLOSE = "\ue000", "\ue001"
+SNIPPET_ELLIPSIS = "…"
+NATIVE_SNIPPETS = SEARCH_FTS_MODE == "word"          # 是否由 FTS5 snippet()/highlight() 生成摘要
+
+# 中日韩字符：CJK 统一汉字（含扩展 A、兼容汉字）、平假名/片假名、韩文音节
+CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+
+
+
+# -------------------------- CJK 切分 --------------------------
+def _cjk_bigrams(run: str) -> list[str]:
+    """连续 CJK 字符 -> 重叠二元组，末尾补单字（使单字查询也能前缀命中句尾的字）"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]]
+
+
+
+def cjk_segment(value: Optional[str]) -> Optional[str]:
+    """索引侧切分（注册为 SQL 函数供触发器调用）：CJK 片段展开为二元组，其余文本保持不变"""
+    if not value:
+        return value
+    return CJK_RUN.sub(lambda match: " " + " ".join(_cjk_bigrams(match.group())) + " ", value)
+
+
+
+def _segment_query_term(term: str) -> tuple[str, bool]:
+    """
+    查询侧切分：CJK 片段展开为连续的二元组短语，与索引侧位置一一对应，返回 (短语, 是否前缀匹配)
+    - 位于关键词末尾的片段不补末尾单字（原文中该片段之后可能还有汉字），二元组精确匹配即可
+    - 后面还跟着其他字符的片段在原文中必然到此结束，与索引侧完全一致（补末尾单字）
+    - 以单个汉字或非 CJK 文本结尾时使用前缀匹配
+    """
+    tokens, position = [], 0
+    for match in CJK_RUN.finditer(term):
+        tokens.append(term[position:match.start()])
+        run = match.group()
+        if match.end() < len(term):
+            tokens.extend(_cjk_bigrams(run))
+        else:
+            tokens.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+        position = match.end()
+    tokens.append(term[position:])
+    tokens = [token for token in tokens if token]
+    ends_with_bigram = bool(tokens) and len(tokens[-1]) == 2 and CJK_RUN.fullmatch(tokens[-1]) is not None
+    return " ".join(tokens), not ends_with_bigram
+
+
+
+def register_sqlite_functions(dbapi_connection):
+    """在 DBAPI 连接上注册全文索引依赖的 SQL 函数（由 database 模块在 connect 事件中调用）"""
+    dbapi_connection.create_function("cjk_segment", 1, cjk_segment, deterministic=True)
+
+
+
+# -------------------------- 表结构 --------------------------
+def _indexed_values(prefix: str, mode: str) -> str:
+    """触发器/回填写入索引的列表达式（cjk 模式先经 cjk_segment 切分）"""
+    if mode == "cjk":
+        return ", ".join(f"cjk_segment({prefix}{column})" for column in FTS_COLUMNS)
+    return ", ".join(f"{prefix}{column}" for column in FTS_COLUMNS)
+
+
+
+def fts_table_ddl(mode: str = SEARCH_FTS_MODE) -> str:
+    """
+    FTS5 虚拟表建表语句，prefix 索引加速前缀匹配：
+    - word 模式：2/3 字符前缀（英文单词前缀查询）
+    - cjk 模式：1 字符前缀（单个汉字的查询），二元组本身精确匹配，无需更长的前缀索引
+    """
+    if mode == "cjk":
+        options = "content='', prefix='1'"
+    else:
+        options = "content='articles', content_rowid='id', prefix='2 3'"
+    return (
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"{', '.join(FTS_COLUMNS)}, {options}, "
+        f"tokenize='{SEARCH_FTS_TOKENIZER}')"
+    )
+
+
+
+def fts_trigger_ddl(mode: str = SEARCH_FTS_MODE) -> list[str]:
+    """articles 表上维护索引的触发器（删除旧行时需要提供与写入时相同的旧值）"""
+    columns = ", ".join(FTS_COLUMNS)
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {_indexed_values('new.', mode)});"
+    delete_old = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {_indexed_values('old.', mode)});"
+    return [
+        f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN {insert_new} END",
+        f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN {delete_old} END",
+        f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {columns} ON articles BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+
+def ensure_fts_schema(sync_engine, mode: str = SEARCH_FTS_MODE) -> bool:
+    """
+    确保全文索引表与触发器为最新定义，返回是否（重新）创建并回填了索引
+    - 新库：建表、建触发器并回填已有文章
+    - 索引模式或分词器变化：删除旧表与触发器后重建
+    """
+    expected = [fts_table_ddl(mode), *fts_trigger_ddl(mode)]
+    with sync_engine.begin() as conn:
+        existing = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE name = ? OR (type = 'trigger' AND tbl_name = 'articles' AND name LIKE ?)",
+            (FTS_TABLE, f"{FTS_TABLE}_%"),
+        ).scalars().all()
+        if sorted(existing) == sorted(expected):
+            return False
+
+        for suffix in ("ai", "ad", "au"):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        for ddl in expected:
+            conn.exec_driver_sql(ddl)
+        rebuild_fts_index(conn, mode)
+    return True
+
+
+
+def rebuild_fts_index(conn, mode: str = SEARCH_FTS_MODE) -> int:
+    """从 articles 表全量重建索引并合并索引段，返回已索引的文章数"""
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+    indexed = conn.exec_driver_sql(
+        f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) "
+        f"SELECT id, {_indexed_values('', mode)} FROM articles"
+    ).rowcount
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+
+# -------------------------- 查询 --------------------------
+def build_match_query(keywords: str, columns: Optional[tuple] = None, mode: str = SEARCH_FTS_MODE) -> Optional[str]:
+    """
+    将用户输入转换为 FTS5 查询表达式
+    - 按空白拆分关键词，每个关键词作为带前缀匹配的短语（双引号转义，避免注入 FTS 语法）
+    - cjk 模式下关键词中的 CJK 片段切分为二元组短语，等价于子串匹配（以完整二元组结尾时精确匹配）
+    - 多个关键词之间为 AND 关系
+    - columns：限定搜索的列（如只搜标题），默认搜索全部列
+    返回 None 表示输入中没有可搜索的内容
+    """
+    if mode == "cjk":
+        segmented = [_segment_query_term(term) for term in keywords.split()]
+    else:
+        segmented = [(term, True) for term in keywords.split()]
+    terms = []
+    for phrase, prefix in segmented:
+        if not phrase.strip('"'):
+            continue
+        escaped = phrase.replace('"', '""')
+        terms.append(f'"{escaped}"*' if prefix else f'"{escaped}"')
+    if not terms:
+        return None
+    expression = " ".join(terms)
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({expression})"
+    return expression
+
+
+
+def fts_hits(match: str, with_snippet: bool = False):
+    """
+    命中结果子查询：id、score（bm25，越小越相关）
+    with_snippet 且为 word 模式时额外返回 title_highlight / snippet（命中处为占位符，由 render_marked 转为 HTML；cjk 模式见 highlight_article）
+    调用方将其与 articles 表 JOIN 后按 (score, id) 正序分页
+    """
+    weights = ", ".join(str(weight) for weight in SEARCH_BM25_WEIGHTS)
+    columns = {"id": Integer, "score": Float}
+    select_list = ["rowid AS id", f"bm25({FTS_TABLE}, {weights}) AS score"]
+    if with_snippet and NATIVE_SNIPPETS:
+        select_list.append(
+            f"highlight({FTS_TABLE}, 0, '{_MARK_OPEN}', '{_MARK_CLOSE}') AS title_highlight"
+        )
+        select_list.append(
+            f"snippet({FTS_TABLE}, -1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '{SNIPPET_ELLIPSIS}', {SEARCH_SNIPPET_TOKENS}) AS snippet"
+        )
+        columns.update(title_highlight=String, snippet=String)
+
+    statement = text(
+        f"SELECT {', '.join(select_list)} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    ).bindparams(match=match).columns(**columns)
+    return statement.subquery("hits")
+
+
+
+def render_marked(value: Optional[str]) -> str:
+    """FTS5 highlight()/snippet() 的结果转为 HTML：转义原文后把占位符换成 <mark> / </mark>"""
+    return html.escape(value or "").replace(_MARK_OPEN, HIGHLIGHT_OPEN).replace(_MARK_CLOSE, HIGHLIGHT_CLOSE)
+
+
+
+def _mark_terms(pattern: re.Pattern, value: str) -> str:
+    """转义文本并以 <mark> 标记命中的关键词（命中词与其余文本分别转义，只有标记本身不转义）"""
+    parts, last = [], 0
+    for match in pattern.finditer(value):
+        parts.append(html.escape(value[last:match.start()]))
+        parts.append(f"{HIGHLIGHT_OPEN}{html.escape(match.group())}{HIGHLIGHT_CLOSE}")
+        last = match.end()
+    parts.append(html.escape(value[last:]))
+    return "".join(parts)
+
+
+
+def highlight_article(title: str, content: str, owner_name: str, keywords: str) -> tuple[str, str]:
+    """
+    在 Python 中生成高亮标题与摘要片段（cjk 模式使用，仅处理当前页的结果）
+    摘要取首个命中关键词附近的 SEARCH_SNIPPET_CHARS 个字符，依次在正文、标题、作者名中查找；
+    返回值为 HTML，原文均已转义
+    """
+    terms = sorted(set(keywords.split()), key=len, reverse=True)
+    if not terms:
+        return html.escape(title), html.escape(content[:SEARCH_SNIPPET_CHARS])
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+
+    snippet = None
+    for value in (content, title, owner_name):
+        match = pattern.search(value or "")
+        if match is None:
+            continue
+        start = max(0, match.start() - SEARCH_SNIPPET_CHARS // 4)
+        end = min(len(value), start + SEARCH_SNIPPET_CHARS)
+        snippet = (
+            (SNIPPET_ELLIPSIS if start > 0 else "")
+            + _mark_terms(pattern, value[start:end])
+            + (SNIPPET_ELLIPSIS if end < len(value) else "")
+        )
+        break
+    if snippet is None:
+        snippet = html.escape(content[:SEARCH_SNIPPET_CHARS]) + (SNIPPET_ELLIPSIS if len(content) > SEARCH_SNIPPET_CHARS else "")
+    return _mark_terms(pattern, title), snippet
@@ -0,0 +1,161 @@
+# app/hashing.py
+
+"""
+密码哈希：pbkdf2_sha256 计算放到独立的进程池中执行，并对提交量做准入控制
+
+- 哈希是纯 CPU 计算，在线程池中执行会持有 GIL 并占用线程池名额，登录风暴会拖慢所有接口；
+  放到进程池后事件循环和线程池只负责等待结果
+- 进程池使用 spawn 方式创建（不继承父进程的写线程和数据库连接），在 lifespan 中启动并预热
+- 准入控制：同时提交的任务数超过 AUTH_HASH_MAX_INFLIGHT 后排队，
+  排队数超过 AUTH_HASH_MAX_QUEUE 或排队超过 AUTH_HASH_QUEUE_TIMEOUT 秒时直接返回 503
+- 本模块不导入数据库相关模块，子进程导入时不会创建数据库引擎
+"""
+from imports import (
+    asyncio, os, multiprocessing, ProcessPoolExecutor, Optional,
+    CryptContext, HTTPException, status, run_in_threadpool
+)
+from .config import AUTH_HASH_WORKERS, AUTH_HASH_MAX_INFLIGHT, AUTH_HASH_MAX_QUEUE, AUTH_HASH_QUEUE_TIMEOUT
+
+
+
+# 配置密码哈希上下文
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """验证密码是否匹配哈希值"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+
+def get_password_hash(password: str) -> str:
+    """生成密码的哈希值（无72字节限制）"""
+    if not password or password.strip() == "":
+        raise ValueError("密码不能为空，且不能全为空格")
+    return pwd_context.hash(password)
+
+
+
+def _worker_pid() -> int:
+    """预热用：确认子进程已启动并导入本模块"""
+    return os.getpid()
+
+
+
+# -------------------------- 准入控制 --------------------------
+class HashLimiter:
+    """限制同时执行的哈希任务数，超出部分有限排队，排不上时返回 503"""
+
+    def __init__(self, max_inflight: int, max_queue: int, queue_timeout: float):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_inflight)
+        self._inflight = 0
+        self._waiting = 0
+        self._stats = {"completed": 0, "queued": 0, "rejected": 0, "timeouts": 0, "max_waiting": 0}
+
+    def _overloaded(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="认证服务繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+
+    async def __aenter__(self):
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise self._overloaded()
+            self._waiting += 1
+            self._stats["queued"] += 1
+            self._stats["max_waiting"] = max(self._stats["max_waiting"], self._waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                raise self._overloaded()
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self._inflight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._inflight -= 1
+        self._stats["completed"] += 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "inflight": self._inflight,
+            "waiting": self._waiting,
+            **self._stats,
+        }
+
+
+
+# -------------------------- 进程池 --------------------------
+class HashPool:
+    """哈希进程池及其准入控制（未启动时退回线程池执行，便于脚本和管理命令直接调用）"""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._limiter: Optional[HashLimiter] = None
+        self.workers = 0
+
+    def start(self, workers: int = AUTH_HASH_WORKERS):
+        """创建进程池并预热（每个子进程完成 spawn 和模块导入，首个登录请求不再承担启动开销）"""
+        self._limiter = HashLimiter(AUTH_HASH_MAX_INFLIGHT, AUTH_HASH_MAX_QUEUE, AUTH_HASH_QUEUE_TIMEOUT)
+        if workers <= 0:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        for future in [self._executor.submit(_worker_pid) for _ in range(workers)]:
+            future.result()
+        self.workers = workers
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self.workers = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    async def run(self, fn, *args):
+        """在准入控制下执行哈希函数（进程池未启动时在线程池中执行）"""
+        if self._limiter is None:
+            self._limiter = HashLimiter(AUTH_HASH_MAX_INFLIGHT, AUTH_HASH_MAX_QUEUE, AUTH_HASH_QUEUE_TIMEOUT)
+        async with self._limiter:
+            if self._executor is None:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def stats(self) -> dict:
+        return {
+            "mode": "process" if self.running else "thread",
+            "workers": self.workers,
+            **(self._limiter.stats() if self._limiter is not None else {}),
+        }
+
+
+
+hash_pool = HashPool()
+
+
+
+async def hash_password(password: str) -> str:
+    """异步生成密码哈希（进程池执行）"""
+    return await hash_pool.run(get_password_hash, password)
+
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """异步验证密码（进程池执行）"""
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
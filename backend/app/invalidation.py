@@ -0,0 +1,279 @@
+# app/invalidation.py
+
+"""
+跨 worker 缓存失效：多进程部署时让各 worker 的进程内缓存（主页 / 文章详情 / 登录用户）与三元组索引保持一致，不依赖外部服务
+
+- 发布：写事务中调用 invalidate_after_commit(db, namespace, *keys)，在同一事务中向 cache_invalidations 表追加事件，
+  事件与业务数据一起提交或回滚；本进程在提交后（after_commit）立即失效，不经过轮询
+- 订阅：每个 worker 一个后台线程，用独立的只读连接每 INVALIDATION_POLL_MS 执行一次 PRAGMA data_version
+  （连接级计数器，只有其它连接提交过才会变化，没有写入时不读表），变化时按 id 增量读取新事件，
+  跳过本进程发布的事件，其余交给命名空间登记的处理函数；其它 worker 最多延迟约一个轮询间隔失效
+- 事件 id 为 AUTOINCREMENT 且 SQLite 写事务串行提交，已提交的 id 连续递增，按 id 增量读取不会漏读；
+  读到的 id 不连续说明中间的事件已被清理（进程长时间停顿），无法得知丢失了哪些键，所有命名空间整体失效
+- 三元组索引（用户名 / 文章作者名 / 文章标题）各占一个命名空间：本进程提交后直接用新文本更新，
+  事件只带 key，其它 worker 收到后按 key 从数据库重新读取该条记录；整体失效时从数据库全量重建
+- 事件只用于失效，保留 INVALIDATION_RETENTION_SECONDS 后由清理任务删除
+- 管理脚本等绕过应用的写入不发布事件，仍由各缓存的 TTL 兜底
+"""
+from imports import (
+    os, time, socket, secrets, sqlite3, asyncio, threading, logging, datetime, timedelta, timezone, Optional, Session, insert
+)
+from . import models
+from .config import (
+    INVALIDATION_BUS_ENABLED, INVALIDATION_POLL_MS, INVALIDATION_MAX_KEYS,
+    INVALIDATION_RETENTION_SECONDS, INVALIDATION_PURGE_SECONDS
+)
+from .database import engine
+from .utils import get_current_utc_time
+from .writer import run_write, after_commit
+from .response_cache import home_cache
+from .article_cache import article_cache
+from .user_cache import user_cache
+from .trigram import TrigramIndex, TRIGRAM_INDEXES, reload_entry, reload_index
+
+logger = logging.getLogger("blog_api")
+
+
+
+HOME_NAMESPACE = "home"        # 主页响应缓存（只整体失效）
+ARTICLE_NAMESPACE = "article"  # 文章详情缓存，键为文章 ID
+USER_NAMESPACE = "user"        # 登录用户缓存，键为邮箱
+TRIGRAM_NAMESPACE_PREFIX = "trigram."  # 三元组索引：trigram.<索引名>，键为用户 / 作者 / 文章 ID
+_POLL_BATCH = 1000
+_INSERT_EVENT = insert(models.CacheInvalidation.__table__)
+
+
+
+class InvalidationBus:
+    """失效事件的发布标识、命名空间处理函数与轮询线程"""
+
+    def __init__(self, database: str, interval: float = INVALIDATION_POLL_MS / 1000):
+        self.database = os.path.abspath(database)  # 与引擎一致，在导入时解析相对路径
+        self.interval = interval
+        self._handlers: dict = {}      # 命名空间 -> (按键失效, 整体失效)
+        self._origin = None
+        self._origin_pid = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._last_id = 0              # 已读取的最大事件 ID（仅轮询线程修改）
+        self._data_version = None
+        self._stats = {
+            "published": 0, "applied": 0, "own_skipped": 0, "polls": 0, "reads": 0, "resets": 0,
+            "errors": 0, "last_delay_ms": None, "max_delay_ms": None,
+        }
+
+    @property
+    def origin(self) -> str:
+        """本进程的发布标识（fork 出的 worker 与父进程不同）"""
+        pid = os.getpid()
+        if self._origin_pid != pid:
+            self._origin = f"{socket.gethostname()}:{pid}:{secrets.token_hex(4)}"
+            self._origin_pid = pid
+        return self._origin
+
+    def register(self, namespace: str, invalidate_key, invalidate_all):
+        """登记命名空间的处理函数：invalidate_key(key) 按键失效（为 None 时总是整体失效），invalidate_all() 整体失效"""
+        self._handlers[namespace] = (invalidate_key, invalidate_all)
+
+    def apply(self, namespace: str, keys: tuple):
+        """失效本进程缓存：keys 为空时整个命名空间失效（提交后回调与轮询线程都会调用）"""
+        invalidate_key, invalidate_all = self._handlers[namespace]
+        if not keys or invalidate_key is None:
+            invalidate_all()
+            return
+        for key in keys:
+            invalidate_key(key)
+
+    def apply_all(self):
+        for _, invalidate_all in self._handlers.values():
+            invalidate_all()
+
+    def record_published(self, count: int):
+        self._stats["published"] += count
+
+    # ---------- 生命周期 ----------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """从当前最新的事件开始轮询（需在建表之后调用，重复调用无副作用）"""
+        if self.running:
+            return
+        self._connection = sqlite3.connect(f"file:{self.database}?mode=ro", uri=True, check_same_thread=False)
+        # 已清理的事件也占用过 id，从历史最大 id 开始读取，避免把清理造成的空洞当作丢失事件
+        row = self._connection.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = ?", (models.CacheInvalidation.__tablename__,)
+        ).fetchone()
+        self._last_id = row[0] if row else 0
+        self._data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        self._connection.close()
+        self._connection = None
+
+    # ---------- 轮询线程 ----------
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                self._stats["errors"] += 1
+                logger.exception("缓存失效事件轮询失败")
+
+    def poll(self) -> int:
+        """数据库有新的提交时读取新事件并失效本进程缓存，返回处理的事件数"""
+        self._stats["polls"] += 1
+        version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return 0
+        self._data_version = version
+        self._stats["reads"] += 1
+        # 先读 data_version 再读表：两次之间的提交既能读到，也会使下一次的 data_version 变化，不会遗漏
+        applied = 0
+        while True:
+            rows = self._connection.execute(
+                "SELECT id, namespace, key, origin, created_at FROM cache_invalidations WHERE id > ? ORDER BY id LIMIT ?",
+                (self._last_id, _POLL_BATCH)
+            ).fetchall()
+            if not rows:
+                break
+            applied += self._apply_rows(rows)
+            if len(rows) < _POLL_BATCH:
+                break
+        return applied
+
+    def _apply_rows(self, rows: list) -> int:
+        if rows[0][0] != self._last_id + 1:
+            # 中间的事件已被清理，无法得知丢失了哪些键
+            self._stats["resets"] += 1
+            self.apply_all()
+        origin = self.origin
+        applied, last_created = 0, None
+        for event_id, namespace, key, event_origin, created_at in rows:
+            self._last_id = event_id
+            if event_origin == origin:
+                self._stats["own_skipped"] += 1
+                continue
+            if namespace not in self._handlers:
+                continue  # 更新版本的 worker 发布的命名空间
+            try:
+                self.apply(namespace, (key,) if key is not None else ())
+            except Exception:
+                self._stats["errors"] += 1
+                logger.exception(f"缓存失效失败：{namespace} {key}")
+            applied += 1
+            last_created = created_at
+        self._stats["applied"] += applied
+        if last_created is not None:
+            self._record_delay(last_created)
+        return applied
+
+    def _record_delay(self, created_at: str):
+        """从事件写入（写事务提交前）到本进程读取的延迟"""
+        written = datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc).timestamp()  # 存储时已去掉时区（UTC）
+        delay_ms = round((time.time() - written) * 1000, 2)
+        self._stats["last_delay_ms"] = delay_ms
+        self._stats["max_delay_ms"] = max(self._stats["max_delay_ms"] or 0, delay_ms)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": INVALIDATION_BUS_ENABLED,
+            "running": self.running,
+            "poll_interval_ms": self.interval * 1000,
+            "origin": self.origin,
+            "last_id": self._last_id,
+            "namespaces": sorted(self._handlers),
+            **self._stats,
+        }
+
+
+
+invalidation_bus = InvalidationBus(engine.url.database)
+invalidation_bus.register(HOME_NAMESPACE, None, home_cache.invalidate)
+invalidation_bus.register(ARTICLE_NAMESPACE, lambda key: article_cache.invalidate(int(key)), article_cache.invalidate_all)
+invalidation_bus.register(USER_NAMESPACE, user_cache.invalidate, user_cache.clear)
+for _index in TRIGRAM_INDEXES:
+    invalidation_bus.register(
+        TRIGRAM_NAMESPACE_PREFIX + _index.name,
+        lambda key, index=_index: reload_entry(index, key),
+        lambda index=_index: reload_index(index),
+    )
+
+
+
+# -------------------------- 发布 --------------------------
+def invalidate_after_commit(db: Session, namespace: str, *keys):
+    """
+    在写事务中登记缓存失效：提交后本进程立即失效，其它 worker 经失效事件在轮询后失效
+    - 不传 keys 时整个命名空间失效
+    - 键数超过 INVALIDATION_MAX_KEYS 时，发布的事件改为整个命名空间失效（本进程仍按键精确失效）
+    - 为 None 的键忽略（如已注销用户的邮箱）
+    """
+    if keys:
+        keys = tuple(key for key in keys if key is not None)
+        if not keys:
+            return
+    after_commit(db, invalidation_bus.apply, namespace, keys)
+    _publish(db, namespace, keys)
+
+
+
+def update_index_after_commit(db: Session, index: TrigramIndex, key: int, value: Optional[str]):
+    """
+    在写事务中登记三元组索引的增量更新：提交后本进程直接写入 value（为 None 时删除），
+    其它 worker 经失效事件在轮询后按 key 从数据库重新读取
+    """
+    after_commit(db, index.add, key, value)
+    _publish(db, TRIGRAM_NAMESPACE_PREFIX + index.name, (key,))
+
+
+
+def _publish(db: Session, namespace: str, keys: tuple):
+    """在同一事务中追加失效事件（未启用失效事件时不写入）"""
+    if not INVALIDATION_BUS_ENABLED:
+        return
+    published = [str(key) for key in keys] if len(keys) <= INVALIDATION_MAX_KEYS else []
+    origin = invalidation_bus.origin
+    db.execute(_INSERT_EVENT, [
+        {"namespace": namespace, "key": key, "origin": origin, "created_at": get_current_utc_time()}
+        for key in published or [None]
+    ])
+    after_commit(db, invalidation_bus.record_published, len(published) or 1)
+
+
+
+# -------------------------- 清理与后台任务 --------------------------
+def _purge_invalidations(db: Session, retention: float) -> int:
+    """删除保留期之前的失效事件，返回删除条数"""
+    removed = db.query(models.CacheInvalidation).filter(
+        models.CacheInvalidation.created_at < get_current_utc_time() - timedelta(seconds=retention)
+    ).delete(synchronize_session=False)
+    db.flush()
+    return removed
+
+
+async def _purge_loop():
+    while True:
+        await asyncio.sleep(INVALIDATION_PURGE_SECONDS)
+        try:
+            await run_write(_purge_invalidations, INVALIDATION_RETENTION_SECONDS)
+        except Exception:
+            logger.exception("缓存失效事件清理失败")
+
+
+def start_invalidation_tasks() -> list:
+    """启动轮询线程与清理任务（在 lifespan 中建表之后调用，关闭时取消返回的任务并调用 invalidation_bus.stop）"""
+    if not INVALIDATION_BUS_ENABLED:
+        return []
+    invalidation_bus.start()
+    return [asyncio.create_task(_purge_loop())]
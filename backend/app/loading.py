@@ -0,0 +1,86 @@
+# app/loading.py
+
+"""
+关联关系加载策略：每个接口的查询数固定，不随结果条数增长
+
+响应模型开启了 from_attributes，校验 ORM 对象时会读取同名的关联属性
+（Article.comments、Comment.user / article、Category.articles、User.articles / comments），
+未预加载的关联会在序列化时逐行懒加载，形成 N+1 查询。各接口在查询上显式声明加载策略：
+- 要返回的关联用 selectinload：每个关联固定多一条 IN 查询，并且只加载响应模型用到的列
+- 不返回的关联用 raiseload：一旦有代码意外访问就直接报错，不会悄悄发出查询；
+  这类对象通过 loaded_values 构造响应，未加载的关联字段取响应模型的默认值（None）
+"""
+from imports import inspect, selectinload, joinedload, raiseload, select, func, Session
+from . import models
+
+
+
+# ArticleMinimal / ArticleMinimalWithStats 用到的列（不加载正文）
+ARTICLE_MINIMAL_COLUMNS = (
+    models.Article.id, models.Article.title, models.Article.owner_id,
+    models.Article.owner_name, models.Article.created_at,
+)
+ARTICLE_STATS_COLUMNS = ARTICLE_MINIMAL_COLUMNS + (
+    models.Article.category_id, models.Article.like_count,
+    models.Article.collect_count, models.Article.comment_count,
+)
+
+# 条件请求的校验器列（ETag / Last-Modified 只依赖这些列，见 app/conditional.py）
+ARTICLE_VALIDATOR_COLUMNS = (models.Article.id, models.Article.version, models.Article.updated_at)
+CATEGORY_VALIDATOR_COLUMNS = (models.Category.id, models.Category.version, models.Category.updated_at)
+
+
+
+# -------------------------- 各接口的加载选项 --------------------------
+# 全文搜索结果（ArticleSearchHit）：不返回评论，其余关联禁止懒加载
+ARTICLE_LIST_OPTIONS = (raiseload("*"),)
+
+# 文章（按ID搜索 / 按作者、标题、内容搜索的列表）：评论一条 IN 查询批量加载
+ARTICLE_WITH_COMMENTS_OPTIONS = (selectinload(models.Article.comments), raiseload("*"))
+
+# 评论：评论者和所属文章各一条 IN 查询（文章只取极简模型的列）
+COMMENT_USER_OPTION = selectinload(models.Comment.user).load_only(models.User.id, models.User.username, models.User.email)
+COMMENT_OPTIONS = (
+    COMMENT_USER_OPTION,
+    selectinload(models.Comment.article).load_only(*ARTICLE_MINIMAL_COLUMNS),
+)
+
+# 某篇文章的评论列表：所属文章已由调用方先查询到会话中，article 关联只允许从会话中取，不得再发查询
+ARTICLE_COMMENTS_OPTIONS = (COMMENT_USER_OPTION, raiseload(models.Comment.article, sql_only=True))
+
+# 分类列表（主页 / 全部分类）：不返回分类下的文章，文章数见 category_article_counts
+CATEGORY_LIST_OPTIONS = (raiseload("*"),)
+
+# 单个分类：一次性加载其下文章的极简信息
+CATEGORY_DETAIL_OPTIONS = (selectinload(models.Category.articles).load_only(*ARTICLE_MINIMAL_COLUMNS),)
+
+# 用户资料 / 作者搜索：发表的文章（含计数列）与评论各一条 IN 查询
+USER_PROFILE_OPTIONS = (
+    selectinload(models.User.articles).load_only(*ARTICLE_STATS_COLUMNS),
+    selectinload(models.User.comments),
+)
+
+# 私信详情：发送者与接收者随私信一起 JOIN 加载
+MESSAGE_DETAIL_OPTIONS = (joinedload(models.Message.sender), joinedload(models.Message.receiver))
+
+
+
+def loaded_values(obj) -> dict:
+    """ORM 对象已加载的属性（列与已加载的关联），读取时不会触发懒加载"""
+    return {key: value for key, value in inspect(obj).dict.items() if not key.startswith("_sa_")}
+
+
+
+def category_article_counts(db: Session) -> dict[int, int]:
+    """各分类下的文章数（分类列表用，一条分组计数查询，走 (category_id, created_at, id) 索引，不加载文章）"""
+    return dict(db.execute(
+        select(models.Article.category_id, func.count())
+        .where(models.Article.category_id.is_not(None))
+        .group_by(models.Article.category_id)
+    ).all())
+
+
+
+def category_list_item(category, counts: dict[int, int]) -> dict:
+    """分类列表中的一项：分类已加载的列 + 文章数"""
+    return {**loaded_values(category), "article_count": counts.get(category.id, 0)}
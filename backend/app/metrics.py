@@ -0,0 +1,168 @@
+# app/metrics.py
+
+"""
+运行指标注册表（Prometheus 文本格式，由 /metrics 导出）
+
+- 按 (方法, 路由模板, 状态码) 记录请求数，按 (方法, 路由模板) 记录延迟直方图与数据库耗时 / 语句条数；
+  未匹配任何路由的请求统一记为 <unmatched>，避免任意路径撑大标签基数
+- 记录不加锁：每个线程写入自己的分片（threading.local），导出时再合并各分片；
+  中间件都在事件循环线程中记录，实际只有一个分片，单次记录只是几次字典 / 列表操作
+- 数据库耗时取自当前请求的 QueryStats（app/query_stats.py），需开启 QUERY_STATS
+- 指标按进程统计：多 worker 部署时每次抓取只反映处理该请求的 worker
+"""
+from imports import bisect, threading
+from .config import METRICS_LATENCY_BUCKETS
+
+
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "<unmatched>"
+PREFIX = "blog_api_"
+
+
+
+class _Shard:
+    """单个线程的指标分片（只由所属线程写入）"""
+    __slots__ = ("requests", "latency", "db")
+
+    def __init__(self):
+        self.requests: dict = {}   # (方法, 路由, 状态码) -> 请求数
+        self.latency: dict = {}    # (方法, 路由) -> [各桶计数..., +Inf 桶计数, 耗时总和]
+        self.db: dict = {}         # (方法, 路由) -> [数据库耗时总和, 语句条数]
+
+
+
+class MetricsRegistry:
+    """按路由汇总的请求指标"""
+
+    def __init__(self, buckets: tuple = METRICS_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.in_flight = 0                  # 只在事件循环线程中增减
+        self._local = threading.local()
+        self._shards: list[_Shard] = []
+        self._shards_lock = threading.Lock()  # 只在线程首次记录时注册分片用
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, db_seconds: float = None, db_queries: int = 0):
+        shard = self._shard()
+        key = (method, route, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+
+        key = (method, route)
+        latency = shard.latency.get(key)
+        if latency is None:
+            latency = shard.latency[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        latency[bisect.bisect_left(self.buckets, seconds)] += 1
+        latency[-1] += seconds
+
+        if db_seconds is not None:
+            db = shard.db.get(key)
+            if db is None:
+                db = shard.db[key] = [0.0, 0]
+            db[0] += db_seconds
+            db[1] += db_queries
+
+    def _merged(self) -> tuple[dict, dict, dict]:
+        """合并各分片（只复制，不阻塞记录）"""
+        requests, latency, db = {}, {}, {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, count in dict(shard.requests).items():
+                requests[key] = requests.get(key, 0) + count
+            for key, values in dict(shard.latency).items():
+                merged = latency.setdefault(key, [0] * len(values))
+                latency[key] = [a + b for a, b in zip(merged, list(values))]
+            for key, values in dict(shard.db).items():
+                merged = db.setdefault(key, [0.0, 0])
+                db[key] = [merged[0] + values[0], merged[1] + values[1]]
+        return requests, latency, db
+
+    def render(self) -> str:
+        """导出请求指标（Prometheus 文本格式）"""
+        requests, latency, db = self._merged()
+        lines = []
+
+        lines += _header("http_requests_total", "counter", "HTTP 请求数（按路由与状态码）")
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(_sample("http_requests_total", {"method": method, "route": route, "status": status}, count))
+
+        lines += _header("http_request_duration_seconds", "histogram", "HTTP 请求处理耗时（秒）")
+        for (method, route), values in sorted(latency.items()):
+            labels = {"method": method, "route": route}
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(_sample("http_request_duration_seconds_bucket", {**labels, "le": le}, cumulative))
+            lines.append(_sample("http_request_duration_seconds_sum", labels, values[-1]))
+            lines.append(_sample("http_request_duration_seconds_count", labels, cumulative))
+
+        lines += _header("http_request_db_seconds_total", "counter", "请求中执行 SQL 的累计耗时（秒）")
+        for (method, route), (seconds, _) in sorted(db.items()):
+            lines.append(_sample("http_request_db_seconds_total", {"method": method, "route": route}, seconds))
+        lines += _header("http_request_db_queries_total", "counter", "请求中执行的 SQL 语句数")
+        for (method, route), (_, queries) in sorted(db.items()):
+            lines.append(_sample("http_request_db_queries_total", {"method": method, "route": route}, queries))
+
+        lines += _header("http_requests_in_flight", "gauge", "正在处理的 HTTP 请求数")
+        lines.append(_sample("http_requests_in_flight", {}, self.in_flight))
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.requests.clear()
+                shard.latency.clear()
+                shard.db.clear()
+
+
+
+metrics = MetricsRegistry()
+
+
+
+# -------------------------- 文本格式 --------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+
+def _header(name: str, kind: str, help_text: str) -> list[str]:
+    return [f"# HELP {PREFIX}{name} {help_text}", f"# TYPE {PREFIX}{name} {kind}"]
+
+
+
+def _sample(name: str, labels: dict, value) -> str:
+    if labels:
+        label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f"{PREFIX}{name}{{{label_text}}} {value}"
+    return f"{PREFIX}{name} {value}"
+
+
+
+def render_gauges(gauges: list[tuple[str, str, float]]) -> str:
+    """导出抓取时读取的瞬时值：[(名称, 说明, 值), ...]"""
+    lines = []
+    for name, help_text, value in gauges:
+        lines += _header(name, "gauge", help_text)
+        lines.append(_sample(name, {}, value))
+    return "\n".join(lines) + "\n"
+
+
+
+def render_counters(counters: list[tuple[str, str, str, dict]]) -> str:
+    """导出其它模块自行累计的计数：[(名称, 说明, 标签名, {标签值: 计数}), ...]"""
+    lines = []
+    for name, help_text, label, values in counters:
+        lines += _header(name, "counter", help_text)
+        lines += [_sample(name, {label: value}, count) for value, count in values.items()]
+    return "\n".join(lines) + "\n"
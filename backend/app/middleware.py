@@ -0,0 +1,289 @@
+# app/middleware.py
+
+"""
+纯 ASGI 中间件（不使用 BaseHTTPMiddleware，避免每个请求额外的任务与流转发开销）
+
+令牌刷新：get_current_user 发现令牌即将过期时把新令牌写入 request.state.new_token，
+本中间件在响应头消息中追加 X-New-Access-Token；开启 inject_body 时，
+再把 "new_token" 字段流式拼接到 JSON 对象响应体末尾（不解析、不重新序列化响应体）
+
+SQL 统计：为每个请求开启 track_queries，响应头发出时汇总疑似 N+1（见 app/query_stats.py），
+开启 header 时在响应头中追加 X-Query-Stats
+
+运行指标：按路由记录请求数、状态码、处理耗时与数据库耗时（见 app/metrics.py），
+需挂载在 SQL 统计中间件之内，才能读取到当前请求的 QueryStats
+
+请求剖析：带有效调试头或被采样选中的请求在 cProfile 下执行（见 app/profiling.py），
+响应头中返回剖析编号 X-Profile-Id，结果文件名以该编号开头
+
+流量录制：请求结束后把方法、路径、查询串、匿名身份、请求体结构、状态码与耗时写入 NDJSON 文件
+（见 app/traffic_capture.py），挂载在最外层，耗时包含其它中间件
+"""
+from imports import json, time, Headers, MutableHeaders
+from .query_stats import QUERY_STATS_HEADER, track_queries, current_query_stats, n_plus_one_report
+from .metrics import UNMATCHED_ROUTE, MetricsRegistry, metrics
+from .profiling import (
+    PROFILE_HEADER, PROFILE_ID_HEADER, should_profile, start_request_profile, finish_request_profile
+)
+from .traffic_capture import TrafficRecorder, traffic_recorder
+
+
+
+NEW_TOKEN_HEADER = "X-New-Access-Token"
+
+
+
+class TokenRefreshMiddleware:
+    """在响应中返回自动刷新的新令牌"""
+
+    def __init__(self, app, inject_body: bool = False):
+        self.app = app
+        self.inject_body = inject_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # request.state 读写的就是 scope["state"]，提前创建以便在响应阶段读取
+        state = scope.setdefault("state", {})
+        splice = None
+
+        async def send_with_token(message):
+            nonlocal splice
+            if splice is not None:
+                await splice(message)
+                return
+            if message["type"] == "http.response.start" and state.get("new_token"):
+                new_token = state["new_token"]
+                headers = MutableHeaders(scope=message)
+                headers.append(NEW_TOKEN_HEADER, new_token)
+                if self.inject_body and _is_plain_json(headers):
+                    splice = _TokenBodySplice(message, new_token, send)
+                    return
+            await send(message)
+
+        await self.app(scope, receive, send_with_token)
+
+
+
+class QueryStatsMiddleware:
+    """统计每个请求执行的 SQL 条数与耗时，并检测疑似 N+1"""
+
+    def __init__(self, app, header: bool = False):
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(scope) as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start":
+                    # 按路由模板汇总（路由匹配后 scope 中才有 route），未匹配的请求按原始路径
+                    route = scope.get("route")
+                    n_plus_one_report.observe(scope["method"], getattr(route, "path", scope["path"]), stats)
+                    if self.header:
+                        MutableHeaders(scope=message).append(QUERY_STATS_HEADER, stats.header_value())
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+
+
+class MetricsMiddleware:
+    """按路由记录请求数、状态码、处理耗时（直到响应体发送完毕）与数据库耗时"""
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500  # 未发出响应头就抛出异常时，由外层 ServerErrorMiddleware 返回 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.in_flight -= 1
+            route = scope.get("route")
+            stats = current_query_stats()
+            registry.observe_request(
+                scope["method"], getattr(route, "path", UNMATCHED_ROUTE), status, time.perf_counter() - started,
+                stats.seconds if stats is not None else None, stats.count if stats is not None else 0
+            )
+
+
+
+class ProfilingMiddleware:
+    """按调试头或采样率剖析请求，结果写入剖析目录"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not should_profile(Headers(scope=scope).get(PROFILE_HEADER)):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = start_request_profile()
+        if profiler is None:  # 已有请求在剖析
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profiler.profile_id)
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            route = scope.get("route")
+            stats = current_query_stats()
+            await finish_request_profile(
+                profiler, scope["method"], getattr(route, "path", UNMATCHED_ROUTE), time.perf_counter() - started,
+                stats.count if stats is not None else 0
+            )
+
+
+
+class TrafficCaptureMiddleware:
+    """把每个请求（方法、路径、查询串、匿名身份、请求体结构、状态码、耗时）写入录制文件"""
+
+    def __init__(self, app, recorder: TrafficRecorder = traffic_recorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.recorder.excluded(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        recorder = self.recorder
+        status = 500
+        chunks, body_length = [], 0
+
+        async def receive_with_body():
+            nonlocal body_length
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                body_length += len(body)
+                if body_length <= recorder.max_body:
+                    chunks.append(body)
+            return message
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        concurrency = recorder.in_flight
+        recorder.in_flight += 1
+        started_at, started = time.time(), time.perf_counter()
+        try:
+            await self.app(scope, receive_with_body, send_with_status)
+        finally:
+            recorder.in_flight -= 1
+            seconds = time.perf_counter() - started
+            headers = Headers(scope=scope)
+            route = scope.get("route")
+            recorder.record(
+                started_at, scope["method"], scope["path"], scope["query_string"], headers.get("authorization"),
+                headers.get("content-type", ""), b"".join(chunks) if body_length <= recorder.max_body else None,
+                body_length, getattr(route, "path", UNMATCHED_ROUTE), status, seconds, concurrency
+            )
+
+
+
+def _is_plain_json(headers: MutableHeaders) -> bool:
+    """未压缩的 JSON 响应才拼接响应体"""
+    return headers.get("content-type", "").startswith("application/json") and "content-encoding" not in headers
+
+
+
+class _TokenBodySplice:
+    """
+    把 "new_token" 字段拼接到 JSON 对象响应体的结尾 '}' 之前（字段位于最后，与响应体中已有的同名字段冲突时以新令牌为准）
+    - 响应头消息暂缓发送，直到响应体开头确认是 JSON 对象（据此修正 Content-Length）；
+      暂存的只有开头的空白和 '{'，以及每个分块末尾的空白和 '}'
+    - 响应体不是 JSON 对象（如列表）时原样发送，仅保留响应头中的新令牌
+    """
+
+    def __init__(self, start_message: dict, new_token: str, send):
+        self._start = start_message
+        self._field = b'"new_token":' + json.dumps(new_token).encode()
+        self._send = send
+        self._mode = None         # None：尚未判断；"splice"：拼接；"passthrough"：原样发送
+        self._insertion = b""
+        self._pending = b""       # 判断之前收到的响应体
+        self._tail = b""          # 上一分块末尾暂缓发送的空白与 '}'
+
+    def _decide(self, data: bytes) -> bool:
+        """根据响应体开头决定是否拼接，数据不足以判断时返回 False"""
+        stripped = data.lstrip()
+        if not stripped:
+            return False
+        if stripped[:1] != b"{":
+            self._mode = "passthrough"
+            return True
+        members = stripped[1:].lstrip()
+        if not members:
+            return False
+        self._mode = "splice"
+        self._insertion = self._field if members[:1] == b"}" else b"," + self._field
+        return True
+
+    async def _send_start(self):
+        if self._mode == "splice":
+            headers = MutableHeaders(scope=self._start)
+            if "content-length" in headers:
+                headers["content-length"] = str(int(headers["content-length"]) + len(self._insertion))
+        await self._send(self._start)
+
+    async def __call__(self, message: dict):
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._mode is None:
+            self._pending += body
+            if not self._decide(self._pending):
+                if more_body:
+                    return
+                self._mode = "passthrough"  # 响应结束仍无法判断（如空响应体）
+            await self._send_start()
+            body, self._pending = self._pending, b""
+
+        if self._mode == "passthrough":
+            await self._send({**message, "body": body})
+            return
+
+        data = self._tail + body
+        stripped = data.rstrip()
+        if more_body:
+            # 结尾的 '}' 可能就是整个对象的结束符，连同其后的空白暂缓到下一分块
+            keep = len(stripped) - 1 if stripped.endswith(b"}") else len(stripped)
+            self._tail = data[keep:]
+            await self._send({**message, "body": data[:keep]})
+            return
+
+        self._tail = b""
+        body = stripped[:-1] + self._insertion + b"}" + data[len(stripped):]
+        await self._send({**message, "body": body})
@@ -0,0 +1,62 @@
+# app/migrations.py
+
+"""
+轻量级表结构升级：create_all 只会创建缺失的表，
+这里补齐已有表中缺失的列和索引、维护全文索引，并在新增列后执行必要的数据回填
+"""
+from imports import Session, inspect, CreateColumn
+from .database import Base
+from .counters import COUNTER_SOURCES, reconcile_article_counters
+from .fts import ensure_fts_schema
+
+
+
+def add_missing_columns(sync_engine) -> list[str]:
+    """为已存在的表补齐模型中新增的列（新增列必须可空或带 server_default），返回新增的列名"""
+    inspector = inspect(sync_engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with sync_engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=sync_engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+
+def create_missing_indexes(sync_engine):
+    """为已存在的表补建模型中新增的索引（create_all 只会为新建的表创建索引）"""
+    with sync_engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+
+def upgrade_schema(sync_engine) -> list[str]:
+    """启动时执行：建表 -> 补列 -> 补索引 -> 全文索引 -> 数据回填，返回本次新增的列名"""
+    Base.metadata.create_all(bind=sync_engine)
+    added = add_missing_columns(sync_engine)
+    create_missing_indexes(sync_engine)
+    ensure_fts_schema(sync_engine)  # 首次创建或分词器变化时会全量回填
+
+    # 新增的修改时间列为空，以创建时间回填（ETag / Last-Modified 依赖该列）
+    backfill = [column.split(".")[0] for column in added if column.endswith(".updated_at")]
+    if backfill:
+        with sync_engine.begin() as conn:
+            for table in backfill:
+                conn.exec_driver_sql(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL")
+
+    # 新增的文章计数列默认为 0，需要从来源表回填
+    if any(f"articles.{column}" in added for column in COUNTER_SOURCES):
+        with Session(sync_engine) as db:
+            reconcile_article_counters(db)
+            db.commit()
+    return added
@@ -10,6 +10,7 @@ from .comments import Comment
 from .tokens import TokenBlacklist
 from .messages import Message
 from .interactions import Like, Collect
+from .cache import CacheInvalidation
 
 
 
@@ -22,5 +23,6 @@ __all__ = [
     "TokenBlacklist", 
     "Message", 
     "Like", 
-    "Collect"
+    "Collect",
+    "CacheInvalidation"
 ]
\ No newline at end of file
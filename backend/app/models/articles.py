@@ -2,8 +2,8 @@
 
 """文章数据模型：存储文章内容、作者、分类等信息"""
 from .base import (
-    Column, Integer, String, DateTime, Text, ForeignKey,
-    relationship, Base, get_current_utc_time
+    Column, Integer, String, DateTime, Text, ForeignKey, Index,
+    relationship, Base, get_stored_utc_time, ROW_VERSION_BUMP
 )
 
 
@@ -21,6 +21,14 @@ class Article(Base):
     - owner_id: 作者ID（外键关联users表）
     - owner_name: 作者名（冗余存储，避免联表查询）
     - category_id: 分类ID（外键关联categories表，可选）
+    - like_count / collect_count / comment_count: 点赞/收藏/评论数（冗余计数，
+      与点赞/收藏/评论的增删在同一事务中维护，可用 manage.py reconcile-counters 校准）
+    - version / updated_at: 行版本号与最后修改时间（每次 UPDATE 时自动递增 / 刷新，用于 ETag / Last-Modified；
+      评论列表的变化也会递增所属文章的版本号）
+    
+    索引：
+    - (created_at, id)：最新文章 / 文章搜索结果的游标分页
+    - (category_id, created_at, id)：分类文章列表的游标分页
     
     关联关系：
     - owner: 关联文章作者（多对一）
@@ -33,11 +41,21 @@ class Article(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    created_at = Column(DateTime, default=get_current_utc_time, nullable=False)
+    created_at = Column(DateTime, default=get_stored_utc_time, nullable=False)
     content = Column(Text)
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner_name = Column(String, nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    like_count = Column(Integer, default=0, server_default="0", nullable=False)
+    collect_count = Column(Integer, default=0, server_default="0", nullable=False)
+    comment_count = Column(Integer, default=0, server_default="0", nullable=False)
+    version = Column(Integer, default=1, server_default="1", nullable=False, onupdate=ROW_VERSION_BUMP)
+    updated_at = Column(DateTime, default=get_stored_utc_time, onupdate=get_stored_utc_time, nullable=True)
+
+    __table_args__ = (
+        Index('ix_articles_created', 'created_at', 'id'),
+        Index('ix_articles_category_created', 'category_id', 'created_at', 'id'),
+    )
 
     # 关联关系（字符串引用避免循环依赖）
     owner = relationship("User", back_populates="articles")
@@ -3,16 +3,21 @@
 """基础配置：共享的数据库基类、工具函数和通用导入"""
 from imports import (
     Column, Integer, String, DateTime, Boolean, Text,
-    ForeignKey, UniqueConstraint, relationship
+    ForeignKey, UniqueConstraint, Index, relationship, literal_column
 )
 from app.database import Base
-from app.utils import get_current_utc_time
+from app.utils import get_current_utc_time, get_stored_utc_time
+
+
+
+# 行版本号的 onupdate：在 UPDATE 语句中原地加一（ORM 刷新与批量 UPDATE 都会带上，并发写入不会丢失递增）
+ROW_VERSION_BUMP = literal_column("version + 1")
 
 
 
 # 导出所有基础组件（方便其他模型文件导入）
 __all__ = [
     "Column", "Integer", "String", "DateTime", "Boolean", "Text",
-    "ForeignKey", "UniqueConstraint", "relationship",
-    "Base", "get_current_utc_time"
+    "ForeignKey", "UniqueConstraint", "Index", "relationship",
+    "Base", "get_current_utc_time", "get_stored_utc_time", "ROW_VERSION_BUMP"
 ]
\ No newline at end of file
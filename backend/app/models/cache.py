@@ -0,0 +1,34 @@
+# app/models/cache.py
+
+"""缓存失效事件模型：写事务中记录，其它 worker 轮询后失效各自的进程内缓存"""
+from .base import (
+    Column, Integer, String, DateTime,
+    Base, get_stored_utc_time
+)
+
+
+
+class CacheInvalidation(Base):
+    """
+    缓存失效事件
+    对应数据库表：cache_invalidations
+
+    字段说明：
+    - id: 主键ID，AUTOINCREMENT（删除最大行后 id 也不会被复用，worker 按 id 增量读取）
+    - namespace: 缓存命名空间（如 home / article / user）
+    - key: 失效的键（为空时整个命名空间失效）
+    - origin: 发布事件的进程标识（本进程已在提交后直接失效，轮询时跳过）
+    - created_at: 事件时间（用于统计传播延迟与清理旧事件）
+    """
+    __tablename__ = "cache_invalidations"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    namespace = Column(String, nullable=False)
+    key = Column(String, nullable=True)
+    origin = Column(String, nullable=False)
+    created_at = Column(DateTime, default=get_stored_utc_time, nullable=False, index=True)
+
+
+
+__all__ = ["CacheInvalidation"]
@@ -3,7 +3,7 @@
 """文章分类模型：管理文章的分类体系"""
 from .base import (
     Column, Integer, String, DateTime,
-    relationship, Base, get_current_utc_time
+    relationship, Base, get_stored_utc_time, ROW_VERSION_BUMP
 )
 
 
@@ -18,6 +18,7 @@ class Category(Base):
     - name: 分类名称（唯一、索引、非空）
     - description: 分类描述（可选）
     - created_at: 创建时间（默认当前UTC时间）
+    - version / updated_at: 行版本号与最后修改时间（每次 UPDATE 时自动递增 / 刷新，用于 ETag）
     
     关联关系：
     - articles: 关联该分类下的所有文章（一对多）
@@ -27,7 +28,9 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     description = Column(String, nullable=True)
-    created_at = Column(DateTime, default=get_current_utc_time, nullable=False)
+    created_at = Column(DateTime, default=get_stored_utc_time, nullable=False)
+    version = Column(Integer, default=1, server_default="1", nullable=False, onupdate=ROW_VERSION_BUMP)
+    updated_at = Column(DateTime, default=get_stored_utc_time, onupdate=get_stored_utc_time, nullable=True)
     
     # 关联文章（字符串引用避免循环依赖）
     articles = relationship("Article", back_populates="category")
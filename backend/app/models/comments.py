@@ -2,8 +2,8 @@
 
 """评论数据模型：存储文章的评论、回复信息"""
 from .base import (
-    Column, Integer, String, DateTime, Text, ForeignKey, UniqueConstraint,
-    relationship, Base, get_current_utc_time
+    Column, Integer, String, DateTime, Text, ForeignKey, UniqueConstraint, Index,
+    relationship, Base, get_stored_utc_time, ROW_VERSION_BUMP
 )
 
 
@@ -21,10 +21,14 @@ class Comment(Base):
     - content: 评论内容（非空）
     - article_id: 关联文章ID（外键关联articles表）
     - parent_id: 父评论ID（外键关联comments表，可选，用于回复）
+    - version / updated_at: 行版本号与最后修改时间（每次 UPDATE 时自动递增 / 刷新）
     
     约束：
     - (user_id, created_at) 组合唯一，避免重复评论
     
+    索引：
+    - (article_id, created_at, id)：文章评论列表的游标分页
+    
     关联关系：
     - user: 关联评论者（多对一）
     - article: 关联所属文章（多对一）
@@ -34,13 +38,16 @@ class Comment(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user_name = Column(String, nullable=False)
-    created_at = Column(DateTime, default=get_current_utc_time, nullable=False)
+    created_at = Column(DateTime, default=get_stored_utc_time, nullable=False)
     content = Column(Text, nullable=False)
     article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
     parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
+    version = Column(Integer, default=1, server_default="1", nullable=False, onupdate=ROW_VERSION_BUMP)
+    updated_at = Column(DateTime, default=get_stored_utc_time, onupdate=get_stored_utc_time, nullable=True)
     
     __table_args__ = (
         UniqueConstraint('user_id', 'created_at', name='uix_user_time'),
+        Index('ix_comments_article_created', 'article_id', 'created_at', 'id'),
     )
 
     # 关联关系
@@ -2,8 +2,8 @@
 
 """互动模型：管理用户对文章的点赞、收藏行为"""
 from .base import (
-    Column, Integer, DateTime, ForeignKey, UniqueConstraint,
-    relationship, Base, get_current_utc_time
+    Column, Integer, DateTime, ForeignKey, UniqueConstraint, Index,
+    relationship, Base, get_stored_utc_time
 )
 
 
@@ -21,16 +21,20 @@ class Like(Base):
     
     约束：
     - (user_id, article_id) 组合唯一，避免重复点赞
+    
+    索引：
+    - (user_id, created_at, id)：「我的点赞」列表的游标分页
     """
     __tablename__ = "likes"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
-    created_at = Column(DateTime, default=get_current_utc_time, nullable=False)
+    created_at = Column(DateTime, default=get_stored_utc_time, nullable=False)
     
     __table_args__ = (
         UniqueConstraint('user_id', 'article_id', name='uix_user_article_like'),
+        Index('ix_likes_user_created', 'user_id', 'created_at', 'id'),
     )
 
     # 关联关系
@@ -52,16 +56,20 @@ class Collect(Base):
     
     约束：
     - (user_id, article_id) 组合唯一，避免重复收藏
+    
+    索引：
+    - (user_id, created_at, id)：「我的收藏」列表的游标分页
     """
     __tablename__ = "collects"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
-    created_at = Column(DateTime, default=get_current_utc_time, nullable=False)
+    created_at = Column(DateTime, default=get_stored_utc_time, nullable=False)
     
     __table_args__ = (
         UniqueConstraint('user_id', 'article_id', name='uix_user_article_collect'),
+        Index('ix_collects_user_created', 'user_id', 'created_at', 'id'),
     )
 
     # 关联关系
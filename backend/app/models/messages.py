@@ -2,8 +2,8 @@
 
 """私信消息模型：存储用户间的私信沟通记录"""
 from .base import (
-    Column, Integer, DateTime, Boolean, Text, ForeignKey,
-    relationship, Base, get_current_utc_time
+    Column, Integer, DateTime, Boolean, Text, ForeignKey, Index,
+    relationship, Base, get_stored_utc_time
 )
 
 
@@ -21,6 +21,9 @@ class Message(Base):
     - created_at: 创建时间（默认当前UTC时间）
     - is_read: 是否已读（默认False）
     
+    索引：
+    - (receiver_id, created_at, id) / (sender_id, created_at, id)：收件箱/发件箱的游标分页
+    
     关联关系：
     - sender: 关联发送者（多对一）
     - receiver: 关联接收者（多对一）
@@ -31,9 +34,14 @@ class Message(Base):
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=get_current_utc_time, nullable=False)
+    created_at = Column(DateTime, default=get_stored_utc_time, nullable=False)
     is_read = Column(Boolean, default=False)
     
+    __table_args__ = (
+        Index('ix_messages_receiver_created', 'receiver_id', 'created_at', 'id'),
+        Index('ix_messages_sender_created', 'sender_id', 'created_at', 'id'),
+    )
+    
     # 关联发送者和接收者（指定外键避免歧义）
     sender = relationship("User", foreign_keys=[sender_id], backref="sent_messages")
     receiver = relationship("User", foreign_keys=[receiver_id], backref="received_messages")
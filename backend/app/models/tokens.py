@@ -3,7 +3,7 @@
 """令牌黑名单模型：管理已注销的JWT令牌，防止复用"""
 from .base import (
     Column, Integer, String, DateTime,
-    Base, get_current_utc_time
+    Base, get_stored_utc_time
 )
 
 
@@ -24,7 +24,7 @@ class TokenBlacklist(Base):
     id = Column(Integer, primary_key=True, index=True)
     jti = Column(String, unique=True, index=True, nullable=False)
     expires_at = Column(DateTime, nullable=False)
-    created_at = Column(DateTime, default=get_current_utc_time, nullable=False)
+    created_at = Column(DateTime, default=get_stored_utc_time, nullable=False)
 
 
 
@@ -0,0 +1,147 @@
+# app/pagination.py
+
+"""
+游标（keyset）分页：按排序列（通常为 created_at, id）倒序翻页
+
+- 客户端通过 ?limit=&cursor= 翻页，游标为不透明字符串（base64 编码的排序键）
+- 下一页游标通过响应头 X-Next-Cursor 返回，没有更多数据时不返回该响应头
+- 翻页条件为 (created_at, id) < (游标值)，配合复合索引，任意深度翻页都是一次索引范围扫描
+"""
+from imports import (
+    base64, json, datetime, Optional, HTTPException, Query, Response,
+    DateTime, Integer, Float, String, tuple_
+)
+from .config import PAGE_LIMIT_DEFAULT, PAGE_LIMIT_MAX
+
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+INVALID_CURSOR_DETAIL = "无效的分页游标"
+
+
+
+class PageParams:
+    """分页参数：每页条数 + 已解码的游标值（首页为 None）"""
+    __slots__ = ("limit", "cursor")
+
+    def __init__(self, limit: int, cursor: Optional[list] = None):
+        self.limit = limit
+        self.cursor = cursor
+
+
+
+def encode_cursor(values) -> str:
+    """将排序键编码为不透明游标"""
+    raw = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+
+def decode_cursor(cursor: str) -> list:
+    """解码游标，格式错误时抛出 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or not values:
+            raise ValueError
+        return values
+    except ValueError:
+        raise HTTPException(status_code=400, detail=INVALID_CURSOR_DETAIL)
+
+
+
+def get_page_params(
+    limit: int = Query(PAGE_LIMIT_DEFAULT, ge=1, le=PAGE_LIMIT_MAX, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 返回的游标"),
+) -> PageParams:
+    """分页参数依赖注入函数"""
+    return PageParams(limit, decode_cursor(cursor) if cursor else None)
+
+
+
+def _cursor_value(column, value):
+    """按排序列的类型校验并转换游标中的一项（DateTime 为 ISO 字符串，整数列为 int），类型不符时抛出 ValueError"""
+    column_type = column.type
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(column_type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError
+        return datetime.fromisoformat(value)
+    if isinstance(column_type, Integer):
+        if not isinstance(value, int):
+            raise ValueError
+    elif isinstance(column_type, Float):
+        if not isinstance(value, (int, float)):
+            raise ValueError
+    elif isinstance(column_type, String):
+        if not isinstance(value, str):
+            raise ValueError
+    return value
+
+
+
+def keyset_paginate(query, order_columns: tuple, page: PageParams, key=None, descending: bool = True):
+    """
+    对查询应用游标分页，返回 (本页数据, 下一页游标)
+    - order_columns：排序列，最后一列须唯一（通常为主键 id）
+    - key：从结果行提取排序键的函数，默认按列名读取行属性
+    - descending：默认倒序；相关度分数（bm25 越小越相关）等场景使用正序
+    """
+    if descending:
+        query = query.order_by(*(column.desc() for column in order_columns))
+    else:
+        query = query.order_by(*(column.asc() for column in order_columns))
+    if page.cursor is not None:
+        # 游标可由客户端任意构造：长度或类型与排序列不符时返回 400，而不是在转换 / 比较时出错变成 500
+        try:
+            if len(page.cursor) != len(order_columns):
+                raise ValueError
+            values = [_cursor_value(column, value) for column, value in zip(order_columns, page.cursor)]
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=INVALID_CURSOR_DETAIL)
+        if descending:
+            query = query.filter(tuple_(*order_columns) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*order_columns) > tuple_(*values))
+
+    # 多取一条用于判断是否还有下一页
+    rows = query.limit(page.limit + 1).all()
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    if key is None:
+        key = lambda row: [getattr(row, column.key) for column in order_columns]
+    return rows, encode_cursor(key(rows[-1]))
+
+
+
+def paginate_sorted(items: list, page: PageParams, key):
+    """
+    对已在内存中排好序的列表应用游标分页，返回 (本页数据, 下一页游标)
+    - key：返回排序键列表的函数，items 须按该排序键升序排列（最后一项须唯一）
+    """
+    if page.cursor is not None:
+        cursor = list(page.cursor)
+        try:
+            if any(isinstance(value, bool) or not isinstance(value, (int, float, str)) for value in cursor):
+                raise TypeError
+            if items and len(cursor) != len(key(items[0])):
+                raise TypeError
+            items = [item for item in items if key(item) > cursor]
+        except TypeError:  # 游标的长度或各项类型与排序键不符
+            raise HTTPException(status_code=400, detail=INVALID_CURSOR_DETAIL)
+    if len(items) <= page.limit:
+        return items, None
+    items = items[:page.limit]
+    return items, encode_cursor(key(items[-1]))
+
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """将下一页游标写入响应头"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
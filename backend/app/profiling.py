@@ -0,0 +1,176 @@
+# app/profiling.py
+
+"""
+按需请求剖析（cProfile）
+
+- 触发条件：请求携带有效的 X-Debug-Profile 调试头（HMAC 签名 + 过期时间，由 manage.py profile-token 生成），
+  或按 PROFILE_SAMPLE_RATE 随机选中；两者都未配置时不挂载中间件
+- 事件循环线程上同一时间只能运行一个 cProfile，已有请求在剖析时新的请求不再剖析；
+  事件循环线程的结果中会夹带同时在处理的其它请求的协程片段
+- 请求在线程池（run_db / 写队列关闭时的 run_write）和单写线程中执行的函数通过 profile_call
+  在各自线程中单独剖析，请求结束后合并到同一份结果
+- 结果为 pstats 格式（python -m pstats / snakeviz 打开），文件名包含剖析编号、路由、耗时与 SQL 条数，
+  目录中最多保留 PROFILE_MAX_FILES 个文件
+"""
+from imports import (
+    os, re, time, uuid, hmac, hashlib, random, threading, logging, cProfile, pstats,
+    ContextVar, Optional, run_in_threadpool
+)
+from .config import PROFILE_SECRET, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_MAX_FILES
+
+
+
+PROFILE_HEADER = "X-Debug-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_SUFFIX = ".prof"
+
+logger = logging.getLogger("blog_api")
+
+
+
+# -------------------------- 调试头签名 --------------------------
+def _signature(expires_at: int, secret: str) -> str:
+    return hmac.new(secret.encode(), str(expires_at).encode(), hashlib.sha256).hexdigest()
+
+
+
+def sign_profile_token(ttl_seconds: int, secret: str = PROFILE_SECRET) -> str:
+    """生成调试头的值："<过期时间戳>.<签名>" """
+    expires_at = int(time.time()) + ttl_seconds
+    return f"{expires_at}.{_signature(expires_at, secret)}"
+
+
+
+def verify_profile_token(value: str, secret: str = PROFILE_SECRET) -> bool:
+    """校验调试头：签名正确且未过期（未配置密钥时一律无效）"""
+    if not secret or not value:
+        return False
+    expires_at, _, signature = value.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires_at), secret))
+
+
+
+def should_profile(header_value: Optional[str]) -> bool:
+    """请求是否需要剖析：调试头有效，或被随机采样选中"""
+    if header_value is not None and verify_profile_token(header_value):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+
+# -------------------------- 单个请求的剖析 --------------------------
+class RequestProfiler:
+    """一个请求的剖析结果：事件循环线程的 cProfile 与各工作线程中单独剖析的结果"""
+
+    def __init__(self):
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.loop_profile = cProfile.Profile()
+        self._thread_profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._token = None
+
+    def run_in_thread(self, fn, *args):
+        """在当前工作线程中剖析执行 fn(*args)"""
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args)
+        finally:
+            with self._lock:
+                self._thread_profiles.append(profile)
+
+    def save(self, method: str, route: str, seconds: float, queries: int, directory: str = PROFILE_DIR) -> str:
+        """合并各线程的结果并写入文件，返回文件名（在线程池中调用，不阻塞事件循环）"""
+        stats = pstats.Stats(self.loop_profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+        name = f"{self.profile_id}_{method}_{slug}_{round(seconds * 1000)}ms_{queries}q{PROFILE_SUFFIX}"
+        os.makedirs(directory, exist_ok=True)
+        stats.dump_stats(os.path.join(directory, name))
+        _rotate(directory)
+        return name
+
+
+
+_active: ContextVar[Optional[RequestProfiler]] = ContextVar("request_profiler", default=None)
+_loop_busy = False  # 事件循环线程上是否已有请求在剖析（只在事件循环线程中读写）
+
+
+
+def start_request_profile() -> Optional[RequestProfiler]:
+    """开始剖析当前请求（已有请求在剖析时返回 None）"""
+    global _loop_busy
+    if _loop_busy:
+        return None
+    _loop_busy = True
+    profiler = RequestProfiler()
+    profiler._token = _active.set(profiler)
+    profiler.loop_profile.enable()
+    return profiler
+
+
+
+async def finish_request_profile(profiler: RequestProfiler, method: str, route: str, seconds: float, queries: int):
+    """停止剖析并在线程池中写入结果（写入失败只记录日志，不影响请求）"""
+    global _loop_busy
+    profiler.loop_profile.disable()
+    _active.reset(profiler._token)
+    _loop_busy = False
+    try:
+        name = await run_in_threadpool(profiler.save, method, route, seconds, queries)
+    except Exception:
+        logger.error(f"剖析结果写入失败 | {method} {route}", exc_info=True)
+        return
+    logger.info(f"请求剖析完成 | {method} {route} | {name}")
+
+
+
+def profile_call(fn, *args):
+    """在工作线程中执行 fn(*args)；发起它的请求正在剖析时，单独剖析这次调用并计入该请求"""
+    profiler = _active.get()
+    if profiler is None:
+        return fn(*args)
+    return profiler.run_in_thread(fn, *args)
+
+
+
+# -------------------------- 结果文件 --------------------------
+def _profile_files(directory: str) -> list[os.DirEntry]:
+    """目录中的剖析文件，按修改时间升序"""
+    if not os.path.isdir(directory):
+        return []
+    with os.scandir(directory) as entries:
+        files = [entry for entry in entries if entry.is_file() and entry.name.endswith(PROFILE_SUFFIX)]
+    return sorted(files, key=lambda entry: entry.stat().st_mtime)
+
+
+
+def _rotate(directory: str, max_files: int = PROFILE_MAX_FILES):
+    """删除超出数量上限的最旧文件"""
+    files = _profile_files(directory)
+    for entry in files[:max(0, len(files) - max_files)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # 其它 worker 已删除
+
+
+
+def list_profiles(directory: str = PROFILE_DIR) -> list[dict]:
+    """剖析文件列表，最新的在前"""
+    return [
+        {"name": entry.name, "bytes": entry.stat().st_size, "created_at": entry.stat().st_mtime}
+        for entry in reversed(_profile_files(directory))
+    ]
+
+
+
+def profile_path(name: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    """按文件名定位剖析文件（只接受目录中已有的文件名，拒绝路径穿越）"""
+    if os.path.basename(name) != name or not name.endswith(PROFILE_SUFFIX):
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.isfile(path) else None
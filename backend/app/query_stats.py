@@ -0,0 +1,192 @@
+# app/query_stats.py
+
+"""
+请求级 SQL 统计与 N+1 检测
+
+- 每个引擎挂载 before/after_cursor_execute 事件，把语句条数、耗时和语句形状记入当前请求的 QueryStats
+- 当前请求的统计通过 ContextVar 传递：run_in_threadpool、AsyncSession.run_sync 和写队列都会带上调用方的上下文，
+  所以线程池 / 写线程中执行的语句同样计入发起它的请求
+- 语句形状：把 IN (?, ?, ...) 折叠为 IN (?)，数字字面量替换为 ?，并压缩空白。同一请求中同一形状
+  重复 QUERY_N_PLUS_ONE_THRESHOLD 次及以上，就视为疑似 N+1（逐行懒加载的典型特征）
+- 请求由 QueryStatsMiddleware（app/middleware.py）开始统计。疑似 N+1 按路由汇总到 /monitor/queries；
+  QUERY_STATS_HEADER 开启时还会通过 X-Query-Stats 响应头返回，测试中用 parse_query_stats /
+  assert_query_budget 校验每个接口的查询预算
+"""
+from imports import (
+    re, time, threading, logging, Counter, OrderedDict, ContextVar, Optional, Union,
+    contextmanager, lru_cache, event
+)
+from .config import QUERY_N_PLUS_ONE_THRESHOLD, QUERY_N_PLUS_ONE_MAX_REPORTS
+
+
+
+QUERY_STATS_HEADER = "X-Query-Stats"
+_START_TIMES_KEY = "query_stats_start"
+
+logger = logging.getLogger("blog_api")
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+
+@lru_cache(maxsize=4096)
+def statement_shape(statement: str) -> str:
+    """语句形状：去掉参数个数与数字字面量的差异，同一段代码逐行发出的查询形状相同（SQLAlchemy 编译缓存使语句文本大量重复，按文本缓存）"""
+    shape = _NUMBER.sub("?", statement)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+
+class QueryStats:
+    """单个请求的 SQL 统计"""
+    __slots__ = ("count", "seconds", "shapes", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.scope = scope  # 所属请求的 ASGI scope（路由匹配后其中才有 route）
+
+    def route(self) -> str:
+        """发起语句的路由，如 "GET /articles/{article_id}"（未匹配路由时为原始路径）"""
+        if self.scope is None:
+            return "-"
+        return f"{self.scope['method']} {getattr(self.scope.get('route'), 'path', self.scope['path'])}"
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = QUERY_N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """重复次数达到阈值的语句形状（疑似 N+1），按重复次数降序"""
+        return [(shape, times) for shape, times in self.shapes.most_common() if times >= threshold]
+
+    def header_value(self) -> str:
+        return f"count={self.count}; time_ms={self.seconds * 1000:.2f}; n_plus_one={len(self.repeated())}"
+
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """当前请求的 SQL 统计（不在请求中时为 None）"""
+    return _current.get()
+
+
+
+@contextmanager
+def track_queries(scope: Optional[dict] = None):
+    """在 with 块内统计执行的 SQL（中间件为每个请求调用；脚本中也可直接使用）"""
+    stats = QueryStats(scope)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+
+# -------------------------- 引擎事件 --------------------------
+def install_query_stats(sync_engine):
+    """在引擎上挂载语句计时事件（不在请求中执行的语句直接跳过）"""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        starts = conn.info.get(_START_TIMES_KEY)
+        if stats is not None and starts:
+            stats.record(statement, time.perf_counter() - starts.pop())
+
+
+
+# -------------------------- 疑似 N+1 汇总 --------------------------
+class NPlusOneReport:
+    """按 (路由, 语句形状) 汇总疑似 N+1：出现过的请求数与单个请求内的最大重复次数"""
+
+    def __init__(self, max_entries: int = QUERY_N_PLUS_ONE_MAX_REPORTS):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._requests = 0
+        self._flagged_requests = 0
+
+    def observe(self, method: str, route: str, stats: QueryStats):
+        repeated = stats.repeated()
+        with self._lock:
+            self._requests += 1
+            if not repeated:
+                return
+            self._flagged_requests += 1
+            for shape, times in repeated:
+                key = (method, route, shape)
+                entry = self._entries.pop(key, None) or {"requests": 0, "max_times": 0}
+                entry["requests"] += 1
+                entry["max_times"] = max(entry["max_times"], times)
+                self._entries[key] = entry  # 最近出现的排在最后，超出上限时淘汰最久未出现的
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        for shape, times in repeated:
+            logger.warning(f"疑似 N+1 查询 | {method} {route} | 同一语句执行 {times} 次：{shape[:200]}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = [
+                {"method": method, "route": route, "statement": shape, **entry}
+                for (method, route, shape), entry in reversed(self._entries.items())
+            ]
+            return {
+                "threshold": QUERY_N_PLUS_ONE_THRESHOLD,
+                "requests": self._requests,
+                "flagged_requests": self._flagged_requests,
+                "n_plus_one": entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._requests = 0
+            self._flagged_requests = 0
+
+
+
+n_plus_one_report = NPlusOneReport()
+
+
+
+# -------------------------- 测试辅助 --------------------------
+def parse_query_stats(header: str) -> dict:
+    """解析 X-Query-Stats 响应头，如 "count=3; time_ms=0.41; n_plus_one=0" """
+    values = {}
+    for item in header.split(";"):
+        name, _, value = item.strip().partition("=")
+        values[name] = float(value) if "." in value else int(value)
+    return values
+
+
+
+def assert_query_budget(stats: Union[QueryStats, dict, str], max_queries: int, allow_n_plus_one: bool = False, label: str = ""):
+    """
+    断言一次请求的 SQL 条数不超过预算，且没有疑似 N+1
+    stats 可以是 QueryStats、parse_query_stats 的结果或 X-Query-Stats 响应头原文
+    """
+    if isinstance(stats, str):
+        stats = parse_query_stats(stats)
+    if isinstance(stats, QueryStats):
+        count, n_plus_one = stats.count, len(stats.repeated())
+    else:
+        count, n_plus_one = stats["count"], stats["n_plus_one"]
+    prefix = f"{label}：" if label else ""
+    if count > max_queries:
+        raise AssertionError(f"{prefix}执行了 {count} 条 SQL，超出预算 {max_queries}")
+    if n_plus_one and not allow_n_plus_one:
+        raise AssertionError(f"{prefix}发现 {n_plus_one} 种重复执行的语句（疑似 N+1）")
@@ -0,0 +1,112 @@
+# app/response_cache.py
+
+"""
+进程内响应缓存（缓存序列化好的 JSON 响应体及其 ETag，命中时条件请求直接返回 304）
+
+- 版本号失效：写事务提交后调用 invalidate() 递增版本号（可在任意线程调用），版本号与条目不一致即视为过期；
+  其它 worker 的写入经失效事件在轮询后失效（见 app/invalidation.py），管理脚本的修改由 TTL 兜底
+- stale-while-revalidate：条目过期后，第一个请求重新查询并写回，查询期间其它请求直接返回旧内容；
+  没有旧内容时（首次访问 / 已淘汰）并发请求等待同一次查询（single-flight），不重复查询
+- 查询开始时记下版本号，查询期间又有写入时写回的条目已过期，下一个请求会再刷新一次
+- get / 写回只在事件循环线程中执行，不加锁
+"""
+from imports import asyncio, threading, time, OrderedDict
+from .config import HOME_CACHE_TTL, HOME_CACHE_MAX_ENTRIES
+
+
+
+class _Entry:
+    __slots__ = ("value", "version", "created")
+
+    def __init__(self, value: tuple, version: int, created: float):
+        self.value = value
+        self.version = version
+        self.created = created
+
+
+
+class VersionedResponseCache:
+    """key -> (序列化好的响应体, ETag)，写入后按版本号整体失效"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._version = 0
+        self._version_lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._refreshing: dict = {}  # key -> 正在进行的查询（asyncio.Future）
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "errors": 0}
+        self.invalidations = 0
+
+    def invalidate(self):
+        """使所有条目过期（写事务提交后调用）"""
+        with self._version_lock:
+            self._version += 1
+            self.invalidations += 1
+
+    async def get(self, key, loader) -> tuple:
+        """返回 key 对应的 (响应体, ETag)；loader 为无参数的协程函数，重新查询并返回序列化好的 (响应体, ETag)"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == self._version and time.monotonic() - entry.created < self.ttl:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.value
+
+        pending = self._refreshing.get(key)
+        if pending is not None:
+            if entry is not None:
+                self._stats["stale_hits"] += 1
+                return entry.value
+            self._stats["coalesced"] += 1
+            await asyncio.wait((pending,))  # 不把发起查询的请求被取消传播给等待方
+            if not pending.cancelled():
+                return pending.result()  # 查询失败时抛出同一个异常
+            return await self.get(key, loader)
+
+        self._stats["misses" if entry is None else "refreshes"] += 1
+        return await self._load(key, loader)
+
+    async def _load(self, key, loader) -> tuple:
+        future = asyncio.get_running_loop().create_future()
+        self._refreshing[key] = future
+        version, created = self._version, time.monotonic()
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self._stats["errors"] += 1
+            future.set_exception(e)
+            future.exception()  # 标记异常已读取（没有等待方时不打印 "exception was never retrieved"）
+            raise
+        finally:
+            del self._refreshing[key]
+
+        self._entries[key] = _Entry(value, version, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        served = self._stats["hits"] + self._stats["stale_hits"] + self._stats["coalesced"]
+        lookups = served + self._stats["misses"] + self._stats["refreshes"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "version": self._version,
+            "invalidations": self.invalidations,
+            # 未查询数据库即返回的比例（含旧内容与等待同一次查询）
+            "hit_rate": round(served / lookups, 4) if lookups else None,
+            **self._stats,
+        }
+
+
+
+home_cache = VersionedResponseCache(HOME_CACHE_TTL, HOME_CACHE_MAX_ENTRIES)
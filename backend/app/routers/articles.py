@@ -1,12 +1,19 @@
 # app/routers/articles.py
 
-from imports import APIRouter, Depends, HTTPException, status, Session, func, Optional
+from imports import APIRouter, Depends, HTTPException, status, Session, func, Optional, Union, AsyncSession, select, exists, Request
 
 
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_read_db, run_db
+from ..writer import run_write
+from ..invalidation import invalidate_after_commit, update_index_after_commit, HOME_NAMESPACE, ARTICLE_NAMESPACE
+from ..trigram import title_index, owner_index
+from ..article_cache import article_cache, CachedArticle
+from ..config import ARTICLE_CACHE_ENABLED
 from ..auth import get_current_user
-from ..utils import check_category_exists, check_article_owner
+from ..utils import check_category_exists, check_article_owner, load_article_validator
+from ..serialization import schema_response
+from ..conditional import make_etag, validator_time, is_conditional, is_not_modified, validator_headers, not_modified
 
 
 
@@ -15,214 +22,275 @@ router = APIRouter()
 
 
 @router.post("", response_model=schemas.Article)
-def create_article(article: schemas.ArticleCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def create_article(article: schemas.ArticleCreate, current_user: models.User = Depends(get_current_user)):
     """创建新文章（需要用户登录）"""
     
     try:
         # 使用当前登录用户的ID作为文章作者，而不是依赖客户端提供
-        db_article = models.Article(
-            title=article.title,
-            content=article.content,
-            owner_id=current_user.id,  # 从认证系统获取当前用户ID
-            owner_name = current_user.username
-        )
-        
-        # 添加到数据库并提交
-        db.add(db_article)
-        db.commit()
-        db.refresh(db_article)  # 刷新获取数据库生成的ID等字段
-        
-        return db_article
+        return await run_write(_create_article, article, current_user.id, current_user.username)
     except Exception as e:
-        db.rollback()  # 回滚事务
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def _create_article(db: Session, article: schemas.ArticleCreate, owner_id: int, owner_name: str) -> schemas.Article:
+    db_article = models.Article(
+        title=article.title,
+        content=article.content,
+        owner_id=owner_id,  # 从认证系统获取当前用户ID
+        owner_name = owner_name
+    )
+    
+    # 添加到数据库（由写队列统一提交）
+    db.add(db_article)
+    db.flush()  # 获取数据库生成的ID等字段
+    update_index_after_commit(db, title_index, db_article.id, db_article.title)  # 提交成功后加入标题索引
+    update_index_after_commit(db, owner_index, owner_id, owner_name)  # 作者名索引（作者已有文章时为幂等更新）
+    invalidate_after_commit(db, HOME_NAMESPACE)  # 主页最新文章列表变化
+    
+    return schemas.Article.model_validate(db_article)
+
+
 
 @router.get("/{article_id}", response_model=schemas.ArticleWithStats)
-def read_article(
+async def read_article(
     article_id: int, 
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Union[AsyncSession, Session] = Depends(get_read_db),
     current_user: Optional[models.User] = Depends(get_current_user)  # 支持未登录用户
 ):
-    """获取文章详情（含点赞/收藏统计，仅登录用户可见评论）"""
-    # 1. 查询文章主数据
-    article = db.query(models.Article).filter(models.Article.id == article_id).first()
-    if not article:
-        raise HTTPException(status_code=404, detail="文章不存在")
-    
-    # 2. 计算点赞/收藏数
-    like_count = db.query(func.count(models.Like.id)).filter(
-        models.Like.article_id == article_id
-    ).scalar() or 0
-    
-    collect_count = db.query(func.count(models.Collect.id)).filter(
-        models.Collect.article_id == article_id
-    ).scalar() or 0
-    
-    # 3. 初始化状态变量
-    is_liked = False
-    is_collected = False
-    comments_response = None  # 未登录时返回None（符合Optional定义）
-    
-    # 4. 仅登录用户处理：互动状态 + 评论列表
-    if current_user:
-        # 4.1 检查当前用户点赞/收藏状态
-        is_liked = db.query(models.Like).filter(
-            models.Like.user_id == current_user.id,
-            models.Like.article_id == article_id
-        ).first() is not None
-        
-        is_collected = db.query(models.Collect).filter(
-            models.Collect.user_id == current_user.id,
-            models.Collect.article_id == article_id
-        ).first() is not None
-
-        # 4.2 查询文章评论（按创建时间倒序）
-        comments = db.query(models.Comment).filter(
-            models.Comment.article_id == article_id
-        ).order_by(models.Comment.created_at.desc()).all()
-        
-        # 4.3 转换为CommentMinimal模型（推荐用from_orm，避免手动映射错误）
-        # 核心：from_orm会自动匹配字段（id/content/user_name/user_id/article_id/parent_id/created_at）
-        comments_response = [schemas.CommentMinimal.from_orm(comment) for comment in comments]
-    
-    # 5. 构建最终响应
-    return {
-        **article.__dict__,  # 原始文章字段（id/owner_id/owner_name/created_at/category_id等）
-        "like_count": like_count,
-        "collect_count": collect_count,
+    """获取文章详情（含点赞/收藏/评论统计，仅登录用户可见评论；支持 If-None-Match / If-Modified-Since 条件请求）"""
+    user_id = current_user.id if current_user else None
+    cached = article_cache.get(article_id) if ARTICLE_CACHE_ENABLED else None
+
+    # 条件请求：校验器取自缓存，未命中时只查询版本列；未修改时不加载文章内容也不序列化
+    validator = cached.fields if cached is not None else None
+    if validator is None and is_conditional(request):
+        validator = await run_db(db, load_article_validator, article_id)
+    if validator is not None:
+        headers = _article_validator_headers(article_id, validator, user_id)
+        if is_not_modified(request, headers["ETag"], validator["updated_at"]):
+            return not_modified(headers)
+
+    if cached is not None and current_user is None:
+        # 匿名用户命中缓存：不查询数据库
+        return schema_response(
+            schemas.ArticleWithStats, _article_detail(cached.fields, None, False, False),
+            headers=_article_validator_headers(article_id, cached.fields, None)
+        )
+
+    started = article_cache.clock
+    fields, comments, is_liked, is_collected = await run_db(db, _load_article_detail, article_id, user_id, cached)
+    if ARTICLE_CACHE_ENABLED and (cached is None or (cached.comments is None and comments is not None)):
+        article_cache.put(article_id, fields, comments, started)
+    return schema_response(
+        schemas.ArticleWithStats, _article_detail(fields, comments, is_liked, is_collected),
+        headers=_article_validator_headers(article_id, fields, user_id)
+    )
+
+
+# 与浏览者无关、可缓存的文章字段（点赞/收藏/评论数为冗余计数列，无需额外 COUNT 查询），
+# 以及不返回、只用于生成 ETag / Last-Modified 的版本列
+ARTICLE_DETAIL_FIELDS = tuple(
+    name for name in schemas.ArticleWithStats.model_fields if name not in ("comments", "is_liked", "is_collected")
+) + ("version", "updated_at")
+
+
+def _article_validator_headers(article_id: int, fields: dict, user_id: Optional[int]) -> dict:
+    """
+    文章详情的 ETag：点赞 / 收藏 / 评论增删都会更新文章行（计数列），编辑评论、评论者注销也会递增文章版本号，
+    因此文章的版本号覆盖了评论列表与当前用户的互动状态；登录用户的响应另含浏览者 ID
+    """
+    etag = make_etag("article", article_id, fields["version"], validator_time(fields["updated_at"]), user_id)
+    return validator_headers(etag, fields["updated_at"], private=user_id is not None, vary="Authorization")
+
+
+def _load_article_detail(
+    db: Session, article_id: int, user_id: Optional[int], cached: Optional[CachedArticle]
+) -> tuple[dict, Optional[list[schemas.CommentMinimal]], bool, bool]:
+    """
+    查询文章详情中缓存未提供的部分（同步实现，由 run_db 调度执行）：
+    文章字段、评论列表（仅登录用户），以及当前用户的点赞/收藏状态
+    """
+    # 1. 文章主数据
+    if cached is None:
+        article = db.query(models.Article).filter(models.Article.id == article_id).first()
+        if not article:
+            raise HTTPException(status_code=404, detail="文章不存在")
+        fields = {name: getattr(article, name) for name in ARTICLE_DETAIL_FIELDS}
+        comments = None
+    else:
+        fields, comments = cached.fields, cached.comments
+
+    # 2. 仅登录用户：评论列表 + 互动状态
+    if user_id is None:
+        return fields, comments, False, False
+    if comments is None:
+        # 按创建时间倒序
+        comments = [
+            schemas.CommentMinimal.model_validate(comment)
+            for comment in db.query(models.Comment)
+                .filter(models.Comment.article_id == article_id)
+                .order_by(models.Comment.created_at.desc())
+        ]
+    # 点赞/收藏状态合并为一条查询
+    is_liked, is_collected = db.execute(select(
+        exists().where(models.Like.user_id == user_id, models.Like.article_id == article_id),
+        exists().where(models.Collect.user_id == user_id, models.Collect.article_id == article_id),
+    )).one()
+    return fields, comments, bool(is_liked), bool(is_collected)
+
+
+def _article_detail(fields: dict, comments: Optional[list], is_liked: bool, is_collected: bool) -> schemas.ArticleWithStats:
+    return schemas.ArticleWithStats.model_validate({
+        **fields,
         "is_liked": is_liked,
         "is_collected": is_collected,
-        "comments": comments_response  # 登录=评论列表，未登录=None
-    }
+        "comments": comments  # 登录=评论列表，未登录=None
+    })
 
 
 
 @router.put("/{article_id}", response_model=schemas.Article)
-def update_article(article_id: int, article: schemas.ArticleUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def update_article(article_id: int, article: schemas.ArticleUpdate, current_user: models.User = Depends(get_current_user)):
     """更新文章内容（需要登录且只能更新自己的文章）"""
     
     try:
-        # 查询指定ID的文章
-        db_article = db.query(models.Article).filter(models.Article.id == article_id).first()
-        
-        # 如果文章不存在，返回404错误
-        if db_article is None:
-            raise HTTPException(status_code=404, detail="Article not found")
-        
-        # 检查当前用户是否是文章的作者
-        if db_article.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to update this article"
-            )
-        
-        # 更新文章内容
-        db_article.title = article.title
-        db_article.content = article.content
-        
-        # 提交更改
-        db.commit()
-        db.refresh(db_article)
-        
-        return db_article
+        return await run_write(_update_article, article_id, article, current_user.id)
     except Exception as e:
-        db.rollback()  # 回滚事务
         raise HTTPException(status_code=400, detail=f"更新文章失败：{str(e)}")
 
 
+def _update_article(db: Session, article_id: int, article: schemas.ArticleUpdate, user_id: int) -> schemas.Article:
+    # 查询指定ID的文章
+    db_article = db.query(models.Article).filter(models.Article.id == article_id).first()
+    
+    # 如果文章不存在，返回404错误
+    if db_article is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    
+    # 检查当前用户是否是文章的作者
+    if db_article.owner_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update this article"
+        )
+    
+    # 更新文章内容
+    db_article.title = article.title
+    db_article.content = article.content
+    db.flush()
+    update_index_after_commit(db, title_index, db_article.id, db_article.title)
+    invalidate_after_commit(db, HOME_NAMESPACE)
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)
+    
+    return schemas.Article.model_validate(db_article)
+
+
 
 @router.delete("/{article_id}")
-def delete_article(article_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def delete_article(article_id: int, current_user: models.User = Depends(get_current_user)):
     """删除文章（需要登录且只能删除自己的文章）"""
     
     try:
-        # 查询指定ID的文章
-        db_article = db.query(models.Article).filter(models.Article.id == article_id).first()
-        
-        # 如果文章不存在，返回404错误
-        if db_article is None:
-            raise HTTPException(status_code=404, detail="Article not found")
-        
-        # 检查当前用户是否是文章的作者
-        if db_article.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to delete this article"
-            )
-        
-        # 删除文章（如果设置了级联删除，相关评论也会被自动删除）
-        db.delete(db_article)
-        db.commit()
-        
+        await run_write(_delete_article, article_id, current_user.id)
         return {"message": "Article deleted successfully"}
     except Exception as e:
-        db.rollback()  # 回滚事务
         raise HTTPException(status_code=400, detail=f"删除文章失败：{str(e)}")
 
 
+def _delete_article(db: Session, article_id: int, user_id: int):
+    # 查询指定ID的文章
+    db_article = db.query(models.Article).filter(models.Article.id == article_id).first()
+    
+    # 如果文章不存在，返回404错误
+    if db_article is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    
+    # 检查当前用户是否是文章的作者
+    if db_article.owner_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to delete this article"
+        )
+    
+    # 删除文章（如果设置了级联删除，相关评论也会被自动删除）
+    db.delete(db_article)
+    db.flush()
+    update_index_after_commit(db, title_index, article_id, None)
+    invalidate_after_commit(db, HOME_NAMESPACE)
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)
+
+
 
 # -------------------------- 为文章添加 / 删除分类 --------------------------
 @router.put("/{article_id}/category/id/{category_id}", response_model=schemas.Article)
-def set_article_category_by_id(
+async def set_article_category_by_id(
     article_id: int,
     category_id: int,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """为文章绑定分类（仅作者可操作）"""
     try:
-        category = check_category_exists(db, category_id)  # 调用辅助函数
-        article = check_article_owner(db, article_id, current_user.id)  # 调用辅助函数
-        article.category_id = category_id
-        db.commit()
-        db.refresh(article)
-        return article
+        return await run_write(_set_article_category_by_id, article_id, category_id, current_user.id)
     except Exception as e:
-        db.rollback()  # 回滚事务
         raise HTTPException(status_code=400, detail=f"为文章绑定分类失败：{str(e)}")
 
 
+def _set_article_category_by_id(db: Session, article_id: int, category_id: int, user_id: int) -> schemas.Article:
+    category = check_category_exists(db, category_id)  # 调用辅助函数
+    article = check_article_owner(db, article_id, user_id)  # 调用辅助函数
+    article.category_id = category_id
+    db.flush()
+    invalidate_after_commit(db, HOME_NAMESPACE)  # 主页分类的文章数变化
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)
+    return schemas.Article.model_validate(article)
+
+
 
 @router.put("/{article_id}/category/name/{category_name}", response_model=schemas.Article)
-def set_article_category_by_name(
+async def set_article_category_by_name(
     article_id: int,
     category_name: str,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """为文章绑定分类（仅作者可操作）"""
     try:
-        category = db.query(models.Category).filter(models.Category.name == category_name).first()
-        if not category:
-            raise HTTPException(status_code=404, detail=f"分类 '{category_name}' 不存在")
-        category_id = category.id
-        category = check_category_exists(db, category_id)  # 调用辅助函数
-        article = check_article_owner(db, article_id, current_user.id)  # 调用辅助函数
-        article.category_id = category_id
-        db.commit()
-        db.refresh(article)
-        return article
+        return await run_write(_set_article_category_by_name, article_id, category_name, current_user.id)
     except Exception as e:
-        db.rollback()  # 回滚事务
         raise HTTPException(status_code=400, detail=f"为文章绑定分类失败：{str(e)}")
 
 
+def _set_article_category_by_name(db: Session, article_id: int, category_name: str, user_id: int) -> schemas.Article:
+    category = db.query(models.Category).filter(models.Category.name == category_name).first()
+    if not category:
+        raise HTTPException(status_code=404, detail=f"分类 '{category_name}' 不存在")
+    category_id = category.id
+    category = check_category_exists(db, category_id)  # 调用辅助函数
+    article = check_article_owner(db, article_id, user_id)  # 调用辅助函数
+    article.category_id = category_id
+    db.flush()
+    invalidate_after_commit(db, HOME_NAMESPACE)  # 主页分类的文章数变化
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)
+    return schemas.Article.model_validate(article)
+
+
 
 @router.delete("/{article_id}/category", response_model=schemas.Article)
-def remove_article_category(
+async def remove_article_category(
     article_id: int,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """移除文章的分类（仅作者可操作）"""
     try:
-        article = check_article_owner(db, article_id, current_user.id)  # 调用辅助函数
-        article.category_id = None
-        db.commit()
-        db.refresh(article)
-        return article
+        return await run_write(_remove_article_category, article_id, current_user.id)
     except Exception as e:
-        db.rollback()  # 回滚事务
-        raise HTTPException(status_code=400, detail=f"移除文章的分类失败：{str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"移除文章的分类失败：{str(e)}")
+
+
+def _remove_article_category(db: Session, article_id: int, user_id: int) -> schemas.Article:
+    article = check_article_owner(db, article_id, user_id)  # 调用辅助函数
+    article.category_id = None
+    db.flush()
+    invalidate_after_commit(db, HOME_NAMESPACE)  # 主页分类的文章数变化
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)
+    return schemas.Article.model_validate(article)
\ No newline at end of file
@@ -1,11 +1,20 @@
 # app/routers/categories.py
 
-from imports import APIRouter, Depends, HTTPException, Session
+from imports import APIRouter, Depends, HTTPException, Session, Union, Optional, AsyncSession, load_only, select, Request
 from .. import models, schemas
-from ..database import get_db
-from ..schemas import Category, CategoryCreate
+from ..database import get_read_db, run_db
+from ..pagination import PageParams, get_page_params, keyset_paginate
+from ..writer import run_write
+from ..invalidation import invalidate_after_commit, HOME_NAMESPACE, ARTICLE_NAMESPACE
+from ..schemas import Category, CategoryCreate, CategoryListItem
 from ..auth import get_current_user
 from ..utils import check_category_exists, check_category_name_unique
+from ..serialization import schema_response
+from ..loading import (
+    CATEGORY_LIST_OPTIONS, CATEGORY_DETAIL_OPTIONS, ARTICLE_MINIMAL_COLUMNS, CATEGORY_VALIDATOR_COLUMNS,
+    category_article_counts, category_list_item, loaded_values
+)
+from ..conditional import make_etag, row_validator, is_conditional, is_not_modified, validator_headers, not_modified
 
 
 
@@ -14,85 +23,145 @@ router = APIRouter()
 
 
 @router.post("", response_model=Category)
-def create_category(
+async def create_category(
     category: CategoryCreate,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)  # 需登录
 ):
     """创建文章分类"""  
     try:
-        check_category_name_unique(db, category.name)  # 调用辅助函数
-        db_category = models.Category(**category.model_dump())
-        db.add(db_category)
-        db.commit()
-        db.refresh(db_category)
-        return db_category
+        return await run_write(_create_category, category)
     except Exception as e:
-        db.rollback()  # 回滚事务
         raise HTTPException(status_code=400, detail=f"创建分类失败: {str(e)}")
 
 
+def _create_category(db: Session, category: CategoryCreate) -> Category:
+    check_category_name_unique(db, category.name)  # 调用辅助函数
+    db_category = models.Category(**category.model_dump())
+    db.add(db_category)
+    db.flush()
+    invalidate_after_commit(db, HOME_NAMESPACE)  # 主页分类列表变化
+    return Category.model_validate({**loaded_values(db_category), "articles": []})  # 新分类下还没有文章
 
-@router.get("", response_model=list[Category])
-def get_all_categories(db: Session = Depends(get_db)):
-    """获取所有分类"""
+
+
+@router.get("", response_model=list[CategoryListItem])
+async def get_all_categories(request: Request, db: Union[AsyncSession, Session] = Depends(get_read_db)):
+    """获取所有分类（不附带分类下的文章，单个分类详情才返回；支持 If-None-Match 条件请求）"""
     try:
-        return db.query(models.Category).all()
+        if is_conditional(request):
+            # 只查询版本列，未修改时不加载分类内容
+            etag = await run_db(db, _load_categories_etag)
+            if is_not_modified(request, etag):
+                return not_modified(validator_headers(etag))
+        categories, etag = await run_db(db, _load_all_categories)
+        return schema_response(list[CategoryListItem], categories, headers=validator_headers(etag))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"获取分类失败: {str(e)}")
 
 
+def _load_all_categories(db: Session) -> tuple[list[CategoryListItem], str]:
+    categories = db.query(models.Category).options(*CATEGORY_LIST_OPTIONS).all()
+    counts = category_article_counts(db)
+    return (
+        [CategoryListItem.model_validate(category_list_item(category, counts)) for category in categories],
+        _categories_etag(categories, counts)
+    )
+
+
+def _load_categories_etag(db: Session) -> str:
+    return _categories_etag(db.execute(select(*CATEGORY_VALIDATOR_COLUMNS)).all(), category_article_counts(db))
+
+
+def _categories_etag(categories: list, counts: dict) -> str:
+    """分类列表的 ETag：全部分类的 (id, 版本号, 修改时间) 及文章数，只提供 ETag（删除分类时最大修改时间不变）"""
+    return make_etag("categories", sorted(row_validator(category) for category in categories), sorted(counts.items()))
+
+
 
 @router.get("/name/{name}/articles", response_model=list[schemas.ArticleMinimal])
-def get_articles_by_category_name(name: str, db: Session = Depends(get_db)):
-    """通过分类名称获取该分类下所有文章的摘要信息"""
+async def get_articles_by_category_name(
+    name: str,
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db)
+):
+    """通过分类名称分页获取该分类下文章的摘要信息（下一页游标见响应头 X-Next-Cursor）"""
     try:
-        # 查询分类是否存在
-        category = db.query(models.Category).filter(models.Category.name == name).first()
-        if not category:
-            raise HTTPException(status_code=404, detail=f"Category '{name}' not found")
-        
-        # 返回该分类下的所有文章（使用ArticleMinimal模型只返回摘要信息）
-        return category.articles
+        articles, next_cursor = await run_db(db, _load_category_articles_by_name, name, page)
+        return schema_response(list[schemas.ArticleMinimal], articles, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"获取分类失败: {str(e)}")
+
+
+def _load_category_articles_by_name(db: Session, name: str, page: PageParams) -> tuple[list[schemas.ArticleMinimal], Optional[str]]:
+    # 查询分类是否存在
+    category = db.query(models.Category).filter(models.Category.name == name).first()
+    if not category:
+        raise HTTPException(status_code=404, detail=f"Category '{name}' not found")
+    
+    return _paginate_category_articles(db, category.id, page)
     
 
 
 @router.get("/id/{id}/articles", response_model=list[schemas.ArticleMinimal])
-def get_articles_by_category_id(id: int, db: Session = Depends(get_db)):
-    """通过分类名称获取该分类下所有文章的摘要信息"""
+async def get_articles_by_category_id(
+    id: int,
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db)
+):
+    """通过分类ID分页获取该分类下文章的摘要信息（下一页游标见响应头 X-Next-Cursor）"""
     try:
-        # 查询分类是否存在
-        category = db.query(models.Category).filter(models.Category.id == id).first()
-        if not category:
-            raise HTTPException(status_code=404, detail=f"Category '{id}' not found")
-        
-        # 返回该分类下的所有文章（使用ArticleMinimal模型只返回摘要信息）
-        return category.articles
+        articles, next_cursor = await run_db(db, _load_category_articles_by_id, id, page)
+        return schema_response(list[schemas.ArticleMinimal], articles, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"获取分类失败: {str(e)}")
 
 
+def _load_category_articles_by_id(db: Session, id: int, page: PageParams) -> tuple[list[schemas.ArticleMinimal], Optional[str]]:
+    # 查询分类是否存在
+    category = db.query(models.Category).filter(models.Category.id == id).first()
+    if not category:
+        raise HTTPException(status_code=404, detail=f"Category '{id}' not found")
+    
+    return _paginate_category_articles(db, category.id, page)
+
+
+
+def _paginate_category_articles(db: Session, category_id: int, page: PageParams):
+    """按 (created_at, id) 倒序分页读取分类下的文章（使用ArticleMinimal模型只返回摘要信息）"""
+    query = db.query(models.Article).options(load_only(*ARTICLE_MINIMAL_COLUMNS)).filter(models.Article.category_id == category_id)
+    articles, next_cursor = keyset_paginate(query, (models.Article.created_at, models.Article.id), page)
+    return [schemas.ArticleMinimal.model_validate(article) for article in articles], next_cursor
+
+
 
 @router.get("/{category_id}", response_model=Category)
-def get_category(category_id: int, db: Session = Depends(get_db)):
+async def get_category(category_id: int, db: Union[AsyncSession, Session] = Depends(get_read_db)):
     """获取单个分类详情"""
     try:
-        return check_category_exists(db, category_id)
+        return schema_response(Category, await run_db(db, _load_category, category_id))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"获取分类失败: {str(e)}")
+
+
+def _load_category(db: Session, category_id: int) -> Category:
+    return Category.model_validate(check_category_exists(db, category_id, *CATEGORY_DETAIL_OPTIONS))
     
 
 
 @router.delete("/{category_id}")
-def delete_category(category_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def delete_category(category_id: int, current_user: models.User = Depends(get_current_user)):
     """删除单个分类"""
     try:
-        category = check_category_exists(db, category_id)
-        db.delete(category)
-        db.commit()
+        await run_write(_delete_category, category_id)
         return {"message": "分类删除成功"}
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail=f"删除分类失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"删除分类失败: {str(e)}")
+
+
+def _delete_category(db: Session, category_id: int):
+    category = check_category_exists(db, category_id)
+    # 分类下文章的 category_id 随删除置空，这些文章的详情缓存一并失效
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, *(article.id for article in category.articles))
+    db.delete(category)
+    db.flush()
+    invalidate_after_commit(db, HOME_NAMESPACE)
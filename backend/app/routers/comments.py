@@ -1,10 +1,20 @@
 # app/routers/comments.py
 
-from imports import APIRouter, Depends, HTTPException, status, Session
+from imports import APIRouter, Depends, HTTPException, status, Session, Union, Optional, AsyncSession, load_only, Request
 
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_read_db, run_db
+from ..pagination import PageParams, get_page_params, keyset_paginate
+from ..writer import run_write
+from ..invalidation import invalidate_after_commit, HOME_NAMESPACE, ARTICLE_NAMESPACE
+from ..counters import bump_article_counter, bump_article_versions
 from ..auth import get_current_user
+from ..utils import load_article_validator
+from ..serialization import schema_response
+from ..loading import COMMENT_OPTIONS, ARTICLE_COMMENTS_OPTIONS, ARTICLE_MINIMAL_COLUMNS, ARTICLE_VALIDATOR_COLUMNS
+from ..article_cache import article_cache
+from ..config import ARTICLE_CACHE_ENABLED
+from ..conditional import make_etag, validator_time, is_conditional, is_not_modified, validator_headers, not_modified
 
 
 
@@ -14,145 +24,202 @@ router = APIRouter()
 
 
 @router.post("", response_model=schemas.Comment)
-def create_comment(comment: schemas.CommentCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def create_comment(comment: schemas.CommentCreate, current_user: models.User = Depends(get_current_user)):
     """创建新评论（需要用户登录）"""
     if not current_user:
         raise HTTPException(status_code=401, detail="未登录或登录状态已过期，请重新登录")
     try:
-        # 验证文章是否存在
-        db_article = db.query(models.Article).filter(models.Article.id == comment.article_id).first()
-        if not db_article:
-            raise HTTPException(status_code=404, detail="Article not found")
-        
-        # 如果提供了parent_id，验证父评论是否存在且属于同一文章
-        if comment.parent_id:
-            db_parent_comment = db.query(models.Comment).filter(
-                models.Comment.id == comment.parent_id,
-                models.Comment.article_id == comment.article_id
-            ).first()
-            if not db_parent_comment:
-                raise HTTPException(status_code=404, detail="Parent comment not found or does not belong to this article")
-        
-        # 创建评论对象，使用当前登录用户的ID
-        db_comment = models.Comment(
-            content=comment.content,
-            article_id=comment.article_id,
-            parent_id=comment.parent_id,
-            user_id=current_user.id,  # 使用认证系统中的当前用户ID
-            user_name=current_user.username  # 使用认证系统中的当前用户名
-        )
-        
-        # 添加到数据库
-        db.add(db_comment)
-        db.commit()
-        db.refresh(db_comment)
-        
-        return db_comment
+        return await run_write(_create_comment, comment, current_user.id, current_user.username)
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"发布评论失败:{str(e)}")
 
 
+def _create_comment(db: Session, comment: schemas.CommentCreate, user_id: int, user_name: str) -> schemas.Comment:
+    # 验证文章是否存在
+    db_article = db.query(models.Article).filter(models.Article.id == comment.article_id).first()
+    if not db_article:
+        raise HTTPException(status_code=404, detail="Article not found")
+    
+    # 如果提供了parent_id，验证父评论是否存在且属于同一文章
+    if comment.parent_id:
+        db_parent_comment = db.query(models.Comment).filter(
+            models.Comment.id == comment.parent_id,
+            models.Comment.article_id == comment.article_id
+        ).first()
+        if not db_parent_comment:
+            raise HTTPException(status_code=404, detail="Parent comment not found or does not belong to this article")
+    
+    # 创建评论对象，使用当前登录用户的ID
+    db_comment = models.Comment(
+        content=comment.content,
+        article_id=comment.article_id,
+        parent_id=comment.parent_id,
+        user_id=user_id,  # 使用认证系统中的当前用户ID
+        user_name=user_name  # 使用认证系统中的当前用户名
+    )
+    
+    # 添加到数据库（由写队列统一提交），同一事务内维护文章评论数
+    db.add(db_comment)
+    bump_article_counter(db, comment.article_id, "comment_count", 1)
+    invalidate_after_commit(db, HOME_NAMESPACE)  # 主页文章评论数变化
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, comment.article_id)  # 文章详情的评论列表与评论数变化
+    db.flush()
+    
+    return schemas.Comment.model_validate(db_comment)
+
+
 
 @router.get("/{comment_id}", response_model=schemas.Comment)
-def get_comment(comment_id: int, db: Session = Depends(get_db)):
+async def get_comment(comment_id: int, db: Union[AsyncSession, Session] = Depends(get_read_db)):
     """根据ID获取评论详情（无需登录）"""
     try:
-        db_comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
-        if not db_comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
-        
-        return db_comment
+        return schema_response(schemas.Comment, await run_db(db, _load_comment, comment_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取评论失败:{str(e)}")
+
+
+def _load_comment(db: Session, comment_id: int) -> schemas.Comment:
+    db_comment = db.query(models.Comment).options(*COMMENT_OPTIONS).filter(models.Comment.id == comment_id).first()
+    if not db_comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    
+    return schemas.Comment.model_validate(db_comment)
     
 
 
 @router.get("/article/{article_id}", response_model=list[schemas.Comment])
-def get_comments_by_article(article_id: int, db: Session = Depends(get_db)):
-    """根据文章ID获取所有评论（无需登录）"""
+async def get_comments_by_article(
+    article_id: int,
+    request: Request,
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db)
+):
+    """
+    根据文章ID分页获取评论，按发布时间倒序（无需登录，下一页游标见响应头 X-Next-Cursor）
+    支持 If-None-Match / If-Modified-Since 条件请求：评论的增删改都会递增所属文章的版本号，以文章的版本列为校验器
+    """
     try:
-        # 验证文章是否存在
-        db_article = db.query(models.Article).filter(models.Article.id == article_id).first()
-        if not db_article:
-            raise HTTPException(status_code=404, detail="Article not found")
-        
-        # 获取该文章的所有评论
-        comments = db.query(models.Comment).filter(models.Comment.article_id == article_id).all()
-        
-        return comments
+        if is_conditional(request):
+            cached = article_cache.get(article_id) if ARTICLE_CACHE_ENABLED else None
+            validator = cached.fields if cached is not None else await run_db(db, load_article_validator, article_id)
+            headers = _comments_validator_headers(article_id, validator, page)
+            if is_not_modified(request, headers["ETag"], validator["updated_at"]):
+                return not_modified(headers)
+
+        comments, next_cursor, validator = await run_db(db, _load_comments_by_article, article_id, page)
+        return schema_response(
+            list[schemas.Comment], comments, next_cursor, headers=_comments_validator_headers(article_id, validator, page)
+        )
+    except HTTPException:
+        # 主动抛出的 400 / 404（无效游标、资源不存在）直接向上抛
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取评论失败:{str(e)}")
 
 
+def _comments_validator_headers(article_id: int, validator: dict, page: PageParams) -> dict:
+    etag = make_etag(
+        "comments", article_id, validator["version"], validator_time(validator["updated_at"]), page.limit, page.cursor
+    )
+    return validator_headers(etag, validator["updated_at"])
+
+
+def _load_comments_by_article(
+    db: Session, article_id: int, page: PageParams
+) -> tuple[list[schemas.Comment], Optional[str], dict]:
+    """返回 (本页评论, 下一页游标, 文章的版本列)"""
+    # 验证文章是否存在（只取极简模型与版本列，评论的 article 关联直接复用会话中的这个对象）
+    db_article = db.query(models.Article).options(load_only(*ARTICLE_MINIMAL_COLUMNS, *ARTICLE_VALIDATOR_COLUMNS))\
+        .filter(models.Article.id == article_id).first()
+    if not db_article:
+        raise HTTPException(status_code=404, detail="Article not found")
+    
+    # 按 (created_at, id) 倒序分页获取该文章的评论（评论者一条 IN 查询批量加载，查询数不随评论数增长）
+    query = db.query(models.Comment).options(*ARTICLE_COMMENTS_OPTIONS).filter(models.Comment.article_id == article_id)
+    comments, next_cursor = keyset_paginate(query, (models.Comment.created_at, models.Comment.id), page)
+    
+    validator = {"version": db_article.version, "updated_at": db_article.updated_at}
+    return [schemas.Comment.model_validate(comment) for comment in comments], next_cursor, validator
+
+
 
 @router.put("/{comment_id}", response_model=schemas.Comment)
-def update_comment(
+async def update_comment(
     comment_id: int, 
     comment: schemas.CommentUpdate, 
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)  # 需要登录
 ):
     """更新评论内容（只能更新自己的评论）"""
     try:
-        db_comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
-        if not db_comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
-        
-        # 检查当前用户是否是评论的作者
-        if db_comment.user_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to update this comment"
-            )
-        
-        # 更新评论内容
-        db_comment.content = comment.content
-        db.commit()
-        db.refresh(db_comment)
-        
-        return db_comment
+        return await run_write(_update_comment, comment_id, comment, current_user.id)
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"更新评论失败:{str(e)}")
 
 
+def _update_comment(db: Session, comment_id: int, comment: schemas.CommentUpdate, user_id: int) -> schemas.Comment:
+    db_comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
+    if not db_comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    
+    # 检查当前用户是否是评论的作者
+    if db_comment.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update this comment"
+        )
+    
+    # 更新评论内容（评论列表属于文章的内容，同时递增文章版本号，使文章详情与评论列表的 ETag 变化）
+    db_comment.content = comment.content
+    bump_article_versions(db, db_comment.article_id)
+    db.flush()
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, db_comment.article_id)
+    
+    return schemas.Comment.model_validate(db_comment)
+
+
 
 @router.delete("/{comment_id}")
-def delete_comment(
+async def delete_comment(
     comment_id: int, 
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)  # 需要登录
 ):
     """删除评论（只能删除自己的评论）"""
     try:
-        delete_nested_comments(db, comment_id)
-        db_comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
-        if not db_comment:
-            raise HTTPException(status_code=404, detail="Comment not found")
-        
-        # 检查当前用户是否是评论的作者
-        if db_comment.user_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to delete this comment"
-            )
-        
-        # 先删除所有回复
-        db.query(models.Comment).filter(models.Comment.parent_id == comment_id).delete()
-        
-        # 删除评论
-        db.delete(db_comment)
-        db.commit()
-        
+        await run_write(_delete_comment, comment_id, current_user.id)
         return {"message": "Comment deleted successfully"}
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"删除评论失败:{str(e)}")
+
+
+def _delete_comment(db: Session, comment_id: int, user_id: int):
+    deleted_replies = delete_nested_comments(db, comment_id)
+    db_comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
+    if not db_comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    
+    # 检查当前用户是否是评论的作者
+    if db_comment.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to delete this comment"
+        )
+    
+    # 先删除所有回复
+    db.query(models.Comment).filter(models.Comment.parent_id == comment_id).delete()
+    
+    # 删除评论，同一事务内扣减文章评论数（评论本身 + 所有嵌套回复）
+    db.delete(db_comment)
+    bump_article_counter(db, db_comment.article_id, "comment_count", -(deleted_replies + 1))
+    invalidate_after_commit(db, HOME_NAMESPACE)
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, db_comment.article_id)
+    db.flush()
     
-def delete_nested_comments(db: Session, parent_id: int):
-    """递归删除所有嵌套回复"""
+def delete_nested_comments(db: Session, parent_id: int) -> int:
+    """递归删除所有嵌套回复，返回删除的回复数量"""
+    deleted = 0
     child_comments = db.query(models.Comment).filter(models.Comment.parent_id == parent_id).all()
     for child in child_comments:
-        delete_nested_comments(db, child.id)  # 递归删除子回复
-        db.delete(child)
\ No newline at end of file
+        deleted += delete_nested_comments(db, child.id)  # 递归删除子回复
+        db.delete(child)
+        deleted += 1
+    return deleted
\ No newline at end of file
@@ -1,9 +1,17 @@
 # app/routers/home.py
 
-from imports import APIRouter, Depends, desc, Session, HTTPException, func
+from imports import APIRouter, Depends, desc, Session, HTTPException, Union, AsyncSession, load_only, Response, Request, select
 from .. import models
-from ..database import get_db
+from ..database import get_read_db, run_db
 from ..schemas import HomeResponse
+from ..loading import (
+    CATEGORY_LIST_OPTIONS, ARTICLE_STATS_COLUMNS, ARTICLE_VALIDATOR_COLUMNS, CATEGORY_VALIDATOR_COLUMNS,
+    category_article_counts, category_list_item
+)
+from ..serialization import dump_json
+from ..response_cache import home_cache
+from ..config import HOME_CACHE_ENABLED
+from ..conditional import make_etag, row_validator, is_conditional, is_not_modified, validator_headers, not_modified
 
 
 
@@ -12,64 +20,69 @@ router = APIRouter()
 
 
 @router.get("", response_model=HomeResponse)
-def get_homepage(db: Session = Depends(get_db), latest_limit: int = 10):
-    """获取博客主页数据（包含文章点赞和收藏数）"""
+async def get_homepage(request: Request, db: Union[AsyncSession, Session] = Depends(get_read_db), latest_limit: int = 10):
+    """获取博客主页数据（包含文章点赞和收藏数；支持 If-None-Match 条件请求）"""
     try:
-        # 获取所有分类
-        categories = db.query(models.Category).all()
-        
-        # 1. 查询最新文章
-        latest_articles = db.query(models.Article)\
-            .order_by(models.Article.created_at.desc())\
-            .limit(latest_limit)\
-            .all()
-        
-        # 提取文章ID列表
-        article_ids = [article.id for article in latest_articles]
-        
-        if not article_ids:
-            # 没有文章时直接返回
-            return {
-                "categories": categories,
-                "latest_articles": []
-            }
-        
-        # 2. 统计每篇文章的点赞数
-        like_counts = db.query(
-            models.Like.article_id,
-            func.count(models.Like.id).label('count')
-        ).filter(
-            models.Like.article_id.in_(article_ids)
-        ).group_by(
-            models.Like.article_id
-        ).all()
-        
-        # 转换为字典便于查找
-        like_count_dict = {item.article_id: item.count for item in like_counts}
-        
-        # 3. 统计每篇文章的收藏数
-        collect_counts = db.query(
-            models.Collect.article_id,
-            func.count(models.Collect.id).label('count')
-        ).filter(
-            models.Collect.article_id.in_(article_ids)
-        ).group_by(
-            models.Collect.article_id
-        ).all()
-        
-        # 转换为字典便于查找
-        collect_count_dict = {item.article_id: item.count for item in collect_counts}
-        
-        # 4. 为每篇文章添加点赞数和收藏数字段
-        for article in latest_articles:
-            # 动态添加属性
-            article.like_count = like_count_dict.get(article.id, 0)
-            article.collect_count = collect_count_dict.get(article.id, 0)
-        
-        return {
-            "categories": categories,
-            "latest_articles": latest_articles
-        }
-        
+        if HOME_CACHE_ENABLED:
+            async def load() -> tuple:
+                home, etag = await run_db(db, _load_homepage, latest_limit)
+                return dump_json(HomeResponse, home), etag
+
+            # 命中时直接返回缓存的响应体与 ETag，不查询数据库也不重新序列化（写入后的失效见 app/response_cache.py）
+            body, etag = await home_cache.get(latest_limit, load)
+        else:
+            if is_conditional(request):
+                # 只查询分类与最新文章的版本列，未修改时不加载内容
+                etag = await run_db(db, _load_homepage_etag, latest_limit)
+                if is_not_modified(request, etag):
+                    return not_modified(validator_headers(etag))
+            home, etag = await run_db(db, _load_homepage, latest_limit)
+            body = dump_json(HomeResponse, home)
+
+        # 只提供 ETag：文章 / 分类被删除时最大修改时间不变，Last-Modified 无法反映
+        headers = validator_headers(etag)
+        if is_not_modified(request, etag):
+            return not_modified(headers)
+        return Response(body, media_type="application/json", headers=headers)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"获取主页数据失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"获取主页数据失败: {str(e)}")
+
+
+
+def _load_homepage(db: Session, latest_limit: int) -> tuple[HomeResponse, str]:
+    """查询主页数据（同步实现，由 run_db 调度执行），返回 (主页数据, ETag)"""
+    # 获取所有分类（不附带分类下的文章，只返回文章数；分类文章列表见 /categories/id/{id}/articles 分页接口）
+    categories = db.query(models.Category).options(*CATEGORY_LIST_OPTIONS).all()
+    counts = category_article_counts(db)
+    
+    # 1. 查询最新文章（点赞/收藏数直接读取文章上的冗余计数列，不加载正文；版本列只用于生成 ETag）
+    latest_articles = db.query(models.Article)\
+        .options(load_only(*ARTICLE_STATS_COLUMNS, *ARTICLE_VALIDATOR_COLUMNS))\
+        .order_by(models.Article.created_at.desc())\
+        .limit(latest_limit)\
+        .all()
+    
+    home = HomeResponse.model_validate({
+        "categories": [category_list_item(category, counts) for category in categories],
+        "latest_articles": latest_articles
+    })
+    return home, _homepage_etag(latest_limit, categories, counts, latest_articles)
+
+
+def _load_homepage_etag(db: Session, latest_limit: int) -> str:
+    """只查询分类与最新文章的版本列及分类文章数（条件请求且未启用主页缓存时）"""
+    categories = db.execute(select(*CATEGORY_VALIDATOR_COLUMNS)).all()
+    counts = category_article_counts(db)
+    latest_articles = db.execute(
+        select(*ARTICLE_VALIDATOR_COLUMNS).order_by(models.Article.created_at.desc()).limit(latest_limit)
+    ).all()
+    return _homepage_etag(latest_limit, categories, counts, latest_articles)
+
+
+def _homepage_etag(latest_limit: int, categories: list, counts: dict, latest_articles: list) -> str:
+    """主页的 ETag：全部分类与最新文章的 (id, 版本号, 修改时间) 及分类文章数；增删行时集合本身变化"""
+    return make_etag(
+        "home", latest_limit,
+        sorted(row_validator(category) for category in categories), sorted(counts.items()),
+        [row_validator(article) for article in latest_articles],
+    )
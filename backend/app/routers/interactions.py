@@ -1,9 +1,15 @@
 # app/routers/interactions.py
 
-from imports import APIRouter, Depends, HTTPException, Session
+from imports import APIRouter, Depends, HTTPException, Session, Union, Optional, AsyncSession, load_only
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_read_db, run_db
+from ..pagination import PageParams, get_page_params, keyset_paginate
+from ..writer import run_write
+from ..invalidation import invalidate_after_commit, HOME_NAMESPACE, ARTICLE_NAMESPACE
+from ..counters import bump_article_counter
 from ..auth import get_current_user
+from ..serialization import schema_response
+from ..loading import ARTICLE_MINIMAL_COLUMNS
 
 
 
@@ -13,205 +19,267 @@ router = APIRouter()
 
 # -------------------------- 点赞功能 --------------------------
 @router.post("/likes", response_model=schemas.Like)
-def like_article(
+async def like_article(
     like: schemas.LikeCreate,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """点赞文章"""
     try:
-        # 检查文章是否存在
-        article = db.query(models.Article).filter(models.Article.id == like.article_id).first()
-        if not article:
-            raise HTTPException(status_code=404, detail="文章不存在")
-        
-        # 检查是否已点赞
-        existing_like = db.query(models.Like).filter(
-            models.Like.user_id == current_user.id,
-            models.Like.article_id == like.article_id
-        ).first()
-        if existing_like:
-            raise HTTPException(status_code=400, detail="已点赞该文章")
-        
-        # 创建点赞记录
-        db_like = models.Like(
-            user_id=current_user.id,
-            article_id=like.article_id
-        )
-        db.add(db_like)
-        db.commit()
-        db.refresh(db_like)
-        return db_like
+        return await run_write(_like_article, like.article_id, current_user.id)
+    except HTTPException:
+        # 主动抛出的 404 / 400（文章不存在、重复操作）直接向上抛
+        raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _like_article(db: Session, article_id: int, user_id: int) -> schemas.Like:
+    # 检查文章是否存在
+    article = db.query(models.Article).filter(models.Article.id == article_id).first()
+    if not article:
+        raise HTTPException(status_code=404, detail="文章不存在")
+    
+    # 检查是否已点赞
+    existing_like = db.query(models.Like).filter(
+        models.Like.user_id == user_id,
+        models.Like.article_id == article_id
+    ).first()
+    if existing_like:
+        raise HTTPException(status_code=400, detail="已点赞该文章")
+    
+    # 创建点赞记录
+    db_like = models.Like(
+        user_id=user_id,
+        article_id=article_id
+    )
+    db.add(db_like)
+    bump_article_counter(db, article_id, "like_count", 1)
+    invalidate_after_commit(db, HOME_NAMESPACE)  # 主页文章计数变化
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)  # 文章详情的计数变化
+    db.flush()
+    return schemas.Like.model_validate(db_like)
+
+
 
 @router.delete("/likes/{article_id}")
-def unlike_article(
+async def unlike_article(
     article_id: int,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """取消点赞"""
     try:
-        like = db.query(models.Like).filter(
-            models.Like.user_id == current_user.id,
-            models.Like.article_id == article_id
-        ).first()
-        if not like:
-            raise HTTPException(status_code=404, detail="未点赞该文章")
-        
-        db.delete(like)
-        db.commit()
+        await run_write(_unlike_article, article_id, current_user.id)
         return {"message": "取消点赞成功"}
+    except HTTPException:
+        # 主动抛出的 404 / 400（文章不存在、重复操作）直接向上抛
+        raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _unlike_article(db: Session, article_id: int, user_id: int):
+    like = db.query(models.Like).filter(
+        models.Like.user_id == user_id,
+        models.Like.article_id == article_id
+    ).first()
+    if not like:
+        raise HTTPException(status_code=404, detail="未点赞该文章")
+    
+    db.delete(like)
+    bump_article_counter(db, article_id, "like_count", -1)
+    invalidate_after_commit(db, HOME_NAMESPACE)
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)
+    db.flush()
+
+
 
 # -------------------------- 收藏功能 --------------------------
 @router.post("/collects", response_model=schemas.Collect)
-def collect_article(
+async def collect_article(
     collect: schemas.CollectCreate,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """收藏文章"""
     try:
-        # 检查文章是否存在
-        article = db.query(models.Article).filter(models.Article.id == collect.article_id).first()
-        if not article:
-            raise HTTPException(status_code=404, detail="文章不存在")
-        
-        # 检查是否已收藏
-        existing_collect = db.query(models.Collect).filter(
-            models.Collect.user_id == current_user.id,
-            models.Collect.article_id == collect.article_id
-        ).first()
-        if existing_collect:
-            raise HTTPException(status_code=400, detail="已收藏该文章")
-        
-        # 创建收藏记录
-        db_collect = models.Collect(
-            user_id=current_user.id,
-            article_id=collect.article_id
-        )
-        db.add(db_collect)
-        db.commit()
-        db.refresh(db_collect)
-        return db_collect
+        return await run_write(_collect_article, collect.article_id, current_user.id)
+    except HTTPException:
+        # 主动抛出的 404 / 400（文章不存在、重复操作）直接向上抛
+        raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _collect_article(db: Session, article_id: int, user_id: int) -> schemas.Collect:
+    # 检查文章是否存在
+    article = db.query(models.Article).filter(models.Article.id == article_id).first()
+    if not article:
+        raise HTTPException(status_code=404, detail="文章不存在")
+    
+    # 检查是否已收藏
+    existing_collect = db.query(models.Collect).filter(
+        models.Collect.user_id == user_id,
+        models.Collect.article_id == article_id
+    ).first()
+    if existing_collect:
+        raise HTTPException(status_code=400, detail="已收藏该文章")
+    
+    # 创建收藏记录
+    db_collect = models.Collect(
+        user_id=user_id,
+        article_id=article_id
+    )
+    db.add(db_collect)
+    bump_article_counter(db, article_id, "collect_count", 1)
+    invalidate_after_commit(db, HOME_NAMESPACE)
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)
+    db.flush()
+    return schemas.Collect.model_validate(db_collect)
+
+
 
 @router.delete("/collects/{article_id}")
-def uncollect_article(
+async def uncollect_article(
     article_id: int,
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """取消收藏"""
     try:
-        collect = db.query(models.Collect).filter(
-            models.Collect.user_id == current_user.id,
-            models.Collect.article_id == article_id
-        ).first()
-        if not collect:
-            raise HTTPException(status_code=404, detail="未收藏该文章")
-        
-        db.delete(collect)
-        db.commit()
+        await run_write(_uncollect_article, article_id, current_user.id)
         return {"message": "取消收藏成功"}
+    except HTTPException:
+        # 主动抛出的 404 / 400（文章不存在、重复操作）直接向上抛
+        raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _uncollect_article(db: Session, article_id: int, user_id: int):
+    collect = db.query(models.Collect).filter(
+        models.Collect.user_id == user_id,
+        models.Collect.article_id == article_id
+    ).first()
+    if not collect:
+        raise HTTPException(status_code=404, detail="未收藏该文章")
+    
+    db.delete(collect)
+    bump_article_counter(db, article_id, "collect_count", -1)
+    invalidate_after_commit(db, HOME_NAMESPACE)
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, article_id)
+    db.flush()
+
+
 
 # -------------------------- 我的点赞/收藏列表 --------------------------
 @router.get("/my/likes", response_model=list[schemas.ArticleMinimal])  # 改为ArticleMinimal列表
-def get_my_liked_articles(
-    db: Session = Depends(get_db),
+async def get_my_liked_articles(
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """获取当前用户点赞的文章（返回摘要信息）"""
+    """分页获取当前用户点赞的文章，按点赞时间倒序（返回摘要信息，下一页游标见响应头 X-Next-Cursor）"""
     # 检查用户是否登录（避免未登录时current_user为None）
     if not current_user:
         raise HTTPException(status_code=401, detail="请先登录")
     
     try:
-        # 关联查询：文章 + 作者信息（获取owner_name）
-        liked_articles = db.query(
-            models.Article,  # 文章表
-            models.User.username.label("owner_name")  # 作者用户名（假设用户表用username存名字）
-        ).join(
-            models.Like,  # 关联点赞表
-            models.Article.id == models.Like.article_id
-        ).join(
-            models.User,  # 关联用户表（获取作者信息）
-            models.Article.owner_id == models.User.id  # 假设文章表用owner_id关联作者
-        ).filter(
-            models.Like.user_id == current_user.id  # 筛选当前用户的点赞
-        ).all()
-        
-        # 转换为ArticleMinimal格式（提取字段）
-        return [
-            {
-                "id": article.id,
-                "title": article.title,
-                "owner_id": article.owner_id,
-                "owner_name": owner_name,  # 从关联查询中获取
-                "created_at": article.created_at
-            }
-            for article, owner_name in liked_articles
-        ]
-    
+        articles, next_cursor = await run_db(db, _load_liked_articles, current_user.id, page)
+        return schema_response(list[schemas.ArticleMinimal], articles, next_cursor, validate=True)
+    except HTTPException:
+        # 主动抛出的 400 / 404（无效游标、资源不存在）直接向上抛
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取点赞文章失败：{str(e)}")
 
 
+def _load_liked_articles(db: Session, user_id: int, page: PageParams) -> tuple[list[dict], Optional[str]]:
+    # 关联查询：文章 + 作者信息（获取owner_name）
+    query = db.query(
+        models.Article,  # 文章表
+        models.User.username.label("owner_name"),  # 作者用户名（假设用户表用username存名字）
+        models.Like.created_at.label("marked_at"),  # 点赞时间与点赞ID作为分页排序键
+        models.Like.id.label("mark_id")
+    ).join(
+        models.Like,  # 关联点赞表
+        models.Article.id == models.Like.article_id
+    ).join(
+        models.User,  # 关联用户表（获取作者信息）
+        models.Article.owner_id == models.User.id  # 假设文章表用owner_id关联作者
+    ).options(
+        load_only(*ARTICLE_MINIMAL_COLUMNS)  # 只取摘要列，不加载正文
+    ).filter(
+        models.Like.user_id == user_id  # 筛选当前用户的点赞
+    )
+    liked_articles, next_cursor = keyset_paginate(
+        query, (models.Like.created_at, models.Like.id), page,
+        key=lambda row: [row.marked_at, row.mark_id]
+    )
+    
+    # 转换为ArticleMinimal格式（提取字段）
+    return [
+        {
+            "id": article.id,
+            "title": article.title,
+            "owner_id": article.owner_id,
+            "owner_name": owner_name,  # 从关联查询中获取
+            "created_at": article.created_at
+        }
+        for article, owner_name, _, _ in liked_articles
+    ], next_cursor
+
+
 
 @router.get("/my/collects", response_model=list[schemas.ArticleMinimal])  # 改为ArticleMinimal列表
-def get_my_collected_articles(
-    db: Session = Depends(get_db),
+async def get_my_collected_articles(
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """获取当前用户收藏的文章（返回摘要信息）"""
+    """分页获取当前用户收藏的文章，按收藏时间倒序（返回摘要信息，下一页游标见响应头 X-Next-Cursor）"""
     # 检查用户是否登录
     if not current_user:
         raise HTTPException(status_code=401, detail="请先登录")
     
     try:
-        # 关联查询：文章 + 作者信息
-        collected_articles = db.query(
-            models.Article,
-            models.User.username.label("owner_name")  # 作者用户名
-        ).join(
-            models.Collect,  # 关联收藏表
-            models.Article.id == models.Collect.article_id
-        ).join(
-            models.User,  # 关联用户表
-            models.Article.owner_id == models.User.id
-        ).filter(
-            models.Collect.user_id == current_user.id  # 筛选当前用户的收藏
-        ).all()
-        
-        # 转换为ArticleMinimal格式
-        return [
-            {
-                "id": article.id,
-                "title": article.title,
-                "owner_id": article.owner_id,
-                "owner_name": owner_name,
-                "created_at": article.created_at
-            }
-            for article, owner_name in collected_articles
-        ]
-    
+        articles, next_cursor = await run_db(db, _load_collected_articles, current_user.id, page)
+        return schema_response(list[schemas.ArticleMinimal], articles, next_cursor, validate=True)
+    except HTTPException:
+        # 主动抛出的 400 / 404（无效游标、资源不存在）直接向上抛
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取收藏文章失败：{str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"获取收藏文章失败：{str(e)}")
+
+
+def _load_collected_articles(db: Session, user_id: int, page: PageParams) -> tuple[list[dict], Optional[str]]:
+    # 关联查询：文章 + 作者信息
+    query = db.query(
+        models.Article,
+        models.User.username.label("owner_name"),  # 作者用户名
+        models.Collect.created_at.label("marked_at"),  # 收藏时间与收藏ID作为分页排序键
+        models.Collect.id.label("mark_id")
+    ).join(
+        models.Collect,  # 关联收藏表
+        models.Article.id == models.Collect.article_id
+    ).join(
+        models.User,  # 关联用户表
+        models.Article.owner_id == models.User.id
+    ).options(
+        load_only(*ARTICLE_MINIMAL_COLUMNS)  # 只取摘要列，不加载正文
+    ).filter(
+        models.Collect.user_id == user_id  # 筛选当前用户的收藏
+    )
+    collected_articles, next_cursor = keyset_paginate(
+        query, (models.Collect.created_at, models.Collect.id), page,
+        key=lambda row: [row.marked_at, row.mark_id]
+    )
+    
+    # 转换为ArticleMinimal格式
+    return [
+        {
+            "id": article.id,
+            "title": article.title,
+            "owner_id": article.owner_id,
+            "owner_name": owner_name,
+            "created_at": article.created_at
+        }
+        for article, owner_name, _, _ in collected_articles
+    ], next_cursor
\ No newline at end of file
@@ -0,0 +1,61 @@
+# app/routers/metrics.py
+
+from imports import APIRouter, PlainTextResponse, to_thread
+from ..metrics import METRICS_CONTENT_TYPE, metrics, render_gauges, render_counters
+from ..writer import write_queue
+from ..hashing import hash_pool
+from ..response_cache import home_cache
+from ..article_cache import article_cache
+from ..invalidation import invalidation_bus
+
+
+
+router = APIRouter()
+
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Prometheus 文本格式的运行指标：按路由的请求数 / 延迟直方图 / 数据库耗时，以及线程池、写队列等瞬时值"""
+    limiter = to_thread.current_default_thread_limiter()
+    writer = write_queue.stats()
+    hashing = hash_pool.stats()
+    home = home_cache.stats()
+    article = article_cache.stats()
+    invalidation = invalidation_bus.stats()
+    gauges = [
+        ("threadpool_busy_threads", "anyio 线程池中正在执行的任务数（同步路由与 run_db）", limiter.borrowed_tokens),
+        ("threadpool_max_threads", "anyio 线程池容量", limiter.total_tokens),
+        ("writer_queue_depth", "单写线程队列中等待执行的写事务数", writer["queue_depth"]),
+        ("auth_hash_inflight", "正在执行的密码哈希任务数", hashing.get("inflight", 0)),
+        ("auth_hash_waiting", "排队等待的密码哈希任务数", hashing.get("waiting", 0)),
+        ("home_cache_hit_ratio", "主页缓存命中率（未查询数据库即返回的请求占比）", home.get("hit_rate") or 0),
+        ("article_cache_hit_ratio", "文章详情缓存命中率", article.get("hit_rate") or 0),
+        ("article_cache_bytes", "文章详情缓存估算占用的内存（字节）", article["bytes"]),
+        ("article_cache_entries", "文章详情缓存条目数", article["entries"]),
+        ("cache_invalidation_max_delay_seconds", "其它 worker 发布的缓存失效事件从写入到本进程处理的最大延迟（秒）",
+         (invalidation["max_delay_ms"] or 0) / 1000),
+    ]
+    counters = [
+        ("home_cache_requests_total", "主页缓存查找次数（hit 命中 / stale 返回旧内容 / coalesced 等待同一次查询 / "
+         "miss 无缓存 / refresh 过期后重新查询）", "result", {
+            "hit": home["hits"], "stale": home["stale_hits"], "coalesced": home["coalesced"],
+            "miss": home["misses"], "refresh": home["refreshes"],
+        }),
+        ("article_cache_requests_total", "文章详情缓存查找次数", "result", {
+            "hit": article["hits"], "miss": article["misses"],
+        }),
+        ("home_cache_invalidations_total", "写入导致的主页缓存失效次数", "cache", {"home": home["invalidations"]}),
+        ("article_cache_events_total", "文章详情缓存条目的移除与放弃写回（invalidation 写入失效 / eviction 超出内存上限淘汰 / "
+         "expired 超过 TTL / oversized 单篇过大不缓存 / stale 查询期间被失效而放弃写回）", "event", {
+            "invalidation": article["invalidations"], "eviction": article["evictions"], "expired": article["expired"],
+            "oversized": article["oversized"], "stale": article["stale_discarded"],
+        }),
+        ("cache_invalidation_events_total", "跨 worker 缓存失效事件（published 本进程发布 / applied 处理其它 worker 的事件 / "
+         "reset 事件已被清理而整体失效）", "event", {
+            "published": invalidation["published"], "applied": invalidation["applied"], "reset": invalidation["resets"],
+        }),
+    ]
+    return PlainTextResponse(
+        metrics.render() + render_gauges(gauges) + render_counters(counters), media_type=METRICS_CONTENT_TYPE
+    )
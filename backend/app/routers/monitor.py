@@ -0,0 +1,106 @@
+# app/routers/monitor.py
+
+from imports import APIRouter, Depends, HTTPException, FileResponse, run_in_threadpool
+from ..writer import write_queue
+from ..trigram import username_index, owner_index, title_index
+from ..token_blacklist import token_blacklist
+from ..user_cache import user_cache
+from ..response_cache import home_cache
+from ..article_cache import article_cache
+from ..invalidation import invalidation_bus
+from ..hashing import hash_pool
+from ..query_stats import n_plus_one_report
+from ..slow_queries import slow_query_log
+from ..profiling import list_profiles, profile_path
+from ..auth import get_current_admin
+
+
+
+router = APIRouter()
+
+
+
+@router.get("/writer")
+async def get_writer_stats():
+    """单写线程运行指标：队列深度、提交批次大小、重试次数等"""
+    return write_queue.stats()
+
+
+
+@router.get("/trigram")
+async def get_trigram_stats():
+    """三元组索引规模与查询 / 更新次数"""
+    return [username_index.stats(), owner_index.stats(), title_index.stats()]
+
+
+
+@router.get("/token-blacklist")
+async def get_token_blacklist_stats():
+    """令牌黑名单内存缓存规模、同步与过期清理计数"""
+    return token_blacklist.stats()
+
+
+
+@router.get("/user-cache")
+async def get_user_cache_stats():
+    """登录用户缓存命中 / 未命中次数与规模"""
+    return user_cache.stats()
+
+
+
+@router.get("/home-cache")
+async def get_home_cache_stats():
+    """主页响应缓存：命中 / 返回旧内容 / 等待同一次查询 / 重新查询的次数、命中率与失效次数"""
+    return home_cache.stats()
+
+
+
+@router.get("/article-cache")
+async def get_article_cache_stats():
+    """文章详情缓存：命中率、条目数与估算内存占用、淘汰 / 失效次数"""
+    return article_cache.stats()
+
+
+
+@router.get("/invalidation")
+async def get_invalidation_stats():
+    """跨 worker 缓存失效：发布 / 处理的事件数、轮询与读表次数、最近与最大传播延迟"""
+    return invalidation_bus.stats()
+
+
+
+@router.get("/auth-hash")
+async def get_auth_hash_stats():
+    """密码哈希进程池：执行中 / 排队中的任务数，排队与 503 拒绝次数"""
+    return hash_pool.stats()
+
+
+
+@router.get("/queries", dependencies=[Depends(get_current_admin)])
+async def get_query_stats():
+    """按路由汇总的疑似 N+1 查询（仅管理员）：同一请求中重复执行的语句形状、出现的请求数与最大重复次数"""
+    return n_plus_one_report.stats()
+
+
+
+@router.get("/slow-queries", dependencies=[Depends(get_current_admin)])
+async def get_slow_query_summary():
+    """慢查询汇总（仅管理员）：累计耗时最多的语句形状、执行计划中对大表做 SCAN 的语句与发起路由，以及日志文件路径"""
+    return slow_query_log.summary()
+
+
+
+@router.get("/profiles", dependencies=[Depends(get_current_admin)])
+async def get_profiles():
+    """请求剖析结果列表（仅管理员），最新的在前；文件名包含剖析编号、路由、耗时与 SQL 条数"""
+    return await run_in_threadpool(list_profiles)
+
+
+
+@router.get("/profiles/{name}", dependencies=[Depends(get_current_admin)])
+async def download_profile(name: str):
+    """下载剖析结果（pstats 格式，仅管理员）"""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="剖析结果不存在")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
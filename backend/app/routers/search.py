@@ -1,9 +1,14 @@
 # app/routers/search.py
 
-from imports import APIRouter, Depends, HTTPException, Session
+from imports import APIRouter, Depends, HTTPException, Query, Session, Union, Optional, AsyncSession
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_read_db, run_db
+from ..pagination import PageParams, get_page_params, keyset_paginate, paginate_sorted
+from ..fts import NATIVE_SNIPPETS, build_match_query, fts_hits, render_marked, highlight_article
+from ..trigram import username_index, owner_index, title_index
 from ..auth import get_current_user
+from ..serialization import schema_response
+from ..loading import ARTICLE_LIST_OPTIONS, ARTICLE_WITH_COMMENTS_OPTIONS, USER_PROFILE_OPTIONS, loaded_values
 
 
 
@@ -13,113 +18,249 @@ router = APIRouter()
 
 # -------------------------- 作者搜索接口 --------------------------
 @router.get("/authors/id/{author_id}", response_model=schemas.UserSearch)
-def search_author_by_id(
+async def search_author_by_id(
     author_id: int, 
-    db: Session = Depends(get_db),
+    db: Union[AsyncSession, Session] = Depends(get_read_db),
 ):
     """通过作者ID搜索用户"""
     try:
-        user = db.query(models.User).filter(
-            models.User.id == author_id,
-            models.User.is_active == True
-        ).first()
-        if not user:
-            raise HTTPException(status_code=404, detail=f"User with ID {author_id} not found")
-        return user
+        return schema_response(schemas.UserSearch, await run_db(db, _find_author_by_id, author_id))
     except Exception as e:
         raise 
 
 
+def _find_author_by_id(db: Session, author_id: int) -> schemas.UserSearch:
+    user = db.query(models.User).options(*USER_PROFILE_OPTIONS).filter(
+        models.User.id == author_id,
+        models.User.is_active == True
+    ).first()
+    if not user:
+        raise HTTPException(status_code=404, detail=f"User with ID {author_id} not found")
+    return schemas.UserSearch.model_validate(user)
+
+
 @router.get("/authors/email/{email}", response_model=schemas.UserSearch)
-def search_author_by_email(
+async def search_author_by_email(
     email: str, 
-    db: Session = Depends(get_db),
+    db: Union[AsyncSession, Session] = Depends(get_read_db),
 ):
     """通过作者邮箱搜索用户"""
     try:
-        user = db.query(models.User).filter(
-            models.User.email == email,
-            models.User.is_active == True
-        ).first()
-        if not user:
-            raise HTTPException(status_code=404, detail=f"User with email {email} not found")
-        return user
+        return schema_response(schemas.UserSearch, await run_db(db, _find_author_by_email, email))
     except Exception as e:
         raise 
 
 
+def _find_author_by_email(db: Session, email: str) -> schemas.UserSearch:
+    user = db.query(models.User).options(*USER_PROFILE_OPTIONS).filter(
+        models.User.email == email,
+        models.User.is_active == True
+    ).first()
+    if not user:
+        raise HTTPException(status_code=404, detail=f"User with email {email} not found")
+    return schemas.UserSearch.model_validate(user)
+
+
 @router.get("/authors/name/{username}", response_model=list[schemas.UserSearch])
-def search_author_by_name(
+async def search_author_by_name(
     username: str, 
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db),
 ):
-    """通过作者名字搜索用户（支持模糊搜索）"""
+    """通过作者名字搜索用户（三元组索引容错匹配，按相似度排序分页，下一页游标见响应头 X-Next-Cursor）"""
     try:
-        users = db.query(models.User).filter(
-            models.User.username.contains(username),
-            models.User.is_active == True
-        ).all()
-        if not users:
-            raise HTTPException(status_code=404, detail=f"No users found with name containing '{username}'")
-        return users
+        matches, next_cursor = paginate_sorted(
+            username_index.search(username), page,
+            key=lambda match: [-match[2], match[0]]
+        )
+        if not matches and page.cursor is None:
+            raise HTTPException(status_code=404, detail=f"No users found with name similar to '{username}'")
+        users = await run_db(db, _load_users_by_ids, [user_id for user_id, _, _ in matches])
+        return schema_response(list[schemas.UserSearch], users, next_cursor)
     except Exception as e:
         raise 
 
 
+def _load_users_by_ids(db: Session, user_ids: list[int]) -> list[schemas.UserSearch]:
+    """按给定ID顺序加载活跃用户（索引与数据库之间短暂不一致时跳过已失效的ID）"""
+    if not user_ids:
+        return []
+    users = db.query(models.User).options(*USER_PROFILE_OPTIONS).filter(
+        models.User.id.in_(user_ids),
+        models.User.is_active == True
+    ).all()
+    by_id = {user.id: user for user in users}
+    return [schemas.UserSearch.model_validate(by_id[user_id]) for user_id in user_ids if user_id in by_id]
+
+
 
 # -------------------------- 文章搜索接口 --------------------------
 @router.get("/articles/id/{article_id}", response_model=schemas.Article)
-def search_article_by_id(article_id: int, db: Session = Depends(get_db)):
+async def search_article_by_id(article_id: int, db: Union[AsyncSession, Session] = Depends(get_read_db)):
     """通过文章ID搜索文章（无需登录）"""
     try:
-        article = db.query(models.Article).filter(models.Article.id == article_id).first()
-        if not article:
-            raise HTTPException(status_code=404, detail=f"Article with ID {article_id} not found")
-        return article
+        return schema_response(schemas.Article, await run_db(db, _find_article_by_id, article_id))
+    except Exception as e:
+        raise 
+
+
+def _find_article_by_id(db: Session, article_id: int) -> schemas.Article:
+    article = db.query(models.Article).options(*ARTICLE_WITH_COMMENTS_OPTIONS)\
+        .filter(models.Article.id == article_id).first()
+    if not article:
+        raise HTTPException(status_code=404, detail=f"Article with ID {article_id} not found")
+    return schemas.Article.model_validate(article)
+
+
+def _search_articles(
+    db: Session, keywords: str, page: PageParams, columns: Optional[tuple] = None, with_snippet: bool = False,
+    options: tuple = ARTICLE_LIST_OPTIONS
+):
+    """
+    全文索引搜索文章，按 bm25 相关度分页（游标为 (score, id)），返回 (结果行, 下一页游标)
+    结果行为 (Article, score[, title_highlight, snippet])，摘要列仅在 word 模式下由 FTS5 生成；options 为文章的加载选项
+    """
+    match = build_match_query(keywords, columns)
+    if match is None:
+        return [], None
+    hits = fts_hits(match, with_snippet)
+    fields = [models.Article, hits.c.score]
+    if with_snippet and NATIVE_SNIPPETS:
+        fields += [hits.c.title_highlight, hits.c.snippet]
+    query = db.query(*fields).options(*options).join(hits, hits.c.id == models.Article.id)
+    return keyset_paginate(
+        query, (hits.c.score, hits.c.id), page,
+        key=lambda row: [row.score, row.Article.id],
+        descending=False
+    )
+
+
+
+@router.get("/articles", response_model=list[schemas.ArticleSearchHit])
+async def search_articles(
+    q: str = Query(..., min_length=1, description="搜索关键词（空格分隔，多个关键词同时匹配）"),
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db)
+):
+    """全文搜索文章标题、正文和作者名（无需登录，按相关度排序并返回高亮摘要，下一页游标见响应头 X-Next-Cursor）"""
+    try:
+        hits, next_cursor = await run_db(db, _find_articles_by_keywords, q, page)
+        return schema_response(list[schemas.ArticleSearchHit], hits, next_cursor)
     except Exception as e:
         raise 
 
 
-# 在正式发布时，请慎用模糊搜索，因为使用简单的模糊搜索可能会影响性能
+def _find_articles_by_keywords(db: Session, q: str, page: PageParams) -> tuple[list[schemas.ArticleSearchHit], Optional[str]]:
+    rows, next_cursor = _search_articles(db, q, page, with_snippet=True)
+    hits = []
+    for row in rows:
+        article = row.Article
+        if NATIVE_SNIPPETS:
+            title_highlight, snippet = render_marked(row.title_highlight), render_marked(row.snippet)
+        else:
+            # cjk 模式的索引内容为切分后的文本，高亮与摘要在 Python 中基于原文生成
+            title_highlight, snippet = highlight_article(article.title, article.content, article.owner_name, q)
+        hits.append(schemas.ArticleSearchHit(
+            id=article.id,
+            title=article.title,
+            owner_id=article.owner_id,
+            owner_name=article.owner_name,
+            created_at=article.created_at,
+            category_id=article.category_id,
+            score=row.score,
+            title_highlight=title_highlight,
+            snippet=snippet
+        ))
+    return hits, next_cursor
+
+
+
 @router.get("/articles/author/{author_name}", response_model=list[schemas.Article])
-def search_articles_by_author(author_name: str, db: Session = Depends(get_db)):
-    """通过作者名字搜索文章（无需登录，支持模糊搜索）"""
+async def search_articles_by_author(
+    author_name: str,
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db)
+):
+    """
+    通过作者名字搜索文章（无需登录，结果含评论列表，下一页游标见响应头 X-Next-Cursor）
+    - 三元组索引容错匹配文章上的作者名（含已注销用户的文章）
+    - 按作者名相似度降序排列，相似度相同时按发布时间倒序
+    """
     try:
-        articles = db.query(models.Article).filter(
-            models.Article.owner_name.contains(author_name)
-        ).all()
-        if not articles:
-            raise HTTPException(status_code=404, detail=f"No articles found by author '{author_name}'")
-        return articles
+        scores = {owner_id: score for owner_id, _, score in owner_index.search(author_name)}
+        articles, next_cursor = await run_db(db, _find_articles_by_author, author_name, scores, page)
+        return schema_response(list[schemas.Article], articles, next_cursor)
     except Exception as e:
         raise 
 
 
-# 在正式发布时，请慎用模糊搜索，因为使用简单的模糊搜索可能会影响性能
+def _find_articles_by_author(db: Session, author_name: str, scores: dict, page: PageParams) -> tuple[list[schemas.Article], Optional[str]]:
+    articles, next_cursor = [], None
+    if scores:
+        # 只读取排序所需的列，在内存中按 (相似度降序, 发布时间倒序, ID 倒序) 排序分页，再加载本页文章
+        sort_key = lambda row: [-scores[row.owner_id], -row.created_at.timestamp(), -row.id]
+        rows = db.query(models.Article.id, models.Article.owner_id, models.Article.created_at)\
+            .filter(models.Article.owner_id.in_(scores)).all()
+        rows, next_cursor = paginate_sorted(sorted(rows, key=sort_key), page, key=sort_key)
+        page_ids = [row.id for row in rows]
+        if page_ids:
+            by_id = {article.id: article for article in db.query(models.Article).options(*ARTICLE_WITH_COMMENTS_OPTIONS)
+                     .filter(models.Article.id.in_(page_ids)).all()}
+            articles = [by_id[article_id] for article_id in page_ids if article_id in by_id]
+    if not articles and page.cursor is None:
+        raise HTTPException(status_code=404, detail=f"No articles found by author '{author_name}'")
+    return [schemas.Article.model_validate(loaded_values(article)) for article in articles], next_cursor
+
+
 @router.get("/articles/title/{title}", response_model=list[schemas.Article])
-def search_articles_by_title(title: str, db: Session = Depends(get_db)):
-    """通过文章标题搜索文章（无需登录，支持模糊搜索）"""
+async def search_articles_by_title(
+    title: str,
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db)
+):
+    """
+    通过文章标题搜索文章（无需登录，结果含评论列表，全文索引匹配，按相关度分页，下一页游标见响应头 X-Next-Cursor）
+    - 全文索引无结果时退回三元组索引容错匹配（如拼写错误），仅返回最相似的一页
+    """
     try:
-        articles = db.query(models.Article).filter(
-            models.Article.title.contains(title)
-        ).all()
-        if not articles:
-            raise HTTPException(status_code=404, detail=f"No articles found with title containing '{title}'")
-        return articles
+        fuzzy_ids = [] if page.cursor is not None else [
+            article_id for article_id, _, _ in title_index.search(title, limit=page.limit)
+        ]
+        articles, next_cursor = await run_db(db, _find_articles_by_title, title, fuzzy_ids, page)
+        return schema_response(list[schemas.Article], articles, next_cursor)
     except Exception as e:
         raise 
 
 
-# 在正式发布时，请慎用模糊搜索，因为使用简单的模糊搜索可能会影响性能
+def _find_articles_by_title(db: Session, title: str, fuzzy_ids: list[int], page: PageParams) -> tuple[list[schemas.Article], Optional[str]]:
+    rows, next_cursor = _search_articles(db, title, page, columns=("title",), options=ARTICLE_WITH_COMMENTS_OPTIONS)
+    if rows or page.cursor is not None:
+        return [schemas.Article.model_validate(loaded_values(article)) for article, _ in rows], next_cursor
+
+    articles = db.query(models.Article).options(*ARTICLE_WITH_COMMENTS_OPTIONS)\
+        .filter(models.Article.id.in_(fuzzy_ids)).all() if fuzzy_ids else []
+    if not articles:
+        raise HTTPException(status_code=404, detail=f"No articles found with title containing '{title}'")
+    by_id = {article.id: article for article in articles}
+    return [schemas.Article.model_validate(loaded_values(by_id[article_id])) for article_id in fuzzy_ids if article_id in by_id], None
+
+
 @router.get("/articles/content/{content}", response_model=list[schemas.Article])
-def search_articles_by_content(content: str, db: Session = Depends(get_db)):
-    """通过文章内容搜索文章（无需登录，支持模糊搜索）"""
+async def search_articles_by_content(
+    content: str,
+    page: PageParams = Depends(get_page_params),
+    db: Union[AsyncSession, Session] = Depends(get_read_db)
+):
+    """通过文章内容搜索文章（无需登录，结果含评论列表，全文索引匹配，按相关度分页，下一页游标见响应头 X-Next-Cursor）"""
     try:
-        articles = db.query(models.Article).filter(
-            models.Article.content.contains(content)
-        ).all()
-        if not articles:
-            raise HTTPException(status_code=404, detail=f"No articles found with content containing '{content}'")
-        return articles
+        articles, next_cursor = await run_db(db, _find_articles_by_content, content, page)
+        return schema_response(list[schemas.Article], articles, next_cursor)
     except Exception as e:
-        raise 
\ No newline at end of file
+        raise 
+
+
+def _find_articles_by_content(db: Session, content: str, page: PageParams) -> tuple[list[schemas.Article], Optional[str]]:
+    rows, next_cursor = _search_articles(db, content, page, columns=("content",), options=ARTICLE_WITH_COMMENTS_OPTIONS)
+    if not rows and page.cursor is None:
+        raise HTTPException(status_code=404, detail=f"No articles found with content containing '{content}'")
+    return [schemas.Article.model_validate(loaded_values(article)) for article, _ in rows], next_cursor
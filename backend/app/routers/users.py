@@ -2,13 +2,22 @@
 
 from imports import (
     APIRouter, Depends, HTTPException, status, Session,
-    jwt, time, Optional, EmailStr, datetime, timezone, logging
+    jwt, time, Optional, EmailStr, datetime, timezone, logging,
+    Union, AsyncSession, select
 )
 
 from .. import schemas, models, auth
-from ..database import get_db
+from ..database import get_db, get_read_db, run_db
+from ..writer import run_write, after_commit
+from ..invalidation import invalidate_after_commit, update_index_after_commit, USER_NAMESPACE, ARTICLE_NAMESPACE
+from ..counters import bump_article_versions
+from ..trigram import username_index
+from ..token_blacklist import token_blacklist
 from ..auth import get_current_user, verify_and_refresh_token
-from ..utils import get_current_utc_time
+from ..hashing import hash_password, check_password
+from ..utils import get_current_utc_time, get_stored_utc_time
+from ..serialization import schema_response
+from ..loading import USER_PROFILE_OPTIONS
 
 logging.basicConfig(
     level=logging.ERROR,                    # 只记录错误级别日志
@@ -24,56 +33,69 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=schemas.User)      # 这是一个响应模型，用于过滤返回给客户端的数据
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db: Union[AsyncSession, Session] = Depends(get_read_db)):
     """用户注册接口"""
     try:
-
-        # 检查邮箱是否已被注册
-        db_user = db.query(models.User).filter(models.User.email == user.email).first()
-        if db_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
         if not user.password or user.password.strip() == "":
             raise ValueError("密码不能为空，且不能全为空格")
         
-
-        # 对密码进行哈希运算
-        hashed_password = auth.get_password_hash(user.password)
-        
         if user.email == None:
             raise HTTPException(status_code=400, detail="Email is required")
         
-        # 创建新用户对象
-        new_user = models.User(
-            email=user.email, 
-            username=user.username, 
-            hashed_password=hashed_password,
-            activate_at=get_current_utc_time()
-        )
+        # 先在读会话中检查邮箱，已注册时不占用哈希进程池的名额（写事务中的检查与唯一约束仍负责并发注册）
+        if await run_db(db, _email_registered, user.email):
+            raise HTTPException(status_code=400, detail="Email already registered")
         
-        # 将新用户添加到数据库
-        db.add(new_user)
-        db.commit()  # 提交事务
-        db.refresh(new_user)  # 刷新对象以获取数据库生成的ID等字段
+        # 对密码进行哈希运算（CPU 密集，在进程池中执行，繁忙时返回 503）
+        hashed_password = await hash_password(user.password)
         
-        # 返回新创建的用户信息（通过response_model过滤敏感信息）
-        return new_user
+        # 将新用户写入数据库（由写队列统一提交）
+        return await run_write(_create_user, user, hashed_password)
 
+    except HTTPException:
+        # 主动抛出的 400 / 503（哈希进程池繁忙，带 Retry-After）直接向上抛
+        raise
     except Exception as e:
-        db.rollback()  # 事务回滚
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"注册失败：{str(e)}"  # 生产环境改为"服务器内部错误"
         )
+
+
+def _email_registered(db: Session, email: str) -> bool:
+    return db.query(models.User.id).filter(models.User.email == email).first() is not None
+
+
+def _create_user(db: Session, user: schemas.UserCreate, hashed_password: str) -> schemas.User:
+    # 检查邮箱是否已被注册（读会话检查之后可能有并发注册）
+    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    if db_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    # 创建新用户对象
+    new_user = models.User(
+        email=user.email, 
+        username=user.username, 
+        hashed_password=hashed_password,
+        activate_at=get_stored_utc_time()
+    )
+    
+    # 将新用户添加到数据库
+    db.add(new_user)
+    db.flush()  # 获取数据库生成的ID等字段
+    update_index_after_commit(db, username_index, new_user.id, new_user.username)  # 提交成功后加入用户名索引
+    
+    # 返回新创建的用户信息（通过response_model过滤敏感信息）
+    return schemas.User.model_validate(new_user)
     
 
 
 @router.get("", response_model=schemas.UserInfo)
-def get_user(
+async def get_user(
     user_id: Optional[int] = None,
     email: Optional[EmailStr] = None,
     username: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Union[AsyncSession, Session] = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
@@ -89,8 +111,14 @@ def get_user(
             detail="必须提供 user_id、email 或 username 中的至少一个参数"
         )
     
-    # 构建查询条件
-    query = db.query(models.User)
+    return schema_response(schemas.UserInfo, await run_db(db, _load_user_info, user_id, email, username))
+
+
+
+def _load_user_info(db: Session, user_id: Optional[int], email: Optional[str], username: Optional[str]) -> schemas.UserInfo:
+    """查询用户信息（同步实现，由 run_db 调度执行）"""
+    # 构建查询条件（文章与评论各一条 IN 查询批量加载）
+    query = db.query(models.User).options(*USER_PROFILE_OPTIONS)
     if user_id:
         query = query.filter(models.User.id == user_id)
     if email:
@@ -107,28 +135,20 @@ def get_user(
             detail="未找到符合条件的用户"
         )
 
-    # 核心补充：为用户的每篇文章补充点赞数、收藏数
-    if user.articles:
-        for article in user.articles:
-            # 假设你的数据库模型中有：
-            # - Article模型关联Like表，可通过count()统计点赞数
-            # - Article模型关联Collect表，可通过count()统计收藏数
-            article.like_count = db.query(models.Like).filter(models.Like.article_id == article.id).count()
-            article.collect_count = db.query(models.Collect).filter(models.Collect.article_id == article.id).count()
-
-    return user
+    # 用户每篇文章的点赞数、收藏数直接读取文章上的冗余计数列
+    return schemas.UserInfo.model_validate(user)
 
 
 
 @router.post("/login")
-def login_user(form_data: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login_user(form_data: schemas.UserLogin, db: Union[AsyncSession, Session] = Depends(get_read_db)):
     """用户登录接口"""
     try:
         # 根据邮箱查询用户
-        user = db.query(models.User).filter(models.User.email == form_data.email, models.User.is_active == True).first()
+        user = await run_db(db, _load_login_user, form_data.email)
         
-        # 验证用户是否存在且密码正确
-        if not user or not auth.verify_password(form_data.password, user.hashed_password):
+        # 验证用户是否存在且密码正确（哈希在进程池中执行，繁忙时返回 503）
+        if not user or not await check_password(form_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
@@ -149,6 +169,9 @@ def login_user(form_data: schemas.UserLogin, db: Session = Depends(get_db)):
             "expires_in": expires_in,  # 令牌剩余秒数
             "token_refresh_threshold": 120  # 提前120秒刷新
         }
+    except HTTPException:
+        # 主动抛出的 401 / 503 直接向上抛
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -156,11 +179,14 @@ def login_user(form_data: schemas.UserLogin, db: Session = Depends(get_db)):
         )
 
 
+def _load_login_user(db: Session, email: str) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.email == email, models.User.is_active == True).first()
+
+
 
 @router.post("/logout")
-def logout(
+async def logout(
     token: schemas.TokenRefresh,  # 复用TokenRefresh模型（接收token字段）
-    db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)  # 确保用户已登录（验证令牌有效性）
 ):
     """用户登出接口：将当前访问令牌加入黑名单，使其失效"""
@@ -177,31 +203,39 @@ def logout(
         if not jti:
             raise HTTPException(status_code=400, detail="无效的令牌：缺少唯一标识")
         
-        # 检查令牌是否已在黑名单中
-        existing = db.query(models.TokenBlacklist).filter(models.TokenBlacklist.jti == jti).first()
-        if existing:
+        # 将令牌加入黑名单（由写队列统一提交）
+        if not await run_write(_blacklist_token, jti, expires_at):
             return {"message": "令牌已失效"}
         
-        # 将令牌加入黑名单
-        blacklist_entry = models.TokenBlacklist(
-            jti=jti,
-            expires_at=expires_at
-        )
-        db.add(blacklist_entry)
-        db.commit()
-        
         return {"message": "登出成功，令牌已失效"}
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"登出失败：{str(e)}"
         )
 
 
+def _blacklist_token(db: Session, jti: str, expires_at: datetime) -> bool:
+    """将令牌加入黑名单，已存在时返回 False"""
+    # 检查令牌是否已在黑名单中
+    existing = db.query(models.TokenBlacklist).filter(models.TokenBlacklist.jti == jti).first()
+    if existing:
+        return False
+    
+    # 将令牌加入黑名单
+    blacklist_entry = models.TokenBlacklist(
+        jti=jti,
+        expires_at=expires_at
+    )
+    db.add(blacklist_entry)
+    db.flush()
+    after_commit(db, token_blacklist.add, jti, expires_at)  # 提交成功后立即在本进程生效
+    return True
+
+
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def delete_user(user_id: int, current_user: models.User = Depends(get_current_user)):
     """用户注销（销毁）账号接口"""
     
     try:
@@ -212,37 +246,53 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user: model
                 detail="Not authorized to delete this account"
             )
         
-        # 获取要删除的用户
-        user_to_delete = db.query(models.User).filter(models.User.id == user_id).first()
-        if not user_to_delete:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # 生成唯一标识符（使用时间戳和用户ID）
-        timestamp = int(get_current_utc_time().timestamp())
-        unique_suffix = f"{timestamp}_{user_id}"
-        
-        # 修改用户名和邮箱，释放唯一约束
-        user_to_delete.username = f"注销用户_{unique_suffix}"
-        user_to_delete.email = None  # 邮箱置空，释放邮箱地址
-        
-        # 清空用户相关的密码哈希值
-        user_to_delete.hashed_password = "deactivated"
-        
-        # 设置账号为未激活状态
-        user_to_delete.is_active = False
-        user_to_delete.deactivated_at = get_current_utc_time()
-        
-        db.commit()
+        await run_write(_deactivate_user, user_id)
         
         return {"message": "注销成功"}
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"删除失败：{str(e)}"
         )
 
 
+def _deactivate_user(db: Session, user_id: int):
+    # 获取要删除的用户
+    user_to_delete = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user_to_delete:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # 生成唯一标识符（使用时间戳和用户ID）
+    timestamp = int(get_current_utc_time().timestamp())
+    unique_suffix = f"{timestamp}_{user_id}"
+    
+    # 提交成功后失效登录用户缓存（缓存以原邮箱为键）
+    invalidate_after_commit(db, USER_NAMESPACE, user_to_delete.email)
+    
+    # 修改用户名和邮箱，释放唯一约束
+    user_to_delete.username = f"注销用户_{unique_suffix}"
+    user_to_delete.email = None  # 邮箱置空，释放邮箱地址
+    
+    # 清空用户相关的密码哈希值
+    user_to_delete.hashed_password = "deactivated"
+    
+    # 设置账号为未激活状态
+    user_to_delete.is_active = False
+    user_to_delete.deactivated_at = get_stored_utc_time()
+
+    # 评论列表内嵌评论者的用户名 / 邮箱：递增该用户评论及所评论文章的版本号，使评论列表的 ETag 变化
+    commented = db.execute(
+        select(models.Comment.article_id).where(models.Comment.user_id == user_id).distinct()
+    ).scalars().all()
+    db.query(models.Comment).filter(models.Comment.user_id == user_id).update(
+        {models.Comment.version: models.Comment.version + 1}, synchronize_session=False
+    )
+    bump_article_versions(db, *commented)
+    invalidate_after_commit(db, ARTICLE_NAMESPACE, *commented)  # 缓存的文章版本号随之失效
+    db.flush()
+    update_index_after_commit(db, username_index, user_id, None)  # 已注销用户不再出现在模糊查找结果中
+
+
 
 # -------------------------- 手动刷新令牌，保存功能 --------------------------
 @router.post("/refresh")
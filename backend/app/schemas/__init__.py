@@ -3,9 +3,9 @@
 # 从各文件导入模型
 from .minimal import UserMinimal, ArticleMinimal, CommentMinimal, ArticleMinimalWithStats
 from .users import UserBase, UserCreate, User, UserLogin, UserSearch, UserInfo
-from .articles import ArticleBase, ArticleCreate, ArticleUpdate, Article, ArticleWithStats
+from .articles import ArticleBase, ArticleCreate, ArticleUpdate, Article, ArticleWithStats, ArticleSearchHit
 from .comments import CommentBase, CommentCreate, CommentUpdate, Comment
-from .categories import CategoryBase, CategoryCreate, Category
+from .categories import CategoryBase, CategoryCreate, Category, CategoryListItem
 from .token import TokenRefresh, LoginResponse
 from .home import HomeResponse
 from .messages import MessageBase, MessageCreate, Message, MessageDetail
@@ -18,11 +18,11 @@ __all__ = [
     # 用户相关
     "UserMinimal", "UserBase", "UserCreate", "User", "UserLogin", "UserSearch", "UserInfo"
     # 文章相关
-    "ArticleMinimal", "ArticleBase", "ArticleCreate", "ArticleUpdate", "Article", "ArticleWithStats", "ArticleMinimalWithStats"
+    "ArticleMinimal", "ArticleBase", "ArticleCreate", "ArticleUpdate", "Article", "ArticleWithStats", "ArticleMinimalWithStats", "ArticleSearchHit",
     # 评论相关
     "CommentMinimal", "CommentBase", "CommentCreate", "CommentUpdate", "Comment",
     # 分类相关
-    "CategoryBase", "CategoryCreate", "Category",
+    "CategoryBase", "CategoryCreate", "Category", "CategoryListItem",
     # 令牌相关
     "TokenRefresh", "LoginResponse",
     # 主页相关
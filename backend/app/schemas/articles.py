@@ -43,9 +43,24 @@ class ArticleWithStats(Article):
     """扩展文章模型，包含点赞/收藏状态"""
     like_count: int = 0
     collect_count: int = 0
+    comment_count: int = 0
     is_liked: Optional[bool] = Field(False, description="当前用户是否已点赞")
     is_collected: Optional[bool] = Field(False, description="当前用户是否已收藏")
 
 
 
-__all__ = ["ArticleBase", "ArticleCreate", "ArticleUpdate", "Article", "ArticleWithStats"]
\ No newline at end of file
+class ArticleSearchHit(BaseModel):
+    """全文搜索结果模型（按相关度排序，附带高亮标题与摘要片段）"""
+    id: int = Field(..., description="文章ID")
+    title: str = Field(..., description="文章标题")
+    owner_id: int = Field(..., description="文章作者ID")
+    owner_name: str = Field(..., description="文章作者名")
+    created_at: datetime = Field(..., description="创建时间戳")
+    category_id: Optional[int] = Field(None, description="文章所属分类ID")
+    score: float = Field(..., description="bm25 相关度分数（越小越相关）")
+    title_highlight: str = Field(..., description="命中关键词以 <mark> 标记的标题（原文已做 HTML 转义）")
+    snippet: str = Field(..., description="命中关键词附近的摘要片段（<mark> 标记，原文已做 HTML 转义）")
+
+
+
+__all__ = ["ArticleBase", "ArticleCreate", "ArticleUpdate", "Article", "ArticleWithStats", "ArticleSearchHit"]
\ No newline at end of file
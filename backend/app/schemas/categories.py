@@ -17,13 +17,25 @@ class CategoryCreate(CategoryBase):
 
 
 class Category(CategoryBase):
+    """单个分类详情 / 创建分类的响应模型（附带分类下的文章）"""
     id: int = Field(..., description="分类ID")
     created_at: datetime = Field(..., description="创建时间戳")
-    articles: Optional[list["ArticleMinimal"]] = Field(None, description="分类下的文章列表")
+    articles: list["ArticleMinimal"] = Field(..., description="分类下的文章列表")
     
     class Config:
         from_attributes = True
 
 
 
-__all__ = ["CategoryBase", "CategoryCreate", "Category"]
\ No newline at end of file
+class CategoryListItem(CategoryBase):
+    """分类列表（全部分类 / 主页）中的一项：不附带文章，只返回文章数"""
+    id: int = Field(..., description="分类ID")
+    created_at: datetime = Field(..., description="创建时间戳")
+    article_count: int = Field(..., description="分类下的文章数")
+    
+    class Config:
+        from_attributes = True
+
+
+
+__all__ = ["CategoryBase", "CategoryCreate", "Category", "CategoryListItem"]
\ No newline at end of file
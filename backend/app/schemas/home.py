@@ -1,7 +1,7 @@
 # app/schemas/home.py
 
 from imports import BaseModel, Field
-from .categories import Category
+from .categories import CategoryListItem
 from .minimal import ArticleMinimal
 
 
@@ -10,11 +10,12 @@ class ArticleMinimalWithCounts(ArticleMinimal):
     """带点赞/收藏数的文章极简模型（继承自原有模型）"""
     like_count: int = Field(0, description="文章点赞数")
     collect_count: int = Field(0, description="文章收藏数")
+    comment_count: int = Field(0, description="文章评论数")
 
 
 class HomeResponse(BaseModel):
     """主页响应模型，包含文章和分类数据"""
-    categories: list["Category"] = Field(..., description="分类列表")
+    categories: list["CategoryListItem"] = Field(..., description="分类列表（含各分类的文章数）")
     latest_articles: list["ArticleMinimalWithCounts"] = Field(..., description="最新文章列表")
     
     class Config:
@@ -47,6 +47,7 @@ class ArticleMinimalWithStats(ArticleMinimal):
     """扩展版极简文章模型 - 仅用于UserInfo，增加点赞/收藏数"""
     like_count: int = Field(..., description="文章点赞数量")
     collect_count: int = Field(..., description="文章收藏数量")
+    comment_count: int = Field(0, description="文章评论数量")
 
 
 
@@ -0,0 +1,51 @@
+# app/serialization.py
+
+"""
+响应序列化快速路径
+
+FastAPI 对声明了 response_model 的路由，会把返回值再按响应模型校验一遍、转换为 dict，
+最后交给标准库 json 编码。路由返回的数据大多是我们自己用 schemas 构造好的模型实例，
+重复校验和中间 dict 都是多余的开销，列表接口尤其明显。
+
+- type_adapter：按响应类型缓存预编译的 TypeAdapter（序列化器只构建一次）
+- schema_response：直接用 pydantic-core 把模型实例编码为 JSON 字节并返回 Response，
+  FastAPI 遇到 Response 返回值时跳过响应模型的校验与序列化；路由上的 response_model 保留用于生成文档
+- 其余仍由 FastAPI 序列化的接口（返回 dict、未声明响应模型等）使用全局默认的 ORJSONResponse
+"""
+from imports import lru_cache, Any, Optional, TypeAdapter, Response
+from .pagination import NEXT_CURSOR_HEADER
+
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema: Any) -> TypeAdapter:
+    """返回响应类型（模型类或 list[模型类] 等）对应的 TypeAdapter"""
+    return TypeAdapter(schema)
+
+
+
+def dump_json(schema: Any, content: Any, validate: bool = False) -> bytes:
+    """
+    按响应类型把数据编码为 JSON 字节
+    - content 已是该类型的模型实例（或实例列表）时直接编码，子类实例只输出响应模型声明的字段
+    - validate=True：content 为 dict / ORM 对象等未校验的数据，先按响应类型校验转换一次
+    """
+    adapter = type_adapter(schema)
+    if validate:
+        content = adapter.validate_python(content, from_attributes=True)
+    return adapter.dump_json(content)
+
+
+
+def schema_response(
+    schema: Any, content: Any, next_cursor: Optional[str] = None, validate: bool = False, headers: Optional[dict] = None
+) -> Response:
+    """
+    构造已序列化好的 JSON 响应
+    - 返回 Response 时 FastAPI 不会合并注入的 response 参数上的响应头，下一页游标由本函数写入
+    - headers：其它响应头（如条件请求的 ETag，见 app/conditional.py）
+    """
+    headers = dict(headers or ())
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return Response(dump_json(schema, content, validate), media_type="application/json", headers=headers)
@@ -0,0 +1,272 @@
+# app/slow_queries.py
+
+"""
+慢查询日志与执行计划检查
+
+- 每个引擎挂载 before/after_cursor_execute 事件（与 SQL 统计相互独立）：耗时超过 SLOW_QUERY_THRESHOLD_MS 的语句
+  连同绑定参数、耗时和发起路由写入 SLOW_QUERY_LOG_FILE（JSON Lines，按大小轮转）；
+  绑定参数默认只记录类型与长度（参数中有令牌、邮箱、密码哈希等），SLOW_QUERY_LOG_PARAMS 开启后才记录原值（过长的值截断）
+- 每种语句形状（statement_shape）第一次执行时，在同一连接上运行一次 EXPLAIN QUERY PLAN；
+  计划中对 SLOW_QUERY_SCAN_TABLES 的 SCAN（全表扫描或整个索引扫描）会被标记并写入日志，
+  无论这条语句是否慢——数据量小时不慢的扫描，数据增长后就会变成慢查询
+- 写文件通过 QueueHandler 交给后台线程，事件循环 / 工作线程中只做入队
+- 发起路由取自当前请求的 QueryStats（需开启 QUERY_STATS），请求之外执行的语句记为 "-"
+- 汇总（慢查询次数 / 耗时最多的形状、带全表扫描的形状）见 /monitor/slow-queries（仅管理员）
+"""
+from imports import (
+    re, json, time, queue, threading, logging, OrderedDict, Counter, Optional, datetime, timezone, event
+)
+from .config import (
+    SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_FILE, SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS,
+    SLOW_QUERY_LOG_PARAMS, SLOW_QUERY_MAX_SHAPES, SLOW_QUERY_SCAN_TABLES
+)
+from .query_stats import statement_shape, current_query_stats
+
+
+
+_START_TIMES_KEY = "slow_query_start"
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+_MAX_PARAM_CHARS = 200
+_MAX_ROUTES = 20
+
+# FROM / JOIN 子句中的表名与别名（SQLAlchemy 的别名形如 "articles AS articles_1"）
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN|UPDATE)\s+\"?(\w+)\"?(?:\s+AS\s+\"?(\w+)\"?)?", re.IGNORECASE)
+# 执行计划中的扫描：如 "SCAN articles"、"SCAN articles_1 USING COVERING INDEX ix_articles_owner_id"
+_PLAN_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+
+def find_full_scans(statement: str, plan: list[str], tables: frozenset = SLOW_QUERY_SCAN_TABLES) -> list[dict]:
+    """从执行计划中找出对关注表的 SCAN（别名还原为表名）"""
+    aliases = {}
+    for table, alias in _TABLE_REFERENCE.findall(statement):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    scans = []
+    for detail in plan:
+        match = _PLAN_SCAN.match(detail)
+        if match:
+            table = aliases.get(match.group(1), match.group(1))
+            if table in tables:
+                scans.append({"table": table, "detail": detail})
+    return scans
+
+
+
+def _explain(cursor_factory, statement: str, parameters) -> list[str]:
+    """在同一连接上执行 EXPLAIN QUERY PLAN，返回各步骤的描述"""
+    cursor = cursor_factory()
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+
+def _redacted(value):
+    """脱敏后的参数：只保留类型与长度（NULL 原样保留）"""
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes, bytearray)):
+        return f"<{type(value).__name__} {len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+
+def _loggable(parameters, include_values: bool = SLOW_QUERY_LOG_PARAMS) -> list:
+    """
+    绑定参数转换为可写入 JSON 的值
+    - 默认脱敏，只记录类型与长度
+    - include_values=True 时记录原值（过长的字符串截断，避免把正文等大字段写进日志）
+    """
+    if not include_values:
+        return [_redacted(value) for value in parameters or ()]
+    values = []
+    for value in parameters or ():
+        if isinstance(value, (bytes, bytearray)):
+            value = f"<{len(value)} bytes>"
+        elif not isinstance(value, (int, float, bool, type(None))):
+            value = str(value)
+            if len(value) > _MAX_PARAM_CHARS:
+                value = value[:_MAX_PARAM_CHARS] + f"...<{len(value)} chars>"
+        values.append(value)
+    return values
+
+
+
+class _ShapeEntry:
+    """单个语句形状的执行计划与慢查询统计"""
+    __slots__ = ("plan", "full_scans", "routes", "slow_count", "slow_seconds", "max_seconds")
+
+    def __init__(self, plan: list[str], full_scans: list[dict]):
+        self.plan = plan
+        self.full_scans = full_scans
+        self.routes: Counter = Counter()
+        self.slow_count = 0
+        self.slow_seconds = 0.0
+        self.max_seconds = 0.0
+
+
+
+class SlowQueryLog:
+    """慢查询记录、执行计划缓存与结构化日志输出"""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS, log_file: str = SLOW_QUERY_LOG_FILE,
+                 max_shapes: int = SLOW_QUERY_MAX_SHAPES):
+        self.threshold = threshold_ms / 1000
+        self.log_file = log_file
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._shapes: OrderedDict = OrderedDict()
+        self._stats = {"slow_queries": 0, "shapes_seen": 0, "explain_errors": 0}
+        self._file_logger: Optional[logging.Logger] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    # ---------- 日志输出 ----------
+    def _emit(self, record: dict):
+        if self._file_logger is None:
+            with self._lock:
+                if self._file_logger is None:
+                    self._start_writer()
+        self._file_logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    def _start_writer(self):
+        """首次写日志时启动后台写文件线程"""
+        handler = logging.handlers.RotatingFileHandler(
+            self.log_file, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(records, handler)
+        self._listener.start()
+        file_logger = logging.getLogger("blog_api.slow_queries")
+        file_logger.setLevel(logging.INFO)
+        file_logger.propagate = False
+        file_logger.addHandler(logging.handlers.QueueHandler(records))
+        self._file_logger = file_logger
+
+    def close(self):
+        """写完已入队的日志并停止后台线程（应用关闭时调用）"""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                for handler in self._listener.handlers:
+                    handler.close()
+                self._file_logger.handlers.clear()
+                self._listener = None
+                self._file_logger = None
+
+    # ---------- 记录 ----------
+    def _shape_entry(self, shape: str, statement: str, parameters, cursor_factory) -> _ShapeEntry:
+        """返回语句形状的记录，首次出现时运行 EXPLAIN QUERY PLAN（已有记录时只是一次字典查找，不加锁）"""
+        entry = self._shapes.get(shape)
+        if entry is not None:
+            return entry
+        plan, full_scans, failed = [], [], False
+        if statement.lstrip()[:6].upper().startswith(_EXPLAINABLE):
+            try:
+                plan = _explain(cursor_factory, statement, parameters)
+                full_scans = find_full_scans(statement, plan)
+            except Exception as e:
+                plan, failed = [f"EXPLAIN 失败：{e}"], True
+        entry = _ShapeEntry(plan, full_scans)
+        with self._lock:
+            if failed:
+                self._stats["explain_errors"] += 1
+            existing = self._shapes.get(shape)
+            if existing is not None:  # 其它线程已先完成
+                return existing
+            self._shapes[shape] = entry
+            self._stats["shapes_seen"] += 1
+            while len(self._shapes) > self.max_shapes:
+                self._shapes.popitem(last=False)
+        if full_scans:
+            stats = current_query_stats()
+            self._emit({
+                "type": "full_scan", "time": datetime.now(timezone.utc).isoformat(),
+                "route": stats.route() if stats is not None else "-", "statement": shape,
+                "tables": sorted({scan["table"] for scan in full_scans}), "plan": plan,
+            })
+        return entry
+
+    def observe(self, statement: str, parameters, seconds: float, cursor_factory):
+        shape = statement_shape(statement)
+        entry = self._shape_entry(shape, statement, parameters, cursor_factory)
+        slow = seconds >= self.threshold
+        if not slow and not entry.full_scans:
+            return
+        stats = current_query_stats()
+        route = stats.route() if stats is not None else "-"
+        with self._lock:
+            if len(entry.routes) < _MAX_ROUTES or route in entry.routes:
+                entry.routes[route] += 1
+            if not slow:
+                return
+            entry.slow_count += 1
+            entry.slow_seconds += seconds
+            entry.max_seconds = max(entry.max_seconds, seconds)
+            self._stats["slow_queries"] += 1
+        self._emit({
+            "type": "slow", "time": datetime.now(timezone.utc).isoformat(), "route": route,
+            "duration_ms": round(seconds * 1000, 2), "statement": statement, "parameters": _loggable(parameters),
+            "full_scans": entry.full_scans,
+        })
+
+    # ---------- 汇总 ----------
+    def summary(self, limit: int = 20) -> dict:
+        with self._lock:
+            shapes = [(shape, entry) for shape, entry in self._shapes.items()]
+            stats = dict(self._stats)
+        slowest = sorted((item for item in shapes if item[1].slow_count), key=lambda item: -item[1].slow_seconds)
+        scans = [item for item in shapes if item[1].full_scans]
+        return {
+            "threshold_ms": round(self.threshold * 1000, 2),
+            "log_file": self.log_file,
+            **stats,
+            "slowest": [
+                {
+                    "statement": shape, "slow_count": entry.slow_count,
+                    "total_ms": round(entry.slow_seconds * 1000, 2), "max_ms": round(entry.max_seconds * 1000, 2),
+                    "routes": dict(entry.routes.most_common(5)), "full_scans": entry.full_scans,
+                }
+                for shape, entry in slowest[:limit]
+            ],
+            "full_scans": [
+                {
+                    "statement": shape, "tables": sorted({scan["table"] for scan in entry.full_scans}),
+                    "plan": entry.plan, "routes": dict(entry.routes.most_common(5)),
+                }
+                for shape, entry in scans[:limit]
+            ],
+        }
+
+    def clear(self):
+        with self._lock:
+            self._shapes.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+
+
+slow_query_log = SlowQueryLog()
+
+
+
+# -------------------------- 引擎事件 --------------------------
+def install_slow_query_log(sync_engine, log: SlowQueryLog = slow_query_log):
+    """在引擎上挂载慢查询记录事件"""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get(_START_TIMES_KEY)
+        if not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        # 原始 DBAPI 连接（aiosqlite 下为适配后的同步接口，在同一 greenlet 中执行）
+        log.observe(statement, parameters, seconds, conn.connection.cursor)
@@ -0,0 +1,159 @@
+# app/token_blacklist.py
+
+"""
+令牌黑名单内存缓存：鉴权时判断 jti 是否已注销，不访问数据库
+
+- 启动时从 token_blacklist 表加载未过期的记录；本进程登出时通过 after_commit 写入
+- 其它 worker 的登出记录由后台任务按 id 增量拉取（间隔 TOKEN_BLACKLIST_SYNC_SECONDS），
+  多 worker 部署时登出在其它进程生效最多延迟一个同步间隔
+- 令牌过期后 JWT 校验本身即会失败，过期的黑名单记录不再有用：
+  内存中的条目随同步任务清除，数据库中的行由清理任务分批删除
+"""
+from imports import asyncio, datetime, timezone, time, threading, logging, func, Session, run_in_threadpool
+from . import models
+from .config import (
+    TOKEN_BLACKLIST_SYNC_SECONDS, TOKEN_BLACKLIST_PURGE_SECONDS, TOKEN_BLACKLIST_PURGE_BATCH
+)
+from .database import SessionLocal
+from .utils import get_current_utc_time
+from .writer import run_write
+
+logger = logging.getLogger("blog_api")
+
+
+
+def _to_timestamp(value: datetime) -> float:
+    """数据库读回的时间不带时区，按 UTC 处理"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+
+class TokenBlacklistCache:
+    """jti -> 令牌过期时间戳"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict = {}
+        self._last_id = 0         # 已同步的最大行ID
+        self._stats = {"synced": 0, "added": 0, "expired": 0, "purged_rows": 0, "last_purged_rows": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def contains(self, jti: str) -> bool:
+        """jti 是否已注销（已过期的条目视为不存在）"""
+        expires = self._entries.get(jti)
+        return expires is not None and expires > time.time()
+
+    def add(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._entries[jti] = _to_timestamp(expires_at)
+            self._stats["added"] += 1
+
+    def sync(self, db: Session) -> int:
+        """拉取 id 大于已同步位置的未过期记录，返回新增条数"""
+        rows = db.query(
+            models.TokenBlacklist.id, models.TokenBlacklist.jti, models.TokenBlacklist.expires_at
+        ).filter(
+            models.TokenBlacklist.id > self._last_id,
+            models.TokenBlacklist.expires_at > get_current_utc_time()
+        ).order_by(models.TokenBlacklist.id).all()
+        with self._lock:
+            for row in rows:
+                self._entries[row.jti] = _to_timestamp(row.expires_at)
+            if rows:
+                self._last_id = max(self._last_id, rows[-1].id)
+            self._stats["synced"] += len(rows)
+        return len(rows)
+
+    def discard_expired(self) -> int:
+        """删除内存中已过期的条目，返回删除条数"""
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, expires in self._entries.items() if expires <= now]
+            for jti in expired:
+                del self._entries[jti]
+            self._stats["expired"] += len(expired)
+        return len(expired)
+
+    def record_purge(self, removed: int):
+        with self._lock:
+            self._stats["purged_rows"] += removed
+            self._stats["last_purged_rows"] = removed
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "last_id": self._last_id, **self._stats}
+
+
+
+token_blacklist = TokenBlacklistCache()
+
+
+
+# -------------------------- 数据库清理 --------------------------
+def _purge_expired_tokens(db: Session, batch_size: int) -> int:
+    """
+    删除一批已过期的黑名单记录，返回删除条数
+    - 保留 id 最大的一行：SQLite 新行的 id 为当前最大 id + 1，删除最大行会导致 id 被复用，增量同步会漏掉新记录
+    """
+    max_id = db.query(func.max(models.TokenBlacklist.id)).scalar()
+    if max_id is None:
+        return 0
+    expired_ids = db.query(models.TokenBlacklist.id).filter(
+        models.TokenBlacklist.expires_at <= get_current_utc_time(),
+        models.TokenBlacklist.id < max_id
+    ).limit(batch_size)
+    removed = db.query(models.TokenBlacklist).filter(
+        models.TokenBlacklist.id.in_(expired_ids)
+    ).delete(synchronize_session=False)
+    db.flush()
+    return removed
+
+
+
+async def purge_expired_tokens(batch_size: int = TOKEN_BLACKLIST_PURGE_BATCH) -> int:
+    """分批删除过期记录（每批一个写事务，期间其它写请求可插队），返回删除总数"""
+    removed = 0
+    while True:
+        batch_removed = await run_write(_purge_expired_tokens, batch_size)
+        removed += batch_removed
+        if batch_removed < batch_size:
+            break
+    token_blacklist.record_purge(removed)
+    return removed
+
+
+
+# -------------------------- 启动加载与后台任务 --------------------------
+def load_token_blacklist() -> int:
+    """从数据库增量加载未过期的黑名单记录（启动时即为全量加载），返回新增条数"""
+    with SessionLocal() as db:
+        return token_blacklist.sync(db)
+
+
+async def _sync_loop():
+    while True:
+        await asyncio.sleep(TOKEN_BLACKLIST_SYNC_SECONDS)
+        try:
+            await run_in_threadpool(load_token_blacklist)
+            token_blacklist.discard_expired()
+        except Exception:
+            logger.exception("令牌黑名单同步失败")
+
+
+async def _purge_loop():
+    while True:
+        await asyncio.sleep(TOKEN_BLACKLIST_PURGE_SECONDS)
+        try:
+            removed = await purge_expired_tokens()
+            if removed:
+                logger.info("令牌黑名单清理完成：删除 %d 条过期记录", removed)
+        except Exception:
+            logger.exception("令牌黑名单清理失败")
+
+
+def start_blacklist_tasks() -> list:
+    """启动同步与清理后台任务（在 lifespan 中调用，关闭时取消返回的任务）"""
+    return [asyncio.create_task(_sync_loop()), asyncio.create_task(_purge_loop())]
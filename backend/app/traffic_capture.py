@@ -0,0 +1,148 @@
+# app/traffic_capture.py
+
+"""
+请求流量录制（供 benchmarks.traffic_replay 离线回放）
+
+每个请求结束后写入一行 JSON（NDJSON，字段名尽量短）：
+    ts  到达时间（Unix 时间戳，秒）      m   方法            p   路径          q   查询串（无则省略）
+    u   匿名化的用户身份（无令牌时省略，令牌无法解析时为 "?"）
+    b   匿名化的 JSON 请求体（无则省略）   bl  非 JSON 或过大的请求体长度
+    r   路由模板    s   状态码    ms  处理耗时（毫秒，直到响应体发送完毕）    c   到达时正在处理的请求数
+
+匿名化：
+- 用户身份取令牌中的 sub（邮箱），以 TRAFFIC_CAPTURE_SALT 为密钥做 HMAC，只保留前 12 位十六进制，
+  同一用户在录制文件中始终对应同一个编号，但无法还原邮箱；令牌本身不落盘
+- 请求体中的数字、布尔值与结构原样保留（文章 / 评论 ID 等回放需要），字符串只保留长度（"<str:N>"），
+  键名包含 email 的字段与用户身份使用同一匿名编号（"<email:编号>"），回放时映射到同一个测试用户
+- 查询串与路径原样记录（搜索词是流量形态的一部分），如需脱敏应在录制后处理
+
+写文件通过 QueueHandler 交给后台线程，请求中只做一次 JSON 编码与入队
+"""
+from imports import os, json, hmac, hashlib, queue, secrets, threading, logging, Optional, jwt
+from .config import (
+    TRAFFIC_CAPTURE_FILE, TRAFFIC_CAPTURE_MAX_BYTES, TRAFFIC_CAPTURE_BACKUPS, TRAFFIC_CAPTURE_SALT,
+    TRAFFIC_CAPTURE_MAX_BODY, TRAFFIC_CAPTURE_EXCLUDE
+)
+
+
+
+INVALID_IDENTITY = "?"
+_JSON_CONTENT_TYPE = "application/json"
+
+
+
+def pseudonym(value: str, salt: str) -> str:
+    """用户身份的匿名编号（大小写不敏感）"""
+    return hmac.new(salt.encode(), value.strip().lower().encode(), hashlib.sha256).hexdigest()[:12]
+
+
+
+def identity_from_authorization(authorization: Optional[str], salt: str) -> Optional[str]:
+    """从 Authorization 头中取出令牌的 sub 并匿名化（只解码不校验签名，校验由鉴权依赖负责）"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return INVALID_IDENTITY
+    try:
+        subject = jwt.get_unverified_claims(token.strip()).get("sub")
+    except Exception:
+        return INVALID_IDENTITY
+    return pseudonym(subject, salt) if isinstance(subject, str) and subject else INVALID_IDENTITY
+
+
+
+def anonymize_body(value, salt: str, key: str = ""):
+    """保留 JSON 请求体的结构与数字，字符串替换为长度或匿名编号"""
+    if isinstance(value, dict):
+        return {k: anonymize_body(v, salt, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [anonymize_body(item, salt, key) for item in value]
+    if isinstance(value, str):
+        if "email" in key.lower():
+            return f"<email:{pseudonym(value, salt)}>"
+        return f"<str:{len(value)}>"
+    return value
+
+
+
+class TrafficRecorder:
+    """请求记录的组装与 NDJSON 输出"""
+
+    def __init__(self, log_file: str = TRAFFIC_CAPTURE_FILE, salt: str = TRAFFIC_CAPTURE_SALT,
+                 max_body: int = TRAFFIC_CAPTURE_MAX_BODY, exclude: tuple = TRAFFIC_CAPTURE_EXCLUDE):
+        self.log_file = log_file
+        self.salt = salt or secrets.token_hex(16)  # 未配置时各进程的匿名编号互不相通
+        self.max_body = max_body
+        self.exclude = exclude
+        self.in_flight = 0  # 只在事件循环线程中读写
+        self.records = 0
+        self._lock = threading.Lock()
+        self._file_logger: Optional[logging.Logger] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    def excluded(self, path: str) -> bool:
+        return path.startswith(self.exclude)
+
+    def record(self, started_at: float, method: str, path: str, query_string: bytes, authorization: Optional[str],
+               content_type: str, body: Optional[bytes], body_length: int, route: str, status: int,
+               seconds: float, concurrency: int):
+        record = {"ts": round(started_at, 3), "m": method, "p": path}
+        if query_string:
+            record["q"] = query_string.decode("latin-1")
+        identity = identity_from_authorization(authorization, self.salt)
+        if identity is not None:
+            record["u"] = identity
+        if body_length:
+            anonymized = None
+            if body is not None and content_type.startswith(_JSON_CONTENT_TYPE):
+                try:
+                    anonymized = anonymize_body(json.loads(body), self.salt)
+                except ValueError:
+                    pass
+            if anonymized is not None:
+                record["b"] = anonymized
+            else:
+                record["bl"] = body_length
+        record.update({"r": route, "s": status, "ms": round(seconds * 1000, 2), "c": concurrency})
+        self._emit(record)
+
+    # ---------- 文件输出 ----------
+    def _emit(self, record: dict):
+        if self._file_logger is None:
+            with self._lock:
+                if self._file_logger is None:
+                    self._start_writer()
+        self.records += 1
+        self._file_logger.info(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+
+    def _start_writer(self):
+        """首次写入时启动后台写文件线程"""
+        path = self.log_file.replace("{pid}", str(os.getpid()))  # 进程号在首次写入时取（worker 可能由 fork 创建）
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=TRAFFIC_CAPTURE_MAX_BYTES, backupCount=TRAFFIC_CAPTURE_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(records, handler)
+        self._listener.start()
+        file_logger = logging.getLogger("blog_api.traffic_capture")
+        file_logger.setLevel(logging.INFO)
+        file_logger.propagate = False
+        file_logger.addHandler(logging.handlers.QueueHandler(records))
+        self._file_logger = file_logger
+
+    def close(self):
+        """写完已入队的记录并停止后台线程（应用关闭时调用）"""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                for handler in self._listener.handlers:
+                    handler.close()
+                self._file_logger.handlers.clear()
+                self._listener = None
+                self._file_logger = None
+
+
+
+traffic_recorder = TrafficRecorder()
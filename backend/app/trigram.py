@@ -0,0 +1,178 @@
+# app/trigram.py
+
+"""
+进程内三元组（trigram）索引：用户名 / 文章作者名 / 文章标题的容错模糊查找
+
+- 启动时从数据库全量构建，之后由写事务通过 after_commit 增量维护
+  （注册、文章增删改、账号注销），查询完全在内存中完成，不访问数据库
+- 文章作者名取文章上冗余存储的 owner_name（按作者ID去重），账号注销后文章仍保留原作者名，
+  因此不从该索引中删除，注销用户的文章仍可按作者名搜到
+- 文本统一转小写，首尾补空格后切分为三元组（与 pg_trgm 相同），
+  短词和中文用户名也能产生足够的三元组
+- 覆盖率：查询词的三元组在候选文本中出现的比例，原文包含查询词时视为 1；低于阈值的候选被过滤
+- 相似度 = (2 × 覆盖率 + Jaccard) / 3：覆盖率决定是否命中，Jaccard 使更接近的短文本排在前面
+- 每个 worker 进程各自维护一份索引：本进程的写入在提交后直接更新，其它 worker 的写入经跨 worker
+  失效事件（只带 key）通知后，按 key 从数据库重新读取该条记录（见 app/invalidation.py）
+"""
+from imports import math, threading, Optional, Session
+from . import models
+from .config import SEARCH_TRIGRAM_THRESHOLD, SEARCH_TRIGRAM_LIMIT
+from .database import SessionLocal
+
+
+
+def trigrams(value: str) -> frozenset:
+    """将文本切分为三元组集合（小写，首部补两个空格、尾部补一个空格）"""
+    padded = f"  {value.lower()} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+
+class TrigramIndex:
+    """线程安全的三元组倒排索引：key（如用户ID）-> 文本"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._texts: dict = {}        # key -> 原文
+        self._grams: dict = {}        # key -> 三元组集合
+        self._postings: dict = {}     # 三元组 -> key 集合
+        self._stats = {"queries": 0, "updates": 0}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    # ---------- 维护 ----------
+    def _remove_locked(self, key):
+        for gram in self._grams.pop(key, ()):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+        self._texts.pop(key, None)
+
+    def add(self, key, value: Optional[str]):
+        """新增或更新一条记录（value 为空时等同于删除）"""
+        with self._lock:
+            self._remove_locked(key)
+            if value:
+                grams = trigrams(value)
+                self._texts[key] = value
+                self._grams[key] = grams
+                for gram in grams:
+                    self._postings.setdefault(gram, set()).add(key)
+            self._stats["updates"] += 1
+
+    def remove(self, key):
+        """删除一条记录（不存在时忽略）"""
+        with self._lock:
+            self._remove_locked(key)
+            self._stats["updates"] += 1
+
+    def rebuild(self, items):
+        """用 (key, 文本) 序列全量重建索引"""
+        texts, grams, postings = {}, {}, {}
+        for key, value in items:
+            if not value:
+                continue
+            key_grams = trigrams(value)
+            texts[key] = value
+            grams[key] = key_grams
+            for gram in key_grams:
+                postings.setdefault(gram, set()).add(key)
+        with self._lock:
+            self._texts, self._grams, self._postings = texts, grams, postings
+
+    # ---------- 查询 ----------
+    def search(
+        self,
+        query: str,
+        limit: int = SEARCH_TRIGRAM_LIMIT,
+        threshold: float = SEARCH_TRIGRAM_THRESHOLD,
+    ) -> list[tuple]:
+        """返回按 (相似度降序, key 升序) 排列的 [(key, 文本, 相似度)]，相似度范围 0~1"""
+        query_grams = trigrams(query)
+        needle = query.lower()
+        # 前缀过滤：覆盖率达标的候选至少共享 needed 个三元组，因此必然出现在最稀有的
+        # (总数 - needed + 1) 个三元组的倒排表中；再补充最稀有的内部三元组，保证包含查询词的原文不被漏掉
+        needed = max(1, math.ceil(threshold * len(query_grams)))
+        with self._lock:
+            self._stats["queries"] += 1
+            by_rarity = sorted(query_grams, key=lambda gram: len(self._postings.get(gram, ())))
+            probes = set(by_rarity[:len(query_grams) - needed + 1])
+            inner = [gram for gram in by_rarity if " " not in gram]
+            if inner:
+                probes.add(inner[0])
+            candidates = set()
+            for gram in probes:
+                candidates.update(self._postings.get(gram, ()))
+
+            scored = []
+            for key in candidates:
+                text = self._texts[key]
+                shared = len(query_grams & self._grams[key])
+                coverage = 1.0 if needle in text.lower() else shared / len(query_grams)
+                if coverage < threshold:
+                    continue
+                jaccard = shared / (len(query_grams) + len(self._grams[key]) - shared)
+                scored.append((key, text, round((2 * coverage + jaccard) / 3, 4)))
+
+        scored.sort(key=lambda item: (-item[2], item[0]))
+        return scored[:limit]
+
+    def stats(self) -> dict:
+        return {"name": self.name, "entries": len(self._texts), "trigrams": len(self._postings), **self._stats}
+
+
+
+# -------------------------- 全局索引 --------------------------
+username_index = TrigramIndex("usernames")     # 活跃用户：用户ID -> 用户名
+owner_index = TrigramIndex("article_owners")   # 文章作者：作者ID -> 文章上的作者名（含已注销用户）
+title_index = TrigramIndex("article_titles")   # 文章：文章ID -> 标题
+
+
+
+# -------------------------- 从数据库加载 --------------------------
+# 每个索引两种读取方式：全量 (key, 文本) 序列，以及按 key 读取单条文本（不存在或已失效时为 None）
+_SOURCES = {
+    username_index.name: (
+        lambda db: db.query(models.User.id, models.User.username).filter(models.User.is_active == True).all(),
+        lambda db, user_id: db.query(models.User.username).filter(
+            models.User.id == user_id, models.User.is_active == True
+        ).scalar(),
+    ),
+    owner_index.name: (
+        lambda db: db.query(models.Article.owner_id, models.Article.owner_name).distinct().all(),
+        lambda db, owner_id: db.query(models.Article.owner_name).filter(
+            models.Article.owner_id == owner_id
+        ).limit(1).scalar(),
+    ),
+    title_index.name: (
+        lambda db: db.query(models.Article.id, models.Article.title).all(),
+        lambda db, article_id: db.query(models.Article.title).filter(models.Article.id == article_id).scalar(),
+    ),
+}
+TRIGRAM_INDEXES = (username_index, owner_index, title_index)
+
+
+
+def build_trigram_indexes(db: Session):
+    """启动时从数据库全量构建索引（只读取 id 与文本列）"""
+    for index in TRIGRAM_INDEXES:
+        index.rebuild(_SOURCES[index.name][0](db))
+
+
+
+def reload_entry(index: TrigramIndex, key):
+    """按 key 从数据库重新读取一条记录（其它 worker 的写入经失效事件通知时调用，记录已不存在时从索引删除）"""
+    key = int(key)
+    with SessionLocal() as db:
+        index.add(key, _SOURCES[index.name][1](db, key))
+
+
+
+def reload_index(index: TrigramIndex):
+    """从数据库全量重建一个索引（失效事件丢失时调用）"""
+    with SessionLocal() as db:
+        index.rebuild(_SOURCES[index.name][0](db))
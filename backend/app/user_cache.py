@@ -0,0 +1,81 @@
+# app/user_cache.py
+
+"""
+登录用户身份缓存：get_current_user 按令牌 sub（邮箱）缓存活跃用户的列值
+
+- 容量有上限（LRU 淘汰），条目超过 TTL 后失效并重新查询数据库
+- 只缓存身份相关的列，不缓存密码哈希；命中时返回新构造的瞬态 User 对象，
+  路由只读取其列属性（id / username / email 等），不要访问关联关系
+- 本进程注销账号时在提交后立即失效；其它 worker 经失效事件在轮询后失效（见 app/invalidation.py）
+"""
+from imports import OrderedDict, threading, time, Optional
+from . import models
+from .config import AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL
+
+
+
+CACHED_COLUMNS = ("id", "username", "email", "is_active", "activate_at", "deactivated_at")
+
+
+
+class UserCache:
+    """sub -> (过期时间戳, 用户列值)"""
+
+    def __init__(self, max_size: int = AUTH_USER_CACHE_SIZE, ttl: float = AUTH_USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, sub: str) -> Optional[models.User]:
+        """返回缓存的用户（未命中或已过期时返回 None）"""
+        with self._lock:
+            entry = self._entries.get(sub)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires, values = entry
+            if expires <= time.monotonic():
+                del self._entries[sub]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(sub)
+            self._stats["hits"] += 1
+        return models.User(**values)
+
+    def put(self, sub: str, user: models.User):
+        if self.max_size <= 0:
+            return
+        values = {column: getattr(user, column) for column in CACHED_COLUMNS}
+        with self._lock:
+            self._entries[sub] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(sub)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, sub: Optional[str]):
+        """删除指定 sub 的缓存（不存在时忽略）"""
+        with self._lock:
+            if self._entries.pop(sub, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+            **self._stats,
+        }
+
+
+
+user_cache = UserCache()
@@ -1,6 +1,6 @@
 # app/utils.py
 
-from imports import datetime, timezone, HTTPException, Session
+from imports import datetime, timezone, HTTPException, Session, select
 
 
 
@@ -13,14 +13,20 @@ def get_current_utc_time():
     except AttributeError:
         # 回退到旧方法（Python 3.9+ 应该不需要这个）
         return datetime.utcnow().replace(tzinfo=timezone.utc)
+
+
+def get_stored_utc_time():
+    """获取当前UTC时间（不带时区），用于写入数据库的时间列：SQLite 存储时不保留时区，
+    刚写入的对象与从数据库读回的对象时间一致，POST / PUT 与 GET 响应的时间格式相同"""
+    return get_current_utc_time().replace(tzinfo=None)
     
 
 
 # -------------------------- category 中间件 --------------------------
-def check_category_exists(db: Session, category_id: int):
+def check_category_exists(db: Session, category_id: int, *options):
     from .models import Category, Article
-    """检查分类是否存在，不存在则抛出404异常"""
-    category = db.query(Category).filter(Category.id == category_id).first()
+    """检查分类是否存在，不存在则抛出404异常（options 为查询的加载选项）"""
+    category = db.query(Category).options(*options).filter(Category.id == category_id).first()
     if not category:
         raise HTTPException(status_code=404, detail=f"Category {category_id} not found")
     return category
@@ -39,4 +45,13 @@ def check_article_owner(db: Session, article_id: int, user_id: int):
         raise HTTPException(status_code=404, detail=f"Article {article_id} not found")
     if article.owner_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to modify this article")
-    return article
\ No newline at end of file
+    return article
+
+def load_article_validator(db: Session, article_id: int) -> dict:
+    """只查询文章的版本列（条件请求的校验器，不读取正文），文章不存在则抛出404异常"""
+    from .loading import ARTICLE_VALIDATOR_COLUMNS
+    from .models import Article
+    row = db.execute(select(*ARTICLE_VALIDATOR_COLUMNS).where(Article.id == article_id)).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Article {article_id} not found")
+    return row._asdict()
@@ -0,0 +1,264 @@
+# app/writer.py
+
+"""
+单写线程：串行执行所有写事务，并将多个小事务合并为一次提交（group commit）
+
+- 每个写事务是一个函数 fn(session, *args)，在写线程中于独立的 SAVEPOINT 内执行，
+  单个事务失败只回滚自身，不影响同批次的其他事务
+- 同一批次的所有事务共用一次 COMMIT，提交成功后再把各自的结果/异常交还给调用方
+- 遇到 SQLITE_BUSY（database is locked）时整批回滚，指数退避后重试
+- 写函数中不要调用 commit / rollback，需要数据库生成的字段时调用 flush，
+  返回值应为已完全加载的数据（如 Pydantic 模型），不要返回需要懒加载的 ORM 对象
+- 需要在提交成功后才执行的动作（如更新进程内索引/缓存）用 after_commit 登记，
+  写事务失败时登记的回调会被丢弃；回调在调用方拿到结果之前执行完毕
+"""
+from imports import (
+    queue, threading, time, random, asyncio, logging, Future, Optional, copy_context,
+    sessionmaker, Session, OperationalError, run_in_threadpool
+)
+from .config import (
+    WRITER_QUEUE_ENABLED, WRITER_MAX_BATCH, WRITER_BATCH_WAIT_MS,
+    WRITER_MAX_RETRIES, WRITER_RETRY_BACKOFF_MS
+)
+from .database import SQLALCHEMY_DATABASE_URL, SessionLocal, create_sqlite_engine
+from .profiling import profile_call
+
+
+
+logger = logging.getLogger("blog_api")
+_AFTER_COMMIT_KEY = "after_commit"
+
+
+
+def after_commit(db: Session, callback, *args):
+    """登记写事务提交成功后执行的回调 callback(*args)（在写线程/提交线程中同步执行）"""
+    db.info.setdefault(_AFTER_COMMIT_KEY, []).append((callback, args))
+
+
+
+def _pending_callbacks(db: Session) -> list:
+    return db.info.setdefault(_AFTER_COMMIT_KEY, [])
+
+
+
+def _run_callbacks(callbacks: list):
+    """依次执行提交后回调；回调异常只记录日志，不影响已提交的写事务"""
+    for callback, args in callbacks:
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception(f"提交后回调执行失败：{getattr(callback, '__name__', callback)}")
+
+
+
+def is_busy_error(exc: Exception) -> bool:
+    """判断是否为 SQLite 锁冲突（SQLITE_BUSY / SQLITE_LOCKED）"""
+    if not isinstance(exc, OperationalError):
+        return False
+    message = str(exc.orig).lower()
+    return "locked" in message or "busy" in message
+
+
+
+class _WriteJob:
+    """写队列中的单个写事务（context 为提交方的上下文，写函数在其中执行，如请求级 SQL 统计）"""
+    __slots__ = ("fn", "args", "future", "context")
+
+    def __init__(self, fn, args: tuple, future: Future):
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.context = copy_context()
+
+
+
+class WriteQueue:
+    """单写线程 + 写事务队列"""
+
+    def __init__(
+        self,
+        session_factory,
+        max_batch: int = WRITER_MAX_BATCH,
+        batch_wait_ms: float = WRITER_BATCH_WAIT_MS,
+        max_retries: int = WRITER_MAX_RETRIES,
+        retry_backoff_ms: float = WRITER_RETRY_BACKOFF_MS,
+    ):
+        self._session_factory = session_factory
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000
+        # 运行指标（仅写线程修改）
+        self._stats = {
+            "batches_committed": 0,
+            "jobs_committed": 0,
+            "jobs_failed": 0,
+            "busy_retries": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+        }
+
+    # ---------- 生命周期 ----------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动写线程（重复调用无副作用）"""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止写线程：先处理完已入队的写事务再退出"""
+        if not self.running:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ---------- 提交写事务 ----------
+    def submit(self, fn, *args) -> Future:
+        """提交写事务 fn(session, *args)，返回在提交完成后才会完成的 Future"""
+        future = Future()
+        self._queue.put(_WriteJob(fn, args, future))
+        return future
+
+    def stats(self) -> dict:
+        """运行指标快照：队列深度、提交批次大小等"""
+        snapshot = dict(self._stats)
+        batches = snapshot["batches_committed"]
+        snapshot["queue_depth"] = self._queue.qsize()
+        snapshot["avg_batch_size"] = round(snapshot["jobs_committed"] / batches, 2) if batches else 0.0
+        snapshot["running"] = self.running
+        return snapshot
+
+    # ---------- 写线程 ----------
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            batch, stopping = self._collect_batch(job)
+            self._execute_batch(batch)
+            if stopping:
+                break
+
+    def _collect_batch(self, first: _WriteJob):
+        """以 first 为首，收集队列中已积压的写事务组成一个批次"""
+        batch = [first]
+        stopping = False
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                stopping = True
+                break
+            batch.append(job)
+        # 跳过调用方已取消（如客户端断开）的写事务
+        return [job for job in batch if job.future.set_running_or_notify_cancel()], stopping
+
+    def _execute_batch(self, batch: list):
+        if not batch:
+            return
+        attempt = 0
+        while True:
+            try:
+                outcomes, callbacks = self._commit_batch(batch)
+                break
+            except Exception as e:
+                if is_busy_error(e) and attempt < self.max_retries:
+                    # 指数退避 + 随机抖动，避免与其他写入方同步重试
+                    self._stats["busy_retries"] += 1
+                    time.sleep(self.retry_backoff * (2 ** attempt) * (1 + random.random()))
+                    attempt += 1
+                    continue
+                for job in batch:
+                    job.future.set_exception(e)
+                self._stats["jobs_failed"] += len(batch)
+                return
+
+        _run_callbacks(callbacks)
+        committed = 0
+        for job, result, error in outcomes:
+            if error is None:
+                job.future.set_result(result)
+                committed += 1
+            else:
+                job.future.set_exception(error)
+                self._stats["jobs_failed"] += 1
+        self._stats["batches_committed"] += 1
+        self._stats["jobs_committed"] += committed
+        self._stats["last_batch_size"] = len(batch)
+        self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+
+    def _commit_batch(self, batch: list) -> tuple[list, list]:
+        """
+        在同一个事务中依次执行批次内的写事务（各自一个 SAVEPOINT），最后统一提交
+        返回 (各写事务的结果, 成功写事务登记的提交后回调)
+        """
+        db: Session = self._session_factory()
+        try:
+            outcomes = []
+            callbacks = _pending_callbacks(db)
+            for job in batch:
+                registered = len(callbacks)
+                try:
+                    with db.begin_nested():
+                        result = job.context.run(profile_call, job.fn, db, *job.args)
+                    outcomes.append((job, result, None))
+                except Exception as e:
+                    if is_busy_error(e):
+                        raise  # 锁冲突：整批回滚后重试
+                    del callbacks[registered:]  # 丢弃失败写事务登记的回调
+                    outcomes.append((job, None, e))
+            db.commit()
+            return outcomes, list(callbacks)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+
+# -------------------------- 全局写队列 --------------------------
+# 写线程独占一个 BEGIN IMMEDIATE 连接：事务开始即持有写锁，不会在提交时才发现锁冲突
+writer_engine = create_sqlite_engine(SQLALCHEMY_DATABASE_URL, begin_statement="BEGIN IMMEDIATE")
+WriterSessionLocal = sessionmaker(bind=writer_engine, autoflush=False, expire_on_commit=False)
+write_queue = WriteQueue(WriterSessionLocal)
+
+
+
+def _run_inline(fn, *args):
+    """不经写队列、直接在当前线程执行并提交写事务（写队列关闭时使用）"""
+    db = SessionLocal()
+    try:
+        result = fn(db, *args)
+        db.commit()
+        _run_callbacks(_pending_callbacks(db))
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+
+async def run_write(fn, *args):
+    """
+    执行写事务 fn(session, *args) 并返回其结果
+    - 写队列运行中：交给单写线程执行，等待所在批次提交完成，不占用线程池
+    - 写队列关闭/未启动：在线程池中独立提交
+    """
+    if WRITER_QUEUE_ENABLED and write_queue.running:
+        return await asyncio.wrap_future(write_queue.submit(fn, *args))
+    return await run_in_threadpool(profile_call, _run_inline, fn, *args)
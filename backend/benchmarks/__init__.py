@@ -0,0 +1 @@
+# 仅挂载为包（性能基准脚本，运行方式：cd backend && python -m benchmarks.<模块名>）
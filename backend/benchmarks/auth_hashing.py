@@ -0,0 +1,181 @@
+# benchmarks/auth_hashing.py
+
+"""
+密码哈希基准：登录风暴下的登录吞吐与文章读取延迟（线程池哈希 vs 进程池哈希）
+
+运行方式：
+    cd backend
+    python -m benchmarks.auth_hashing --seconds 10 --readers 4 --logins 16
+
+每种模式在临时目录中启动一个独立的 uvicorn 进程（AUTH_HASH_WORKERS=0 为线程池，其余为进程池）：
+    - 预置：注册 --users 个用户，发布 --articles 篇文章
+    - idle：只有读线程循环请求 GET /articles/{id}，得到读取延迟基线
+    - storm：读线程继续读取，同时 --logins 个线程循环请求 POST /users/login
+    - 统计：登录成功数 / 503 数、读取吞吐与 p50 / p95 / p99 延迟
+"""
+from imports import (
+    argparse, json, os, sys, random, socket, subprocess, tempfile, threading, time,
+    HTTPConnection
+)
+from benchmarks.fts_search import percentile
+
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "bench!pass123"
+
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+
+def request(conn: HTTPConnection, method: str, path: str, body: dict = None, token: str = None):
+    """发送请求并返回 (状态码, 响应 JSON)"""
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, (json.loads(data) if data else None)
+
+
+
+def start_server(port: int, hash_workers: int, **extra_env) -> subprocess.Popen:
+    """在临时目录中启动 uvicorn（数据库文件为该目录下的 sql_app.db），extra_env 为额外的环境变量"""
+    env = dict(os.environ, AUTH_HASH_WORKERS=str(hash_workers), PYTHONPATH=BACKEND_DIR, **extra_env)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=tempfile.mkdtemp(prefix="bench_auth_"), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if request(HTTPConnection("127.0.0.1", port, timeout=5), "GET", "/")[0] == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("uvicorn 启动超时")
+
+
+
+def seed(port: int, user_count: int, article_count: int) -> tuple[list[str], list[int]]:
+    """注册用户并发布文章，返回 (用户邮箱列表, 文章ID列表)"""
+    conn = HTTPConnection("127.0.0.1", port, timeout=30)
+    emails = [f"bench{i}@example.com" for i in range(user_count)]
+    for i, email in enumerate(emails):
+        request(conn, "POST", "/users/register", {"username": f"bench{i}", "email": email, "password": PASSWORD})
+    status, login = request(conn, "POST", "/users/login", {"email": emails[0], "password": PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"预置用户登录失败：{status} {login}")
+    article_ids = []
+    for i in range(article_count):
+        _, article = request(conn, "POST", "/articles", {"title": f"文章 {i}", "content": "正文" * 200}, login["access_token"])
+        article_ids.append(article["id"])
+    return emails, article_ids
+
+
+
+def run_phase(port: int, seconds: float, readers: int, logins: int, emails: list[str], article_ids: list[int]) -> dict:
+    stop = threading.Event()
+    lock = threading.Lock()
+    read_samples, stats = [], {"logins": 0, "rejected": 0, "errors": 0}
+
+    def reader():
+        rng = random.Random()
+        conn = HTTPConnection("127.0.0.1", port, timeout=30)
+        samples = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            status, _ = request(conn, "GET", f"/articles/{rng.choice(article_ids)}")
+            samples.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                with lock:
+                    stats["errors"] += 1
+        with lock:
+            read_samples.extend(samples)
+
+    def login():
+        rng = random.Random()
+        conn = HTTPConnection("127.0.0.1", port, timeout=30)
+        while not stop.is_set():
+            status, _ = request(conn, "POST", "/users/login", {"email": rng.choice(emails), "password": PASSWORD})
+            with lock:
+                if status == 200:
+                    stats["logins"] += 1
+                elif status == 503:
+                    stats["rejected"] += 1
+                else:
+                    stats["errors"] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=login) for _ in range(logins)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "logins_per_sec": round(stats["logins"] / elapsed, 1),
+        "rejected_503": stats["rejected"],
+        "reads_per_sec": round(len(read_samples) / elapsed, 1),
+        "read_p50_ms": round(percentile(read_samples, 50), 2),
+        "read_p95_ms": round(percentile(read_samples, 95), 2),
+        "read_p99_ms": round(percentile(read_samples, 99), 2),
+        "errors": stats["errors"],
+    }
+
+
+
+def run_mode(hash_workers: int, args) -> list[dict]:
+    port = free_port()
+    server = start_server(port, hash_workers)
+    try:
+        emails, article_ids = seed(port, args.users, args.articles)
+        results = []
+        for phase, logins in (("idle", 0), ("storm", args.logins)):
+            row = run_phase(port, args.seconds, args.readers, logins, emails, article_ids)
+            results.append({"hashing": "process" if hash_workers else "thread", "phase": phase, **row})
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录风暴下的登录吞吐与文章读取延迟基准（线程池 vs 进程池哈希）")
+    parser.add_argument("--seconds", type=float, default=10.0, help="每个阶段的运行时长（秒）")
+    parser.add_argument("--readers", type=int, default=4, help="读取线程数")
+    parser.add_argument("--logins", type=int, default=16, help="登录线程数")
+    parser.add_argument("--users", type=int, default=20, help="预置用户数")
+    parser.add_argument("--articles", type=int, default=50, help="预置文章数")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="进程池模式的哈希进程数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = run_mode(0, args) + run_mode(args.workers, args)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'hashing':<9}{'phase':<7}{'logins/s':>10}{'503':>6}{'reads/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'errors':>8}")
+    for r in results:
+        print(
+            f"{r['hashing']:<9}{r['phase']:<7}{r['logins_per_sec']:>10}{r['rejected_503']:>6}{r['reads_per_sec']:>10}"
+            f"{r['read_p50_ms']:>10}{r['read_p95_ms']:>10}{r['read_p99_ms']:>10}{r['errors']:>8}"
+        )
+
+
+
+if __name__ == "__main__":
+    main()
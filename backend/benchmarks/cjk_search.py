@@ -0,0 +1,184 @@
+# benchmarks/cjk_search.py
+
+"""
+中文全文搜索基准：在生成的中文语料上对比 LIKE、word 模式、cjk 模式的召回率与查询延迟
+
+运行方式：
+    cd backend
+    python -m benchmarks.cjk_search --sizes 10000 50000 --queries 200
+
+每个数据量、每种索引模式使用独立的临时数据库文件：
+    - 语料：由常用汉字组成的词表随机成句（词频近似 Zipf 分布，夹杂中文标点）
+    - 查询：从随机文章正文中截取 2~4 个汉字的子串（即用户最常见的中文关键词长度）
+    - 召回率：以 LIKE '%子串%' 的完整结果为基准，统计索引查询命中的比例
+    - 延迟：各方式取第一页（20 条）的 p50 / p95；LIKE 按 (created_at, id) 倒序扫描
+"""
+from imports import argparse, json, os, random, tempfile, time
+from app.database import create_sqlite_engine
+from app.migrations import upgrade_schema
+from app.fts import FTS_TABLE, ensure_fts_schema, build_match_query
+from app.config import SEARCH_BM25_WEIGHTS
+from benchmarks.fts_search import percentile, PAGE_SIZE, SEED_BATCH_SIZE
+
+
+
+COMMON_CHARS = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经"
+    "十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样"
+    "与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文"
+    "总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保"
+    "治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示"
+    "议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难"
+)
+WORDS_PER_ARTICLE = 150
+VOCABULARY_SIZE = 8000
+MODES = ("like", "word", "cjk")
+
+
+
+def make_vocabulary(size: int) -> list[str]:
+    """生成 2~4 字的中文词表（按出现频率从高到低排列）"""
+    rng = random.Random(42)
+    words, seen = [], set()
+    while len(words) < size:
+        word = "".join(rng.choice(COMMON_CHARS) for _ in range(rng.choice((2, 2, 2, 3, 4))))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+
+def make_corpus(article_count: int, vocabulary: list[str]) -> list[tuple]:
+    """生成 (标题, 正文) 列表：词之间不加空格，每 5~12 个词插入一个中文标点"""
+    rng = random.Random(7)
+    size = len(vocabulary)
+
+    def sentence(word_count: int) -> str:
+        parts = []
+        for index in range(word_count):
+            parts.append(vocabulary[min(int(size ** rng.random()) - 1, size - 1)])
+            if index and index % rng.randint(5, 12) == 0:
+                parts.append(rng.choice("，。；"))
+        return "".join(parts)
+
+    return [(sentence(rng.randint(3, 6)), sentence(WORDS_PER_ARTICLE)) for _ in range(article_count)]
+
+
+
+def make_queries(corpus: list[tuple], count: int) -> list[str]:
+    """从随机文章正文中截取 2~4 个汉字的子串作为查询词（不含标点）"""
+    rng = random.Random(11)
+    queries = []
+    while len(queries) < count:
+        content = rng.choice(corpus)[1]
+        length = rng.randint(2, 4)
+        start = rng.randint(0, len(content) - length)
+        query = content[start:start + length]
+        if all(char in COMMON_CHARS for char in query):
+            queries.append(query)
+    return queries
+
+
+
+def seed(engine, corpus: list[tuple]) -> float:
+    """批量写入文章（全文索引由触发器同步维护），返回写入耗时（秒）"""
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, '基准用户', 'bench@example.com', 'x', 1)"
+        )
+        for offset in range(0, len(corpus), SEED_BATCH_SIZE):
+            conn.exec_driver_sql(
+                "INSERT INTO articles (title, content, owner_id, owner_name, created_at) VALUES (?, ?, 1, '基准用户', ?)",
+                [
+                    (title, content, f"2025-01-01 00:00:{i % 60:02d}.{i:06d}")
+                    for i, (title, content) in enumerate(corpus[offset:offset + SEED_BATCH_SIZE], start=offset)
+                ],
+            )
+    return time.perf_counter() - started
+
+
+
+def run_mode(mode: str, corpus: list[tuple], queries: list[str], truth: dict) -> dict:
+    """在临时数据库上以指定模式建立索引，测量召回率与第一页延迟"""
+    workdir = tempfile.mkdtemp(prefix="bench_cjk_")
+    engine = create_sqlite_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}", tuned=True)
+    upgrade_schema(engine)
+    if mode != "like":
+        ensure_fts_schema(engine, mode)
+    else:
+        with engine.begin() as conn:  # LIKE 基准不需要维护全文索引
+            for suffix in ("ai", "ad", "au"):
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+    seed_seconds = seed(engine, corpus)
+
+    weights = ", ".join(str(weight) for weight in SEARCH_BM25_WEIGHTS)
+    page_sql = (
+        f"SELECT a.id, a.title FROM articles a JOIN ("
+        f"SELECT rowid AS id, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?"
+        f") hits ON hits.id = a.id ORDER BY hits.score, hits.id LIMIT {PAGE_SIZE}"
+    )
+    all_sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?"
+    like_sql = f"SELECT id, title FROM articles WHERE content LIKE ? ORDER BY created_at DESC, id DESC LIMIT {PAGE_SIZE}"
+
+    samples, recalls = [], []
+    with engine.connect() as conn:
+        for query in queries:
+            if mode == "like":
+                sql, param = like_sql, f"%{query}%"
+            else:
+                sql, param = page_sql, build_match_query(query, ("content",), mode)
+            started = time.perf_counter()
+            conn.exec_driver_sql(sql, (param,)).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+
+            expected = truth[query]
+            if mode == "like" or not expected:
+                recalls.append(1.0)
+                continue
+            found = set(conn.exec_driver_sql(all_sql, (param,)).scalars().all())
+            recalls.append(len(found & expected) / len(expected))
+    engine.dispose()
+
+    return {
+        "articles": len(corpus),
+        "mode": mode,
+        "recall": round(sum(recalls) / len(recalls), 4),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "seed_seconds": round(seed_seconds, 2),
+    }
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中文语料上 LIKE / word / cjk 三种搜索方式的召回率与延迟基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000], help="文章数量（可多个）")
+    parser.add_argument("--queries", type=int, default=200, help="查询词数量")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(VOCABULARY_SIZE)
+    results = []
+    for size in args.sizes:
+        corpus = make_corpus(size, vocabulary)
+        queries = make_queries(corpus, args.queries)
+        # 基准结果：文章 id 从 1 开始按写入顺序自增
+        truth = {
+            query: {index for index, (_, content) in enumerate(corpus, start=1) if query in content}
+            for query in set(queries)
+        }
+        results += [run_mode(mode, corpus, queries, truth) for mode in MODES]
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'articles':>10}{'mode':>6}{'recall':>10}{'p50(ms)':>12}{'p95(ms)':>12}{'seed(s)':>10}")
+    for r in results:
+        print(f"{r['articles']:>10}{r['mode']:>6}{r['recall']:>10}{r['p50_ms']:>12}{r['p95_ms']:>12}{r['seed_seconds']:>10}")
+
+
+
+if __name__ == "__main__":
+    main()
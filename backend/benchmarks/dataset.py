@@ -0,0 +1,204 @@
+# benchmarks/dataset.py
+
+"""
+可复现的合成数据集：同一 --seed 生成完全相同的数据
+
+运行方式（单独生成数据库文件，也由 benchmarks.load_test 在临时目录中调用）：
+    cd backend
+    python -m benchmarks.dataset --users 2000 --articles 10000 --db /tmp/bench.db
+
+数据分布：
+    - 用户：所有用户使用同一个密码（哈希只计算一次），发文数量呈长尾，少数作者贡献大部分文章
+    - 文章：Markdown 正文（标题、段落、列表、引用、代码块、链接），中英文混排，
+      创建时间按 ID 递增分布在最近一年内，约八成文章属于某个分类
+    - 点赞 / 收藏：文章热度按排名对数均匀分布（少数热门文章获得大部分点赞），每个用户的点赞数也呈长尾
+    - 评论：评论数随文章热度增长，约四成评论回复同一文章下的已有评论，形成多层评论树
+    - 私信：收件箱大小呈长尾，约一半已读
+所有数据通过 SQLAlchemy Core 的批量 INSERT 写入；文章的点赞 / 收藏 / 评论计数在内存中统计后随文章一起写入，
+全文索引由触发器同步维护
+"""
+from imports import argparse, json, random, time, datetime, timedelta
+from app import models
+from app.database import create_sqlite_engine
+from app.hashing import get_password_hash
+from benchmarks.fts_search import make_vocabulary as make_words
+from benchmarks.cjk_search import make_vocabulary as make_cjk_words
+
+
+
+PASSWORD = "bench!pass123"
+BATCH_SIZE = 5000
+CATEGORY_COUNT = 12
+EPOCH = datetime(2025, 1, 1)
+
+
+
+def skewed_index(rng: random.Random, size: int) -> int:
+    """对数均匀抽样排名（0 ~ size-1）：排名越靠前被选中越频繁"""
+    return min(int(size ** rng.random()) - 1, size - 1)
+
+
+
+class _Text:
+    """中英文混排的文本生成器"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.words = make_words(2000)
+        self.cjk_words = make_cjk_words(2000)
+
+    def word(self) -> str:
+        vocabulary = self.cjk_words if self.rng.random() < 0.6 else self.words
+        return vocabulary[skewed_index(self.rng, len(vocabulary))]
+
+    def sentence(self, low: int, high: int) -> str:
+        return " ".join(self.word() for _ in range(self.rng.randint(low, high)))
+
+    def markdown(self) -> str:
+        """生成一篇 Markdown 正文（约 1~4KB）"""
+        rng = self.rng
+        blocks = [f"# {self.sentence(3, 6)}"]
+        for _ in range(rng.randint(2, 6)):
+            kind = rng.random()
+            if kind < 0.15:
+                blocks.append(f"## {self.sentence(2, 5)}")
+            elif kind < 0.3:
+                blocks.append("\n".join(f"- {self.sentence(3, 8)}" for _ in range(rng.randint(2, 5))))
+            elif kind < 0.4:
+                blocks.append(f"> {self.sentence(8, 20)}")
+            elif kind < 0.5:
+                blocks.append(f"```python\ndef {self.words[rng.randrange(100)]}():\n    return {rng.randint(0, 999)}\n```")
+            else:
+                link = f"[{self.word()}](https://example.com/{rng.randrange(10000)})" if rng.random() < 0.3 else ""
+                blocks.append(f"{self.sentence(20, 60)} {link}".strip())
+        return "\n\n".join(blocks)
+
+
+
+def _insert(conn, table, rows: list[dict]):
+    for offset in range(0, len(rows), BATCH_SIZE):
+        conn.execute(table.insert(), rows[offset:offset + BATCH_SIZE])
+
+
+
+def generate_dataset(engine, users: int, articles: int, seed: int = 42) -> dict:
+    """
+    在（已建表的）空数据库中生成数据集，返回数据集描述：
+    规模、各表行数、生成耗时，以及压测脚本需要的样本（邮箱、用户名、热门文章、搜索词等）
+    """
+    rng = random.Random(seed)
+    text = _Text(rng)
+    started = time.perf_counter()
+    hashed_password = get_password_hash(PASSWORD)
+
+    user_rows = [
+        {"id": i, "username": f"user{i:05d}", "email": f"user{i}@example.com", "hashed_password": hashed_password,
+         "is_active": True, "activate_at": EPOCH}
+        for i in range(1, users + 1)
+    ]
+    category_rows = [
+        {"id": i, "name": f"分类{i}-{text.word()}", "description": text.sentence(3, 8), "created_at": EPOCH}
+        for i in range(1, CATEGORY_COUNT + 1)
+    ]
+
+    # 文章：作者为长尾分布，创建时间随 ID 递增
+    article_rows = []
+    span = timedelta(days=365) / max(articles, 1)
+    for i in range(1, articles + 1):
+        owner = skewed_index(rng, users) + 1
+        article_rows.append({
+            "id": i, "title": text.sentence(3, 7), "content": text.markdown(), "owner_id": owner,
+            "owner_name": f"user{owner:05d}", "created_at": EPOCH + span * i,
+            "category_id": rng.randint(1, CATEGORY_COUNT) if rng.random() < 0.8 else None,
+            "like_count": 0, "collect_count": 0, "comment_count": 0,
+        })
+    # 热度排名与文章 ID 无关：打乱后按排名抽样
+    popularity = list(range(1, articles + 1))
+    rng.shuffle(popularity)
+
+    def popular_article() -> int:
+        return popularity[skewed_index(rng, articles)]
+
+    # 点赞 / 收藏：每个用户的数量呈长尾，同一用户对同一文章只记一次
+    like_rows, collect_rows = [], []
+    for rows, key, per_user in ((like_rows, "like_count", 40), (collect_rows, "collect_count", 12)):
+        for user_id in range(1, users + 1):
+            targets = {popular_article() for _ in range(skewed_index(rng, per_user))}
+            for article_id in targets:
+                rows.append({"user_id": user_id, "article_id": article_id,
+                             "created_at": EPOCH + timedelta(days=365, seconds=len(rows))})
+                article_rows[article_id - 1][key] += 1
+
+    # 评论树：热门文章评论更多；约四成评论回复本文已有评论
+    comment_rows = []
+    for rank, article_id in enumerate(popularity):
+        count = max(0, int(30 / (1 + rank * 30 / max(articles, 1))) + rng.randint(-2, 2))
+        thread = []
+        for _ in range(count):
+            comment_id = len(comment_rows) + 1
+            user_id = rng.randint(1, users)
+            parent_id = rng.choice(thread) if thread and rng.random() < 0.4 else None
+            comment_rows.append({
+                "id": comment_id, "user_id": user_id, "user_name": f"user{user_id:05d}", "content": text.sentence(5, 30),
+                "article_id": article_id, "parent_id": parent_id,
+                # (user_id, created_at) 唯一：按评论 ID 递增的时间保证不重复
+                "created_at": EPOCH + timedelta(days=365, microseconds=comment_id),
+            })
+            thread.append(comment_id)
+        article_rows[article_id - 1]["comment_count"] = count
+
+    # 私信：收件人按长尾分布抽样
+    message_rows = [
+        {"sender_id": rng.randint(1, users), "receiver_id": skewed_index(rng, users) + 1, "content": text.sentence(3, 20),
+         "created_at": EPOCH + timedelta(days=365, seconds=i), "is_read": rng.random() < 0.5}
+        for i in range(users * 5)
+    ]
+
+    with engine.begin() as conn:
+        _insert(conn, models.User.__table__, user_rows)
+        _insert(conn, models.Category.__table__, category_rows)
+        _insert(conn, models.Article.__table__, article_rows)
+        _insert(conn, models.Like.__table__, like_rows)
+        _insert(conn, models.Collect.__table__, collect_rows)
+        _insert(conn, models.Comment.__table__, comment_rows)
+        _insert(conn, models.Message.__table__, message_rows)
+
+    # 压测样本：用户（ID 越小收件箱越大）、按热度排名的文章、标题中出现过的搜索词
+    title_words = sorted({word for row in article_rows[:2000] for word in row["title"].split()})
+    return {
+        "seed": seed,
+        "rows": {
+            "users": len(user_rows), "categories": len(category_rows), "articles": len(article_rows),
+            "likes": len(like_rows), "collects": len(collect_rows), "comments": len(comment_rows),
+            "messages": len(message_rows),
+        },
+        "seconds": round(time.perf_counter() - started, 2),
+        "password": PASSWORD,
+        "emails": [row["email"] for row in user_rows],
+        "usernames": [row["username"] for row in user_rows],
+        "articles": popularity,  # 按热度排名
+        "categories": [row["id"] for row in category_rows],
+        "search_terms": rng.sample(title_words, min(200, len(title_words))),
+    }
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成可复现的合成数据集（写入新的 SQLite 数据库文件）")
+    parser.add_argument("--users", type=int, default=2000, help="用户数")
+    parser.add_argument("--articles", type=int, default=10000, help="文章数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--db", default="bench.db", help="数据库文件路径（应为新文件）")
+    args = parser.parse_args()
+
+    from app.migrations import upgrade_schema
+    engine = create_sqlite_engine(f"sqlite:///{args.db}")  # 注册全文索引触发器用到的自定义函数
+    upgrade_schema(engine)
+    dataset = generate_dataset(engine, args.users, args.articles, args.seed)
+    engine.dispose()
+    print(json.dumps({"rows": dataset["rows"], "seconds": dataset["seconds"]}, ensure_ascii=False, indent=2))
+
+
+
+if __name__ == "__main__":
+    main()
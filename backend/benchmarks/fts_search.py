@@ -0,0 +1,148 @@
+# benchmarks/fts_search.py
+
+"""
+全文搜索基准：对比 LIKE '%…%' 扫描与 FTS5 索引在不同数据量下的查询延迟
+
+运行方式：
+    cd backend
+    python -m benchmarks.fts_search --sizes 10000 100000 --repeat 20
+
+每个数据量使用独立的临时数据库文件（表结构与全文索引由 upgrade_schema 创建）：
+    - 文章正文由固定词表随机生成，词频近似 Zipf 分布（少数高频词 + 大量低频词）
+    - 查询词分为高频 / 中频 / 低频三档，分别测量两种方式取第一页（20 条）的延迟
+    - like：按 (created_at, id) 倒序扫描并用 LIKE 过滤（改造前的查询方式）
+    - fts：articles_fts MATCH + bm25 排序（改造后的查询方式）
+"""
+from imports import argparse, json, os, random, tempfile, time
+from app.database import create_sqlite_engine
+from app.migrations import upgrade_schema
+from app.fts import FTS_TABLE, build_match_query
+from app.config import SEARCH_BM25_WEIGHTS
+
+
+
+VOCABULARY_SIZE = 20000
+WORDS_PER_ARTICLE = 120
+SEED_BATCH_SIZE = 5000
+QUERY_RANKS = {"common": 10, "medium": 500, "rare": 15000}   # 查询词在词表中的频率排名
+PAGE_SIZE = 20
+
+
+
+def make_vocabulary(size: int) -> list[str]:
+    """生成固定词表（按出现频率从高到低排列）"""
+    rng = random.Random(42)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words, seen = [], set()
+    while len(words) < size:
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+
+def seed(engine, article_count: int, vocabulary: list[str]) -> float:
+    """批量写入文章（全文索引由触发器同步维护），返回写入耗时（秒）"""
+    rng = random.Random(7)
+    size = len(vocabulary)
+
+    def pick_word() -> str:
+        # 对数均匀抽样排名：排名越靠前出现越频繁
+        return vocabulary[min(int(size ** rng.random()) - 1, size - 1)]
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (1, 'bench', 'bench@example.com', 'x', 1)"
+        )
+        for offset in range(0, article_count, SEED_BATCH_SIZE):
+            rows = [
+                (
+                    " ".join(pick_word() for _ in range(6)),
+                    " ".join(pick_word() for _ in range(WORDS_PER_ARTICLE)),
+                    f"author{i % 500}",
+                    f"2025-01-01 00:00:{i % 60:02d}.{i:06d}",
+                )
+                for i in range(offset, min(offset + SEED_BATCH_SIZE, article_count))
+            ]
+            conn.exec_driver_sql(
+                "INSERT INTO articles (title, content, owner_id, owner_name, created_at) VALUES (?, ?, 1, ?, ?)",
+                rows,
+            )
+    return time.perf_counter() - started
+
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+
+def run_size(article_count: int, repeat: int, vocabulary: list[str]) -> list[dict]:
+    """在指定数据量的临时数据库上测量各档查询词的延迟"""
+    workdir = tempfile.mkdtemp(prefix="bench_fts_")
+    engine = create_sqlite_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}", tuned=True)
+    upgrade_schema(engine)
+    seed_seconds = seed(engine, article_count, vocabulary)
+
+    weights = ", ".join(str(weight) for weight in SEARCH_BM25_WEIGHTS)
+    like_sql = (
+        "SELECT id, title FROM articles WHERE content LIKE ? "
+        f"ORDER BY created_at DESC, id DESC LIMIT {PAGE_SIZE}"
+    )
+    fts_sql = (
+        f"SELECT a.id, a.title FROM articles a JOIN ("
+        f"SELECT rowid AS id, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?"
+        f") hits ON hits.id = a.id ORDER BY hits.score, hits.id LIMIT {PAGE_SIZE}"
+    )
+
+    results = []
+    with engine.connect() as conn:
+        for kind, rank in QUERY_RANKS.items():
+            word = vocabulary[rank]
+            for mode, sql, param in (
+                ("like", like_sql, f"%{word}%"),
+                ("fts", fts_sql, build_match_query(word, ("content",))),
+            ):
+                conn.exec_driver_sql(sql, (param,)).fetchall()  # 预热页缓存
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    conn.exec_driver_sql(sql, (param,)).fetchall()
+                    samples.append((time.perf_counter() - started) * 1000)
+                results.append({
+                    "articles": article_count,
+                    "query": kind,
+                    "mode": mode,
+                    "p50_ms": round(percentile(samples, 50), 3),
+                    "p95_ms": round(percentile(samples, 95), 3),
+                    "seed_seconds": round(seed_seconds, 2),
+                })
+    engine.dispose()
+    return results
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LIKE 扫描 vs FTS5 全文索引 查询延迟基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="文章数量（可多个）")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询的重复次数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    vocabulary = make_vocabulary(VOCABULARY_SIZE)
+    results = [row for size in args.sizes for row in run_size(size, args.repeat, vocabulary)]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'articles':>10}{'query':>8}{'mode':>6}{'p50(ms)':>12}{'p95(ms)':>12}")
+    for r in results:
+        print(f"{r['articles']:>10}{r['query']:>8}{r['mode']:>6}{r['p50_ms']:>12}{r['p95_ms']:>12}")
+
+
+
+if __name__ == "__main__":
+    main()
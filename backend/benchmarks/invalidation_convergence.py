@@ -0,0 +1,250 @@
+# benchmarks/invalidation_convergence.py
+
+"""
+跨 worker 缓存失效的多进程收敛测试：多个 uvicorn 进程共用同一个数据库文件，在其中一个进程上写入，
+测量其余进程的缓存多久之后反映这次写入
+
+运行方式：
+    cd backend
+    python -m benchmarks.invalidation_convergence --workers 4 --rounds 30
+    INVALIDATION_BUS=0 python -m benchmarks.invalidation_convergence --timeout 5   # 对照：只靠 TTL，预期不收敛
+
+流程（所有缓存的 TTL 设为 1 小时，收敛只可能来自失效事件）：
+    1. 在临时目录中启动 --workers 个 uvicorn 进程，端口各不相同（相当于 uvicorn --workers 的各个 worker，但可逐个访问）
+    2. 注册用户并发布一篇文章
+    3. 每一轮先在所有 worker 上读取文章详情与主页（写入缓存），再在第 i % workers 个 worker 上依次执行一种写入
+       （修改标题 / 点赞或取消点赞 / 发表评论），然后并发轮询其余 worker，直到文章详情与主页都读到写入后的结果
+    4. 在最后一个 worker 上注册用户并发布文章，其余 worker 的用户名 / 作者名 / 标题容错查找应能找到（三元组索引增量更新）
+    5. 最后在一个 worker 上注销账号，其余 worker 上该用户的令牌应被拒绝（登录用户缓存失效），
+       按用户名也不应再查到该用户（三元组索引删除）
+每个 worker 从写入返回到读到新结果的时间记为收敛延迟；超过 --timeout 判定为未收敛，退出码为 1
+"""
+from imports import argparse, json, os, sys, subprocess, tempfile, threading, time, HTTPConnection
+from benchmarks.auth_hashing import BACKEND_DIR, PASSWORD, free_port, request
+from benchmarks.fts_search import percentile
+
+
+
+CACHE_TTL_ENV = {"HOME_CACHE_TTL": "3600", "ARTICLE_CACHE_TTL": "3600", "AUTH_USER_CACHE_TTL": "3600"}
+POLL_SECONDS = 0.005
+
+
+
+def start_worker(port: int, workdir: str, log) -> subprocess.Popen:
+    """在共用的目录中启动一个 uvicorn 进程（数据库为该目录下的 sql_app.db）"""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, AUTH_HASH_WORKERS="0", **CACHE_TTL_ENV)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=log, stderr=log,
+    )
+
+
+
+def wait_ready(port: int, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if request(HTTPConnection("127.0.0.1", port, timeout=5), "GET", "/")[0] == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"端口 {port} 上的 uvicorn 启动超时")
+
+
+
+class Worker:
+    """一个 worker 进程及其长连接"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.conn = HTTPConnection("127.0.0.1", port, timeout=30)
+
+    def call(self, method: str, path: str, body: dict = None, token: str = None):
+        return request(self.conn, method, path, body, token)
+
+    def article(self, article_id: int) -> dict:
+        return self.call("GET", f"/articles/{article_id}")[1]
+
+    def home_entry(self, article_id: int) -> dict:
+        _, home = self.call("GET", "/home")
+        return next((entry for entry in home["latest_articles"] if entry["id"] == article_id), {})
+
+    def found_ids(self, path: str) -> set:
+        """搜索结果中的 ID（404 时为空）"""
+        status, body = self.call("GET", path)
+        return {item["id"] for item in body} if status == 200 else set()
+
+
+
+def wait_converged(worker: Worker, check, timeout: float) -> float:
+    """轮询直到 check(worker) 为真，返回耗时（秒）；超时返回 None"""
+    started = time.perf_counter()
+    while True:
+        if check(worker):
+            return time.perf_counter() - started
+        if time.perf_counter() - started > timeout:
+            return None
+        time.sleep(POLL_SECONDS)
+
+
+
+def measure(readers: list[Worker], check, timeout: float) -> list:
+    """并发轮询所有读取方，返回各自的收敛延迟"""
+    delays = [None] * len(readers)
+
+    def run(index: int):
+        delays[index] = wait_converged(readers[index], check, timeout)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(readers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return delays
+
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench_invalidation_")
+    ports = [free_port() for _ in range(args.workers)]
+    log = open(os.path.join(workdir, "workers.log"), "w")
+    # 先启动一个进程建表，避免多个进程同时执行建表与全文索引初始化
+    servers = [start_worker(ports[0], workdir, log)]
+    try:
+        wait_ready(ports[0])
+        servers += [start_worker(port, workdir, log) for port in ports[1:]]
+        for port in ports[1:]:
+            wait_ready(port)
+        return scenario([Worker(port) for port in ports], args)
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait(30)
+        log.close()
+
+
+
+def scenario(workers: list[Worker], args) -> dict:
+    writer = workers[0]
+    users = []
+    for i in range(2):
+        email = f"convergence{i}@example.com"
+        status, user = writer.call("POST", "/users/register", {"username": f"convergence{i}", "email": email, "password": PASSWORD})
+        if status != 200:
+            raise RuntimeError(f"注册失败：{status} {user}")
+        _, login = writer.call("POST", "/users/login", {"email": email, "password": PASSWORD})
+        users.append((user["id"], login["access_token"]))
+    (_, token), (doomed_id, doomed_token) = users
+    _, article = writer.call("POST", "/articles", {"title": "收敛测试", "content": "正文"}, token)
+    article_id = article["id"]
+
+    liked = False
+    delays, failures = {"title": [], "like": [], "comment": []}, []
+    for round_index in range(args.rounds):
+        for worker in workers:  # 写入缓存
+            worker.article(article_id)
+            worker.home_entry(article_id)
+        source = workers[round_index % len(workers)]
+        readers = [worker for worker in workers if worker is not source]
+        kind = ("title", "like", "comment")[round_index % 3]
+
+        if kind == "title":
+            title = f"收敛测试 {round_index}"
+            source.call("PUT", f"/articles/{article_id}", {"title": title, "content": "正文"}, token)
+            check = lambda w: w.article(article_id)["title"] == title and w.home_entry(article_id).get("title") == title
+        elif kind == "like":
+            if liked:
+                source.call("DELETE", f"/interactions/likes/{article_id}", token=token)
+            else:
+                source.call("POST", "/interactions/likes", {"article_id": article_id}, token)
+            liked = not liked
+            expected = int(liked)
+            check = lambda w: (w.article(article_id)["like_count"] == expected
+                               and w.home_entry(article_id).get("like_count") == expected)
+        else:
+            source.call("POST", "/comments", {"article_id": article_id, "content": f"评论 {round_index}"}, token)
+            expected = source.article(article_id)["comment_count"]
+            check = lambda w: (w.article(article_id)["comment_count"] == expected
+                               and w.home_entry(article_id).get("comment_count") == expected)
+
+        round_delays = measure(readers, check, args.timeout)
+        if None in round_delays:
+            failures.append({"round": round_index, "kind": kind, "source": source.port})
+        delays[kind].extend(delay for delay in round_delays if delay is not None)
+
+    # 三元组索引：在最后一个 worker 上注册用户并发布文章，其余 worker 的容错查找（查询词带拼写错误）应能找到；
+    # 在第一个 worker 上注册的待注销用户也应被所有 worker 收录（之后检查注销时的删除）
+    source = workers[-1]
+    status, fresh = source.call("POST", "/users/register", {"username": "trigramfresh", "email": "trigramfresh@example.com", "password": PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"注册失败：{status} {fresh}")
+    _, login = source.call("POST", "/users/login", {"email": "trigramfresh@example.com", "password": PASSWORD})
+    _, fresh_article = source.call("POST", "/articles", {"title": "xylophone quartet", "content": "正文"}, login["access_token"])
+    trigram_delays = measure(
+        workers[:-1],
+        lambda w: (fresh["id"] in w.found_ids("/search/authors/name/trigramfrseh")
+                   and fresh_article["id"] in w.found_ids("/search/articles/author/trigramfrseh")
+                   and fresh_article["id"] in w.found_ids("/search/articles/title/xylophon%20quartte")
+                   and doomed_id in w.found_ids("/search/authors/name/convergence1")),  # 注销前各 worker 都已收录该用户
+        args.timeout
+    )
+    if None in trigram_delays:
+        failures.append({"round": "register", "kind": "trigram", "source": source.port})
+    delays["trigram"] = [delay for delay in trigram_delays if delay is not None]
+
+    # 登录用户缓存：先在所有 worker 上使用令牌（写入缓存），注销后其余 worker 应拒绝该令牌；用户名索引应删除该用户
+    for worker in workers:
+        worker.call("GET", f"/users?user_id={doomed_id}", token=doomed_token)
+    writer.call("DELETE", f"/users/{doomed_id}", token=doomed_token)
+    user_delays = measure(
+        workers[1:],
+        lambda w: (w.call("GET", f"/users?user_id={doomed_id}", token=doomed_token)[0] == 401
+                   and doomed_id not in w.found_ids("/search/authors/name/convergence1")),
+        args.timeout
+    )
+    if None in user_delays:
+        failures.append({"round": "deactivate", "kind": "user", "source": writer.port})
+    delays["user"] = [delay for delay in user_delays if delay is not None]
+
+    return {
+        "workers": len(workers),
+        "rounds": args.rounds,
+        "timeout_seconds": args.timeout,
+        "invalidation_bus": os.getenv("INVALIDATION_BUS", "1"),
+        "poll_interval_ms": os.getenv("INVALIDATION_POLL_MS", "100"),
+        "converged": not failures,
+        "failures": failures,
+        "delay_ms": {
+            kind: {
+                "samples": len(values),
+                "p50": round(percentile(values, 50) * 1000, 1) if values else None,
+                "p99": round(percentile(values, 99) * 1000, 1) if values else None,
+                "max": round(max(values) * 1000, 1) if values else None,
+            }
+            for kind, values in delays.items()
+        },
+    }
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程收敛测试：一个 worker 写入后，其余 worker 的缓存多久反映写入")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn 进程数")
+    parser.add_argument("--rounds", type=int, default=30, help="写入轮数（修改标题 / 点赞 / 评论轮流进行）")
+    parser.add_argument("--timeout", type=float, default=5.0, help="单个 worker 的最长收敛时间（秒），超过即判定未收敛")
+    args = parser.parse_args()
+    if args.workers < 2:
+        parser.error("--workers 至少为 2")
+
+    report = run(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not report["converged"]:
+        print(f"未收敛：{len(report['failures'])} 次写入在 {args.timeout}s 内未反映到所有 worker", file=sys.stderr)
+        sys.exit(1)
+    print("已收敛：所有写入都在时限内反映到其余 worker", file=sys.stderr)
+
+
+
+if __name__ == "__main__":
+    main()
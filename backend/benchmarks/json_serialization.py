@@ -0,0 +1,154 @@
+# benchmarks/json_serialization.py
+
+"""
+响应序列化基准：FastAPI 默认路径与 app/serialization.py 快速路径的单次编码耗时（按响应模型）
+
+运行方式：
+    cd backend
+    python -m benchmarks.json_serialization --rounds 2000
+
+每种响应模型使用路由实际返回的数据规模（已构造好的模型实例）：
+    - ArticleWithStats：文章详情，约 2KB 正文 + --comments 条评论
+    - CommentMinimal：--items 条评论的列表
+    - HomeResponse：10 个分类 + 10 篇最新文章
+    - Message：--items 条私信的列表
+对比三种路径：
+    - fastapi+json：改造前，response_model 校验 + 转换为 dict + 标准库 json 编码（JSONResponse）
+    - fastapi+orjson：同上，改用全局默认的 ORJSONResponse 编码
+    - type_adapter：预编译 TypeAdapter 直接编码模型实例（schema_response，跳过重复校验）
+"""
+from imports import (
+    argparse, asyncio, json, time, datetime,
+    JSONResponse, ORJSONResponse
+)
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app import schemas
+from app.serialization import dump_json
+from benchmarks.fts_search import percentile
+
+
+
+NOW = datetime(2025, 1, 1, 12, 0, 0)
+
+
+
+def build_cases(items: int, comments: int) -> list[tuple[str, object, object]]:
+    """返回 (名称, 响应类型, 已构造好的响应数据)"""
+    def comment(i: int) -> schemas.CommentMinimal:
+        return schemas.CommentMinimal(
+            id=i, content=f"第 {i} 条评论，写得不错" * 3, user_name=f"user{i % 50}", user_id=i % 50 + 1,
+            article_id=1, parent_id=None if i % 3 else i - 1, created_at=NOW
+        )
+
+    article = schemas.ArticleWithStats(
+        id=1, title="基准文章", content="正文内容" * 256, owner_id=1, owner_name="bench", created_at=NOW,
+        category_id=3, like_count=12, collect_count=4, comment_count=comments, is_liked=True, is_collected=False,
+        comments=[comment(i) for i in range(1, comments + 1)]
+    )
+    home = schemas.HomeResponse.model_validate({
+        "categories": [
+            {"id": i, "name": f"分类{i}", "description": "分类描述", "created_at": NOW, "articles": [
+                {"id": i * 10 + j, "title": f"文章{j}", "owner_id": 1, "owner_name": "bench", "created_at": NOW}
+                for j in range(3)
+            ]}
+            for i in range(1, 11)
+        ],
+        "latest_articles": [
+            {"id": i, "title": f"最新文章{i}", "owner_id": 1, "owner_name": "bench", "created_at": NOW,
+             "like_count": i, "collect_count": i // 2, "comment_count": i * 3}
+            for i in range(1, 11)
+        ],
+    })
+    messages = [
+        schemas.Message(id=i, sender_id=i % 50 + 1, sender_email=f"user{i % 50}@example.com", created_at=NOW, is_read=bool(i % 2))
+        for i in range(1, items + 1)
+    ]
+    return [
+        ("ArticleWithStats", schemas.ArticleWithStats, article),
+        ("CommentMinimal", list[schemas.CommentMinimal], [comment(i) for i in range(1, items + 1)]),
+        ("HomeResponse", schemas.HomeResponse, home),
+        ("Message", list[schemas.Message], messages),
+    ]
+
+
+
+async def encode_fastapi(field, content, response_class) -> bytes:
+    """FastAPI 对非 Response 返回值的处理：按响应模型校验并转换为 dict，再由响应类编码"""
+    return response_class(await serialize_response(field=field, response_content=content)).body
+
+
+
+async def encode_adapter(schema, content) -> bytes:
+    """快速路径：预编译 TypeAdapter 直接编码模型实例"""
+    return dump_json(schema, content)
+
+
+
+async def measure(fn, rounds: int) -> list[float]:
+    """返回每次编码的耗时（微秒）"""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+
+async def run(rounds: int, items: int, comments: int) -> list[dict]:
+    results = []
+    for name, schema, content in build_cases(items, comments):
+        field = create_model_field(name=f"Response_{name}", type_=schema, mode="serialization")
+        paths = {
+            "fastapi+json": lambda: encode_fastapi(field, content, JSONResponse),
+            "fastapi+orjson": lambda: encode_fastapi(field, content, ORJSONResponse),
+            "type_adapter": lambda: encode_adapter(schema, content),
+        }
+        # 三种路径的输出必须一致（JSON 语义相同）
+        outputs = {json.dumps(json.loads(await fn()), sort_keys=True) for fn in paths.values()}
+        assert len(outputs) == 1, f"{name} 输出不一致"
+
+        size = len(dump_json(schema, content))
+        baseline = None
+        for path, fn in paths.items():
+            await measure(fn, min(rounds, 200))  # 预热
+            samples = await measure(fn, rounds)
+            mean = sum(samples) / len(samples)
+            baseline = baseline or mean
+            results.append({
+                "schema": name,
+                "path": path,
+                "bytes": size,
+                "mean_us": round(mean, 1),
+                "p50_us": round(percentile(samples, 50), 1),
+                "p99_us": round(percentile(samples, 99), 1),
+                "speedup": round(baseline / mean, 2),
+            })
+    return results
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化基准（FastAPI 默认路径 vs orjson vs 预编译 TypeAdapter）")
+    parser.add_argument("--rounds", type=int, default=2000, help="每种组合的编码次数")
+    parser.add_argument("--items", type=int, default=20, help="列表响应的条数（与默认分页大小一致）")
+    parser.add_argument("--comments", type=int, default=20, help="文章详情中的评论数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.rounds, args.items, args.comments))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'schema':<18}{'path':<16}{'bytes':>8}{'mean(us)':>11}{'p50(us)':>10}{'p99(us)':>10}{'speedup':>9}")
+    for r in results:
+        print(
+            f"{r['schema']:<18}{r['path']:<16}{r['bytes']:>8}{r['mean_us']:>11}{r['p50_us']:>10}"
+            f"{r['p99_us']:>10}{r['speedup']:>9}"
+        )
+
+
+
+if __name__ == "__main__":
+    main()
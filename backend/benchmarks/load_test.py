@@ -0,0 +1,280 @@
+# benchmarks/load_test.py
+
+"""
+可复现的进程内压测：在合成数据集上按流量配比驱动真实的 FastAPI 应用，按路由输出吞吐与延迟分位数
+
+运行方式：
+    cd backend
+    python -m benchmarks.load_test --users 2000 --articles 10000 --concurrency 32 --seconds 30 --out run.json
+    python -m benchmarks.load_test ... --out new.json --compare run.json   # 与上一次结果对比
+
+流程：
+    1. 在临时目录中建库，并用 benchmarks.dataset 按 --seed 生成数据集（同一种子数据完全相同）
+    2. 在当前进程内运行应用的 lifespan（写线程、黑名单、哈希进程池等与线上一致），
+       通过 httpx.ASGITransport 直接调用 ASGI 应用（含全部中间件，不经过网络与 uvicorn）
+    3. --concurrency 个虚拟用户各自登录，再按 --mix 配比循环发起请求；先预热 --warmup 秒，再计时 --seconds 秒
+    4. 结果按路由模板汇总（请求数、吞吐、p50 / p95 / p99、状态码分布），连同提交号、参数和环境变量写入 --out
+
+流量配比（--mix，名称=权重）：
+    - home：GET /home
+    - article：GET /articles/{article_id}（按热度抽样，一半请求带登录态）
+    - comments：GET /comments/article/{article_id}
+    - search：全文搜索 / 标题搜索 / 作者名容错搜索
+    - interactions：我的点赞 / 我的收藏
+    - messages：收件箱 / 发件箱
+    - login：POST /users/login
+    - write：点赞（已点赞时取消）/ 发表评论 / 发送私信
+每个虚拟用户的随机数种子由 --seed 派生，请求序列可复现（并发交错顺序除外）
+"""
+from imports import (
+    argparse, asyncio, json, logging, os, random, subprocess, sys, tempfile, time, datetime, timezone
+)
+import httpx  # 基准测试专用依赖，不放入应用共用的 imports.py
+# 注意：本模块顶层不能导入 app 下的模块。SQLite 驱动在创建引擎时就把相对路径 ./sql_app.db 解析为绝对路径，
+# 必须先切换到临时目录再导入应用（见 run），否则会写入 backend 目录下的开发数据库
+
+
+
+DEFAULT_MIX = "home=15,article=30,comments=10,search=15,interactions=8,messages=8,login=4,write=10"
+# 写入报告的运行配置（便于对比不同提交 / 配置下的结果）
+REPORT_ENV = (
+    "DATABASE_MODE", "SQLITE_TUNING", "WRITER_QUEUE", "AUTH_HASH_WORKERS", "AUTH_USER_CACHE_SIZE",
+    "SEARCH_FTS_MODE", "QUERY_STATS", "METRICS", "SLOW_QUERY_LOG",
+)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+
+class VirtualUser:
+    """一个虚拟用户：固定的账号、随机数种子与登录令牌"""
+
+    def __init__(self, index: int, client: httpx.AsyncClient, dataset: dict, seed: int):
+        self.client = client
+        self.dataset = dataset
+        self.rng = random.Random(seed * 100003 + index)
+        self.user_id = index % len(dataset["emails"]) + 1
+        self.email = dataset["emails"][self.user_id - 1]
+        self.token = None
+
+    @property
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def article_id(self) -> int:
+        articles = self.dataset["articles"]
+        return articles[min(int(len(articles) ** self.rng.random()) - 1, len(articles) - 1)]
+
+    async def login(self) -> tuple[str, int]:
+        response = await self.client.post("/users/login", json={"email": self.email, "password": self.dataset["password"]})
+        if response.status_code == 200:
+            self.token = response.json()["access_token"]
+        return "POST /users/login", response.status_code
+
+    # ---------- 各类请求：返回 (路由模板, 状态码) ----------
+    async def home(self):
+        return "GET /home", (await self.client.get("/home")).status_code
+
+    async def article(self):
+        headers = self.auth if self.rng.random() < 0.5 else None
+        return "GET /articles/{article_id}", (await self.client.get(f"/articles/{self.article_id()}", headers=headers)).status_code
+
+    async def comments(self):
+        return "GET /comments/article/{article_id}", (await self.client.get(f"/comments/article/{self.article_id()}")).status_code
+
+    async def search(self):
+        term = self.rng.choice(self.dataset["search_terms"])
+        kind = self.rng.random()
+        if kind < 0.5:
+            return "GET /search/articles", (await self.client.get("/search/articles", params={"q": term})).status_code
+        if kind < 0.8:
+            return "GET /search/articles/title/{title}", (await self.client.get(f"/search/articles/title/{term}")).status_code
+        name = self.rng.choice(self.dataset["usernames"])[:7]
+        return "GET /search/authors/name/{username}", (await self.client.get(f"/search/authors/name/{name}")).status_code
+
+    async def interactions(self):
+        path = "/interactions/my/likes" if self.rng.random() < 0.5 else "/interactions/my/collects"
+        return f"GET {path}", (await self.client.get(path, headers=self.auth)).status_code
+
+    async def messages(self):
+        path = "/messages/received" if self.rng.random() < 0.7 else "/messages/sent"
+        return f"GET {path}", (await self.client.get(path, headers=self.auth)).status_code
+
+    async def write(self):
+        kind = self.rng.random()
+        if kind < 0.5:
+            article_id = self.article_id()
+            response = await self.client.post("/interactions/likes", json={"article_id": article_id}, headers=self.auth)
+            if response.status_code == 400:  # 已点赞：改为取消点赞
+                response = await self.client.delete(f"/interactions/likes/{article_id}", headers=self.auth)
+                return "DELETE /interactions/likes/{article_id}", response.status_code
+            return "POST /interactions/likes", response.status_code
+        if kind < 0.8:
+            body = {"article_id": self.article_id(), "content": f"压测评论 {self.rng.random()}"}
+            return "POST /comments", (await self.client.post("/comments", json=body, headers=self.auth)).status_code
+        body = {"content": "压测私信", "receiver_email": self.rng.choice(self.dataset["emails"])}
+        return "POST /messages", (await self.client.post("/messages", json=body, headers=self.auth)).status_code
+
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        if not hasattr(VirtualUser, name) or name in ("auth", "article_id"):
+            raise SystemExit(f"未知的流量类型：{name}")
+        weights[name] = float(weight)
+    return weights
+
+
+
+async def drive(users: list[VirtualUser], mix: dict[str, float], seconds: float, samples: dict = None):
+    """所有虚拟用户并发循环发起请求 seconds 秒；samples 为 None 时只预热不记录"""
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + seconds
+
+    async def loop(user: VirtualUser):
+        while time.perf_counter() < deadline:
+            name = user.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                route, status = await getattr(user, name)()
+            except Exception as e:
+                route, status = name, f"exception:{type(e).__name__}"
+            if samples is not None:
+                entry = samples.setdefault(route, {"latencies": [], "statuses": {}})
+                entry["latencies"].append((time.perf_counter() - started) * 1000)
+                entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+
+    await asyncio.gather(*(loop(user) for user in users))
+
+
+
+def summarize(latencies: list[float], statuses: dict, seconds: float) -> dict:
+    from benchmarks.fts_search import percentile
+    errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500)
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / seconds, 1),
+        "errors": errors,
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+
+def git_revision() -> dict:
+    """当前提交号与工作区是否有未提交修改（不在 git 仓库中时为空）"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+
+
+
+async def run(args, mix: dict[str, float]) -> dict:
+    # 应用使用相对路径 ./sql_app.db：先切换到临时目录，再导入应用
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    os.chdir(workdir)
+    import main
+    from app.database import engine
+    from app.migrations import upgrade_schema
+    from benchmarks.dataset import generate_dataset
+
+    upgrade_schema(engine)
+    if not os.path.exists(os.path.join(workdir, "sql_app.db")):
+        raise SystemExit("应用在切换目录前已被导入，数据库不在临时目录中，已停止以免写入开发数据库")
+    dataset = generate_dataset(engine, args.users, args.articles, args.seed)
+    print(f"数据集已生成（{dataset['seconds']}s）：{dataset['rows']}", file=sys.stderr)
+    logging.getLogger("blog_api").setLevel(logging.CRITICAL)  # 预期内的 4xx（如重复点赞）不逐条打印
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            users = [VirtualUser(i, client, dataset, args.seed) for i in range(args.concurrency)]
+            await asyncio.gather(*(user.login() for user in users))
+            await drive(users, mix, args.warmup)
+            samples = {}
+            started = time.perf_counter()
+            await drive(users, mix, args.seconds, samples)
+            elapsed = time.perf_counter() - started
+
+    all_latencies = [latency for entry in samples.values() for latency in entry["latencies"]]
+    all_statuses = {}
+    for entry in samples.values():
+        for status, count in entry["statuses"].items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    return {
+        "meta": {
+            **git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "mix": mix,
+            "env": {name: os.environ[name] for name in REPORT_ENV if name in os.environ},
+            "dataset": {"rows": dataset["rows"], "seconds": dataset["seconds"]},
+            "seconds": round(elapsed, 2),
+        },
+        "total": summarize(all_latencies, all_statuses, elapsed),
+        "routes": {
+            route: summarize(entry["latencies"], entry["statuses"], elapsed)
+            for route, entry in sorted(samples.items())
+        },
+    }
+
+
+
+def print_report(report: dict, baseline: dict = None):
+    def delta(route: str, key: str) -> str:
+        if baseline is None:
+            return ""
+        old = (baseline["total"] if route == "total" else baseline["routes"].get(route, {})).get(key)
+        new = (report["total"] if route == "total" else report["routes"][route])[key]
+        return f"({(new - old) / old * 100:+.0f}%)" if old else "(new)"
+
+    print(f"{'route':<42}{'requests':>9}{'rps':>16}{'p50(ms)':>16}{'p95(ms)':>16}{'p99(ms)':>16}{'errors':>8}")
+    rows = [("total", report["total"])] + list(report["routes"].items())
+    for route, r in rows:
+        print(
+            f"{route:<42}{r['requests']:>9}"
+            + "".join(f"{str(r[key]) + delta(route, key):>16}" for key in ("rps", "p50_ms", "p95_ms", "p99_ms"))
+            + f"{r['errors']:>8}"
+        )
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成数据集上的进程内压测（按路由输出吞吐与 p50 / p95 / p99）")
+    parser.add_argument("--users", type=int, default=2000, help="数据集用户数")
+    parser.add_argument("--articles", type=int, default=10000, help="数据集文章数")
+    parser.add_argument("--seed", type=int, default=42, help="数据集与虚拟用户的随机种子")
+    parser.add_argument("--concurrency", type=int, default=32, help="虚拟用户数（并发请求数）")
+    parser.add_argument("--seconds", type=float, default=30.0, help="计时阶段时长（秒）")
+    parser.add_argument("--warmup", type=float, default=5.0, help="预热时长（秒）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="流量配比，如 home=15,article=30,...")
+    parser.add_argument("--out", default="load_test.json", help="结果 JSON 文件路径")
+    parser.add_argument("--compare", help="对比的基线结果 JSON 文件")
+    args = parser.parse_args()
+
+    # 输出路径在切换到临时目录前解析
+    args.out = os.path.abspath(args.out)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = asyncio.run(run(args, parse_mix(args.mix)))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_report(report, baseline)
+    print(f"\n结果已写入 {args.out}")
+
+
+
+if __name__ == "__main__":
+    main()
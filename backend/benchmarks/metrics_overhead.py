@@ -0,0 +1,109 @@
+# benchmarks/metrics_overhead.py
+
+"""
+运行指标记录开销基准：对比挂载 / 不挂载 MetricsMiddleware 时的单请求耗时，以及导出 /metrics 的耗时
+
+运行方式：
+    cd backend
+    python -m benchmarks.metrics_overhead --requests 20000 --routes 40
+
+直接以 ASGI 方式调用应用（不经过网络和服务器），测量中间件本身的开销：
+    - none：不挂载中间件（基线）
+    - metrics：只挂载 MetricsMiddleware
+    - metrics+query_stats：同时挂载 QueryStatsMiddleware（与线上默认配置一致）
+请求轮流分布到 --routes 个路由模板上；render 一行为注册表中已有 --routes 个路由时导出一次的耗时
+"""
+from imports import argparse, asyncio, json, time, FastAPI
+from app.middleware import MetricsMiddleware, QueryStatsMiddleware
+from app.metrics import MetricsRegistry
+from benchmarks.fts_search import percentile
+from benchmarks.token_middleware import ARTICLE
+
+
+
+def build_app(variant: str, routes: int, registry: MetricsRegistry) -> FastAPI:
+    app = FastAPI()
+    for i in range(routes):
+        @app.get(f"/route{i}/{{item_id}}")
+        async def read_article(item_id: int):
+            return ARTICLE
+
+    if variant.startswith("metrics"):
+        app.add_middleware(MetricsMiddleware, registry=registry)
+    if variant == "metrics+query_stats":
+        app.add_middleware(QueryStatsMiddleware)
+    return app
+
+
+
+async def measure(app: FastAPI, routes: int, requests: int) -> list[float]:
+    """逐个发起请求，返回每个请求的耗时（微秒）"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    samples = []
+    for i in range(requests):
+        path = f"/route{i % routes}/{i}"
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+            "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        }
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+
+async def run(requests: int, routes: int) -> list[dict]:
+    results = []
+    for variant in ("none", "metrics", "metrics+query_stats"):
+        registry = MetricsRegistry()
+        app = build_app(variant, routes, registry)
+        await measure(app, routes, min(requests, 1000))  # 预热
+        samples = await measure(app, routes, requests)
+        results.append({
+            "variant": variant,
+            "mean_us": round(sum(samples) / len(samples), 1),
+            "p50_us": round(percentile(samples, 50), 1),
+            "p99_us": round(percentile(samples, 99), 1),
+        })
+
+    samples = []
+    for _ in range(200):
+        started = time.perf_counter()
+        registry.render()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    results.append({
+        "variant": "render",
+        "mean_us": round(sum(samples) / len(samples), 1),
+        "p50_us": round(percentile(samples, 50), 1),
+        "p99_us": round(percentile(samples, 99), 1),
+    })
+    return results
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行指标中间件单请求开销与 /metrics 导出耗时")
+    parser.add_argument("--requests", type=int, default=20000, help="每种组合的请求数")
+    parser.add_argument("--routes", type=int, default=40, help="路由模板数（即指标的标签组合数）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.routes))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'variant':<22}{'mean(us)':>11}{'p50(us)':>10}{'p99(us)':>10}")
+    for r in results:
+        print(f"{r['variant']:<22}{r['mean_us']:>11}{r['p50_us']:>10}{r['p99_us']:>10}")
+
+
+
+if __name__ == "__main__":
+    main()
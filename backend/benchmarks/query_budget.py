@@ -0,0 +1,145 @@
+# benchmarks/query_budget.py
+
+"""
+接口查询预算检查：逐个请求 GET 接口，读取 X-Query-Stats 响应头，断言 SQL 条数不超过预算且没有疑似 N+1
+
+运行方式：
+    cd backend
+    python -m benchmarks.query_budget --rows 20
+
+- 在临时目录中启动 uvicorn（QUERY_STATS_HEADER=1），预置 --rows 个用户 / 分类 / 文章，
+  并为每篇文章写入评论、点赞、收藏和私信，使列表接口的每一页都有多行数据
+- 每个接口先请求一次预热（登录用户缓存等），再请求一次并用 assert_query_budget 校验
+- 预算与结果条数无关：出现逐行懒加载时，条数会超出预算，并且同一语句形状重复出现
+- 任一接口超出预算时退出码为 1，可直接用于 CI
+"""
+from imports import argparse, json, sys, HTTPConnection
+from app.query_stats import QUERY_STATS_HEADER, parse_query_stats, assert_query_budget
+from benchmarks.auth_hashing import PASSWORD, free_port, request, start_server
+
+
+
+# (路径模板, 是否需要登录, SQL 条数预算)
+BUDGETS = [
+    ("/home", False, 3),
+    ("/categories", False, 2),
+    ("/categories/{category_id}", False, 2),
+    ("/categories/id/{category_id}/articles", False, 2),
+    ("/categories/name/{category_name}/articles", False, 2),
+    ("/articles/{article_id}", False, 1),
+    ("/articles/{article_id}", True, 4),
+    ("/comments/article/{article_id}", False, 3),
+    ("/comments/{comment_id}", False, 3),
+    ("/search/articles?q=bench", False, 1),
+    ("/search/articles/id/{article_id}", False, 2),
+    ("/search/articles/title/bench", False, 2),
+    ("/search/articles/content/body", False, 2),
+    ("/search/articles/author/{username}", False, 3),
+    ("/search/authors/id/{user_id}", False, 3),
+    ("/search/authors/email/{email}", False, 3),
+    ("/search/authors/name/bench", False, 3),
+    ("/users?user_id={user_id}", True, 3),
+    ("/messages/received", True, 1),
+    ("/messages/sent", True, 1),
+    ("/interactions/my/likes", True, 1),
+    ("/interactions/my/collects", True, 1),
+]
+
+
+
+def seed(port: int, rows: int) -> tuple[dict, str]:
+    """预置数据，返回 (路径模板参数, 第一个用户的令牌)"""
+    conn = HTTPConnection("127.0.0.1", port, timeout=30)
+    tokens = []
+    for i in range(rows):
+        email = f"bench{i}@example.com"
+        request(conn, "POST", "/users/register", {"username": f"bench{i}", "email": email, "password": PASSWORD})
+        _, login = request(conn, "POST", "/users/login", {"email": email, "password": PASSWORD})
+        tokens.append(login["access_token"])
+    categories = [
+        request(conn, "POST", "/categories", {"name": f"bench-category-{i}"}, tokens[0])[1]["id"]
+        for i in range(rows)
+    ]
+    article_ids = []
+    for i in range(rows):
+        _, article = request(conn, "POST", "/articles", {"title": f"bench article {i}", "content": f"body {i}"}, tokens[i])
+        article_ids.append(article["id"])
+        request(conn, "PUT", f"/articles/{article['id']}/category/id/{categories[0]}", None, tokens[i])
+        request(conn, "POST", "/interactions/likes", {"article_id": article["id"]}, tokens[0])
+        request(conn, "POST", "/interactions/collects", {"article_id": article["id"]}, tokens[0])
+        # 每个用户都在第一篇文章下评论、给第一个用户发私信，第一个用户也给每个用户回复私信
+        _, comment = request(conn, "POST", "/comments", {"article_id": article_ids[0], "content": f"comment {i}"}, tokens[i])
+        if i:
+            request(conn, "POST", "/messages", {"content": f"hello {i}", "receiver_email": "bench0@example.com"}, tokens[i])
+            request(conn, "POST", "/messages", {"content": f"reply {i}", "receiver_email": f"bench{i}@example.com"}, tokens[0])
+    params = {
+        "category_id": categories[0], "category_name": "bench-category-0", "article_id": article_ids[0],
+        "comment_id": comment["id"], "user_id": 1, "email": "bench0@example.com", "username": "bench0",
+    }
+    return params, tokens[0]
+
+
+
+def get_stats(conn: HTTPConnection, path: str, token: str = None) -> tuple[int, dict]:
+    """请求接口并返回 (状态码, 解析后的 X-Query-Stats)"""
+    conn.request("GET", path, headers={"Authorization": f"Bearer {token}"} if token else {})
+    response = conn.getresponse()
+    response.read()
+    return response.status, parse_query_stats(response.getheader(QUERY_STATS_HEADER, "count=0; n_plus_one=0"))
+
+
+
+def run(rows: int) -> list[dict]:
+    port = free_port()
+    server = start_server(port, 0, QUERY_STATS_HEADER="1")
+    try:
+        params, token = seed(port, rows)
+        conn = HTTPConnection("127.0.0.1", port, timeout=30)
+        results = []
+        for template, login, budget in BUDGETS:
+            path = template.format(**params)
+            auth = token if login else None
+            get_stats(conn, path, auth)  # 预热
+            status, stats = get_stats(conn, path, auth)
+            try:
+                if status != 200:
+                    raise AssertionError(f"状态码 {status}")
+                assert_query_budget(stats, budget, label=path)
+                error = None
+            except AssertionError as e:
+                error = str(e)
+            results.append({
+                "path": path, "login": login, "budget": budget, "queries": stats["count"],
+                "time_ms": stats.get("time_ms", 0.0), "n_plus_one": stats["n_plus_one"], "error": error,
+            })
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口 SQL 查询预算检查（X-Query-Stats + assert_query_budget）")
+    parser.add_argument("--rows", type=int, default=20, help="预置的用户 / 文章 / 评论等数据行数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = run(args.rows)
+    failed = [r for r in results if r["error"]]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'path':<40}{'login':>6}{'budget':>8}{'queries':>9}{'time(ms)':>10}{'n+1':>5}  result")
+        for r in results:
+            print(
+                f"{r['path']:<40}{str(r['login']):>6}{r['budget']:>8}{r['queries']:>9}{r['time_ms']:>10}"
+                f"{r['n_plus_one']:>5}  {'FAIL ' + r['error'] if r['error'] else 'ok'}"
+            )
+        print(f"\n{len(results) - len(failed)}/{len(results)} 个接口在预算内")
+    sys.exit(1 if failed else 0)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# benchmarks/sqlite_profile.py
+
+"""
+SQLite 引擎调优基准：对比调优 profile 开/关时的混合读写吞吐
+
+运行方式：
+    cd backend
+    python -m benchmarks.sqlite_profile --seconds 10 --readers 8 --writers 2
+
+每种配置使用独立的临时数据库文件：
+    - 读线程：模拟 read_article（按主键取文章 + 统计点赞/收藏数）
+    - 写线程：模拟点赞/评论写入（每次写入单独提交）
+"""
+from imports import (
+    argparse, json, os, random, tempfile, threading, time,
+    func, sessionmaker
+)
+from app.database import Base, create_sqlite_engine
+from app import models
+
+
+
+def seed(session_factory, article_count: int):
+    """写入基准所需的初始数据"""
+    db = session_factory()
+    try:
+        db.add(models.User(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        db.add_all(
+            models.Article(id=i, title=f"文章 {i}", content="正文" * 500, owner_id=1, owner_name="bench")
+            for i in range(1, article_count + 1)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+
+def run_profile(tuned: bool, seconds: float, readers: int, writers: int, article_count: int) -> dict:
+    """在临时数据库上运行一轮混合读写负载"""
+    workdir = tempfile.mkdtemp(prefix="bench_sqlite_")
+    engine = create_sqlite_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}", tuned=tuned)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed(SessionLocal, article_count)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"reads": 0, "writes": 0, "errors": 0}
+    write_seq = iter(range(1, 10**9))
+
+    def reader():
+        rng = random.Random()
+        done = 0
+        while not stop.is_set():
+            db = SessionLocal()
+            try:
+                article_id = rng.randint(1, article_count)
+                db.query(models.Article).filter(models.Article.id == article_id).first()
+                db.query(func.count(models.Like.id)).filter(models.Like.article_id == article_id).scalar()
+                db.query(func.count(models.Collect.id)).filter(models.Collect.article_id == article_id).scalar()
+                done += 1
+            except Exception:
+                with lock:
+                    stats["errors"] += 1
+            finally:
+                db.close()
+        with lock:
+            stats["reads"] += done
+
+    def writer():
+        rng = random.Random()
+        done = 0
+        while not stop.is_set():
+            db = SessionLocal()
+            try:
+                with lock:
+                    seq = next(write_seq)
+                article_id = rng.randint(1, article_count)
+                db.add(models.Like(user_id=seq, article_id=article_id))
+                db.add(models.Comment(user_id=1, user_name="bench", content=f"评论 {seq}", article_id=article_id))
+                db.commit()
+                done += 1
+            except Exception:
+                db.rollback()
+                with lock:
+                    stats["errors"] += 1
+            finally:
+                db.close()
+        with lock:
+            stats["writes"] += done
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        "profile": "tuned" if tuned else "default",
+        "seconds": round(elapsed, 2),
+        "reads_per_sec": round(stats["reads"] / elapsed, 1),
+        "writes_per_sec": round(stats["writes"] / elapsed, 1),
+        "errors": stats["errors"],
+    }
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 调优 profile 混合读写基准")
+    parser.add_argument("--seconds", type=float, default=10.0, help="每种配置的运行时长（秒）")
+    parser.add_argument("--readers", type=int, default=8, help="读线程数")
+    parser.add_argument("--writers", type=int, default=2, help="写线程数")
+    parser.add_argument("--articles", type=int, default=1000, help="初始文章数量")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = [
+        run_profile(tuned, args.seconds, args.readers, args.writers, args.articles)
+        for tuned in (False, True)
+    ]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'errors':>10}")
+    for r in results:
+        print(f"{r['profile']:<10}{r['reads_per_sec']:>12}{r['writes_per_sec']:>12}{r['errors']:>10}")
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# benchmarks/token_middleware.py
+
+"""
+令牌刷新中间件基准：对比改造前（BaseHTTPMiddleware + 解析 / 重新序列化响应体）与纯 ASGI 实现的单请求开销
+
+运行方式：
+    cd backend
+    python -m benchmarks.token_middleware --requests 20000
+
+直接以 ASGI 方式调用应用（不经过网络和服务器），测量中间件本身的开销：
+    - none：不挂载中间件（基线）
+    - legacy：改造前的 @app.middleware("http") 实现
+    - asgi：纯 ASGI 中间件，新令牌只放在响应头中（默认）
+    - asgi+body：纯 ASGI 中间件，同时流式拼接到响应体（TOKEN_REFRESH_BODY=1）
+每种中间件分别测量未刷新 / 刷新令牌两种请求，响应体为一篇约 2KB 正文的文章
+
+注意：当前 Starlette 版本中 call_next 返回的流式响应没有 media_type，legacy 的响应体注入分支实际不会执行，
+其开销主要来自 BaseHTTPMiddleware 本身
+"""
+from imports import (
+    argparse, asyncio, json, time,
+    FastAPI, Request, JSONResponse
+)
+from app.middleware import TokenRefreshMiddleware
+from benchmarks.fts_search import percentile
+
+
+
+ARTICLE = {
+    "id": 1, "title": "基准文章", "content": "正文内容" * 256, "owner_id": 1, "owner_name": "bench",
+    "created_at": "2025-01-01T00:00:00", "category_id": None, "like_count": 3, "collect_count": 1, "comment_count": 2,
+}
+
+
+
+async def legacy_token_refresh(request: Request, call_next):
+    """改造前的实现（原样保留用于对比）"""
+    response = await call_next(request)
+    if hasattr(request.state, "new_token"):
+        new_token = request.state.new_token
+        response.headers["X-New-Access-Token"] = new_token
+        if response.media_type == "application/json":
+            body = await response.body()
+            try:
+                response_data = json.loads(body)
+                response_data["new_token"] = new_token
+                return JSONResponse(
+                    content=response_data,
+                    status_code=response.status_code,
+                    headers=dict(response.headers),
+                    media_type=response.media_type
+                )
+            except json.JSONDecodeError:
+                pass
+    return response
+
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/article")
+    async def read_article(request: Request, refresh: bool = False):
+        if refresh:
+            request.state.new_token = "x" * 180  # 与真实 JWT 长度相当
+        return ARTICLE
+
+    if variant == "legacy":
+        app.middleware("http")(legacy_token_refresh)
+    elif variant == "asgi":
+        app.add_middleware(TokenRefreshMiddleware)
+    elif variant == "asgi+body":
+        app.add_middleware(TokenRefreshMiddleware, inject_body=True)
+    return app
+
+
+
+async def measure(app: FastAPI, refresh: bool, requests: int) -> list[float]:
+    """逐个发起请求，返回每个请求的耗时（微秒）"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/article", "raw_path": b"/article", "root_path": "",
+        "query_string": b"refresh=true" if refresh else b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+
+async def run(requests: int) -> list[dict]:
+    results = []
+    for variant in ("none", "legacy", "asgi", "asgi+body"):
+        app = build_app(variant)
+        for refresh in (False, True):
+            await measure(app, refresh, min(requests, 1000))  # 预热
+            samples = await measure(app, refresh, requests)
+            results.append({
+                "middleware": variant,
+                "refresh": refresh,
+                "mean_us": round(sum(samples) / len(samples), 1),
+                "p50_us": round(percentile(samples, 50), 1),
+                "p99_us": round(percentile(samples, 99), 1),
+            })
+    return results
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="令牌刷新中间件单请求开销基准（BaseHTTPMiddleware vs 纯 ASGI）")
+    parser.add_argument("--requests", type=int, default=20000, help="每种组合的请求数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests))
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'middleware':<12}{'refresh':>8}{'mean(us)':>11}{'p50(us)':>10}{'p99(us)':>10}")
+    for r in results:
+        print(f"{r['middleware']:<12}{str(r['refresh']):>8}{r['mean_us']:>11}{r['p50_us']:>10}{r['p99_us']:>10}")
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# benchmarks/traffic_replay.py
+
+"""
+录制流量回放：把 TRAFFIC_CAPTURE 录制的 NDJSON 请求流在新的应用实例上按原始节奏重放，按路由对比延迟
+
+运行方式：
+    cd backend
+    python -m benchmarks.traffic_replay traffic-*.ndjson --users 2000 --articles 10000 --out replay.json
+    python -m benchmarks.traffic_replay traffic-*.ndjson --db backup.db --speed 4 --out replay.json
+    python -m benchmarks.traffic_replay ... --out new.json --compare replay.json   # 与上一次回放对比
+
+流程：
+    1. 合并各 worker 的录制文件，按到达时间排序（--limit 只取前 N 条）
+    2. 在临时目录中准备数据库：--db 指定时以 SQLite 备份接口复制该数据库（如生产库的备份，文章 / 评论 ID 与录制时一致），
+       否则用 benchmarks.dataset 生成合成数据集（录制中超出数据集范围的 ID 会得到 404，数据集应不小于线上规模）
+    3. 在当前进程内运行应用的 lifespan，通过 httpx.ASGITransport 调用 ASGI 应用
+    4. 按到达时间间隔 / --speed 调度每个请求（开环：不等待前一个请求完成），并发形态与录制时一致；
+       --max-concurrency 可限制同时在途的请求数
+    5. 按路由模板汇总回放延迟，与录制时的服务端耗时并列输出，结果写入 --out
+
+身份与请求体：
+    - 每个匿名身份按首次出现的顺序映射到一个测试用户，直接签发令牌（不重放登录也能带上登录态）；
+      令牌无法解析的请求（"?"）使用无效令牌，与录制时一样得到 401
+    - 请求体中的 "<str:N>" 还原为 N 个字符，"<email:编号>" 还原为该编号映射到的测试用户邮箱；
+      合成数据集的密码已知，password 字段还原为该密码（登录可成功），--db 时登录请求得到 401
+    - 登出后该身份的下一个请求重新签发令牌；注销账号（DELETE /users/{user_id}）不回放，计入 skipped
+
+录制的耗时是服务端中间件测得的（不含网络），回放的耗时是进程内客户端测得的，两者口径接近；
+录制环境与回放机器的硬件不同，同一台机器上多次回放之间的对比（--compare）更可靠
+"""
+from imports import (
+    argparse, asyncio, json, logging, os, re, sys, sqlite3, tempfile, time, datetime, timedelta, timezone
+)
+import httpx
+from benchmarks.load_test import REPORT_ENV, summarize, git_revision, print_report
+# 注意：本模块顶层不能导入 app 下的模块（原因见 benchmarks/load_test.py），应用在 run 中切换目录后导入
+
+
+
+SKIPPED_ROUTES = {"DELETE /users/{user_id}"}  # 会注销映射到的测试用户
+LOGOUT_ROUTE = "POST /users/logout"
+INVALID_TOKEN = "invalid.replay.token"
+TOKEN_TTL = timedelta(days=1)  # 回放期间不触发自动刷新
+_PLACEHOLDER = re.compile(r"^<(str|email):([^>]*)>$")
+
+
+
+def load_capture(paths: list[str], limit: int = 0) -> list[dict]:
+    """读取并合并录制文件，按到达时间排序（跳过无法解析的行，如进程被杀时写了一半的最后一行）"""
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and "ts" in record and "m" in record and "p" in record:
+                    records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+
+def route_key(record: dict) -> str:
+    return f"{record['m']} {record.get('r', record['p'])}"
+
+
+
+class Identities:
+    """匿名身份 → 测试用户（按首次出现顺序轮流分配）及其令牌"""
+
+    def __init__(self, emails: list[str], password: str = None):
+        self.emails = emails
+        self.password = password  # 测试用户的密码（已知时还原请求体中的 password 字段）
+        self._assigned: dict[str, str] = {}
+        self._tokens: dict[str, str] = {}
+
+    def email(self, pseudonym: str) -> str:
+        if pseudonym not in self._assigned:
+            self._assigned[pseudonym] = self.emails[len(self._assigned) % len(self.emails)]
+        return self._assigned[pseudonym]
+
+    def token(self, pseudonym: str) -> str:
+        if pseudonym == "?":
+            return INVALID_TOKEN
+        if pseudonym not in self._tokens:
+            from app.auth import create_access_token
+            self._tokens[pseudonym] = create_access_token({"sub": self.email(pseudonym)}, TOKEN_TTL)
+        return self._tokens[pseudonym]
+
+    def forget_token(self, pseudonym: str):
+        """登出后令牌已进入黑名单，下次重新签发"""
+        self._tokens.pop(pseudonym, None)
+
+    def __len__(self):
+        return len(self._assigned)
+
+
+
+def rebuild_body(value, identities: Identities, key: str = ""):
+    """把匿名化的请求体还原为可发送的 JSON（结构与字符串长度与原请求一致）"""
+    if isinstance(value, dict):
+        return {k: rebuild_body(v, identities, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [rebuild_body(item, identities, key) for item in value]
+    if isinstance(value, str):
+        match = _PLACEHOLDER.match(value)
+        if match is None:
+            return value
+        kind, arg = match.groups()
+        if kind == "email":
+            return identities.email(arg)
+        if key == "password" and identities.password is not None:
+            return identities.password
+        return "x" * int(arg) if arg.isdigit() else ""
+    return value
+
+
+
+async def replay(client: httpx.AsyncClient, records: list[dict], identities: Identities, speed: float,
+                 max_concurrency: int, samples: dict) -> dict:
+    """按录制节奏调度所有请求，返回调度统计（峰值并发、最大调度延迟、跳过数）"""
+    limiter = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    state = {"in_flight": 0, "peak": 0, "skipped": 0, "max_lag_ms": 0.0}
+
+    async def send_one(record: dict):
+        route = route_key(record)
+        headers = {}
+        if "u" in record:
+            headers["Authorization"] = f"Bearer {identities.token(record['u'])}"
+        url = f"{record['p']}?{record['q']}" if record.get("q") else record["p"]
+        if "b" in record:
+            request = client.build_request(record["m"], url, headers=headers, json=rebuild_body(record["b"], identities))
+        else:
+            request = client.build_request(record["m"], url, headers=headers, content=b"x" * record.get("bl", 0) or None)
+
+        if limiter is not None:
+            await limiter.acquire()
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        started = time.perf_counter()
+        try:
+            status = (await client.send(request)).status_code
+        except Exception as e:
+            status = f"exception:{type(e).__name__}"
+        finally:
+            state["in_flight"] -= 1
+            if limiter is not None:
+                limiter.release()
+        entry = samples.setdefault(route, {"latencies": [], "statuses": {}, "mismatched": 0})
+        entry["latencies"].append((time.perf_counter() - started) * 1000)
+        entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+        if str(status) != str(record.get("s")):
+            entry["mismatched"] += 1
+        if route == LOGOUT_ROUTE and "u" in record:
+            identities.forget_token(record["u"])
+
+    tasks = []
+    origin, started = records[0]["ts"], time.perf_counter()
+    for record in records:
+        if route_key(record) in SKIPPED_ROUTES:
+            state["skipped"] += 1
+            continue
+        delay = started + (record["ts"] - origin) / speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            state["max_lag_ms"] = max(state["max_lag_ms"], -delay * 1000)
+        tasks.append(asyncio.create_task(send_one(record)))
+    await asyncio.gather(*tasks)
+    return state
+
+
+
+def summarize_capture(records: list[dict]) -> dict:
+    """录制时各路由的服务端耗时汇总（与回放结果同样的结构）"""
+    span = max(records[-1]["ts"] - records[0]["ts"], 0.001)
+    routes = {}
+    for record in records:
+        entry = routes.setdefault(route_key(record), {"latencies": [], "statuses": {}})
+        entry["latencies"].append(record.get("ms", 0.0))
+        status = str(record.get("s"))
+        entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+    all_statuses = {}
+    for entry in routes.values():
+        for status, count in entry["statuses"].items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    return {
+        "seconds": round(span, 2),
+        "peak_concurrency": max(record.get("c", 0) for record in records) + 1,
+        "total": summarize([record.get("ms", 0.0) for record in records], all_statuses, span),
+        "routes": {route: summarize(entry["latencies"], entry["statuses"], span) for route, entry in sorted(routes.items())},
+    }
+
+
+
+def _copy_database(source: str, target: str):
+    """以 SQLite 备份接口复制数据库（源库正在被写入时也能得到一致的快照，包括 WAL 中已提交的数据）"""
+    src, dst = sqlite3.connect(f"file:{source}?mode=ro", uri=True), sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+
+async def run(args, records: list[dict]) -> dict:
+    # 应用使用相对路径 ./sql_app.db：先切换到临时目录，再导入应用
+    workdir = tempfile.mkdtemp(prefix="bench_replay_")
+    os.chdir(workdir)
+    if args.db:
+        _copy_database(args.db, os.path.join(workdir, "sql_app.db"))
+    import main
+    from app.database import engine
+    from app.migrations import upgrade_schema
+
+    upgrade_schema(engine)
+    if not os.path.exists(os.path.join(workdir, "sql_app.db")):
+        raise SystemExit("应用在切换目录前已被导入，数据库不在临时目录中，已停止以免写入开发数据库")
+    if args.db:
+        with engine.connect() as conn:
+            emails = [row[0] for row in conn.exec_driver_sql("SELECT email FROM users WHERE is_active = 1 ORDER BY id")]
+        password = None
+        dataset = {"source": os.path.basename(args.db), "users": len(emails)}
+    else:
+        from benchmarks.dataset import generate_dataset
+        generated = generate_dataset(engine, args.users, args.articles, args.seed)
+        emails, password = generated["emails"], generated["password"]
+        dataset = {"rows": generated["rows"], "seconds": generated["seconds"]}
+    if not emails:
+        raise SystemExit("数据库中没有可用的用户，无法映射录制中的用户身份")
+    print(f"数据库已就绪：{dataset}", file=sys.stderr)
+    logging.getLogger("blog_api").setLevel(logging.CRITICAL)  # 录制中预期内的 4xx 不逐条打印
+
+    identities = Identities(emails, password)
+    samples = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=60) as client:
+            started = time.perf_counter()
+            schedule = await replay(client, records, identities, args.speed, args.max_concurrency, samples)
+            elapsed = time.perf_counter() - started
+
+    all_latencies = [latency for entry in samples.values() for latency in entry["latencies"]]
+    all_statuses = {}
+    for entry in samples.values():
+        for status, count in entry["statuses"].items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    captured = summarize_capture(records)
+    return {
+        "meta": {
+            **git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "env": {name: os.environ[name] for name in REPORT_ENV if name in os.environ},
+            "dataset": dataset,
+            "records": len(records),
+            "identities": len(identities),
+            "skipped": schedule["skipped"],
+            "peak_concurrency": schedule["peak"],
+            "max_schedule_lag_ms": round(schedule["max_lag_ms"], 2),
+            "seconds": round(elapsed, 2),
+        },
+        "total": summarize(all_latencies, all_statuses, elapsed),
+        "routes": {
+            route: {**summarize(entry["latencies"], entry["statuses"], elapsed), "status_mismatched": entry["mismatched"]}
+            for route, entry in sorted(samples.items())
+        },
+        "captured": captured,
+    }
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在新的应用实例上回放录制的流量，按路由对比录制与回放的延迟")
+    parser.add_argument("files", nargs="+", help="录制文件（TRAFFIC_CAPTURE_FILE，多个 worker 的文件一并传入）")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速（2 表示请求间隔缩短一半）")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="同时在途的请求数上限，0 表示不限制（保持录制时的并发形态）")
+    parser.add_argument("--limit", type=int, default=0, help="只回放前 N 条记录，0 表示全部")
+    parser.add_argument("--db", help="回放使用的数据库（复制后使用，不修改原文件）；不指定时生成合成数据集")
+    parser.add_argument("--users", type=int, default=2000, help="合成数据集用户数")
+    parser.add_argument("--articles", type=int, default=10000, help="合成数据集文章数")
+    parser.add_argument("--seed", type=int, default=42, help="合成数据集随机种子")
+    parser.add_argument("--out", default="traffic_replay.json", help="结果 JSON 文件路径")
+    parser.add_argument("--compare", help="对比的基线回放结果 JSON 文件")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        raise SystemExit("--speed 必须大于 0")
+
+    # 文件路径在切换到临时目录前解析
+    args.files = [os.path.abspath(path) for path in args.files]
+    args.out = os.path.abspath(args.out)
+    if args.db:
+        args.db = os.path.abspath(args.db)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    records = load_capture(args.files, args.limit)
+    if not records:
+        raise SystemExit("录制文件中没有可回放的记录")
+    report = asyncio.run(run(args, records))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    meta = report["meta"]
+    print(
+        f"回放 {meta['records']} 条记录（跳过 {meta['skipped']}），{meta['identities']} 个用户身份，"
+        f"耗时 {meta['seconds']}s（录制时长 {report['captured']['seconds']}s，倍速 {args.speed}）；"
+        f"峰值并发 {meta['peak_concurrency']}（录制 {report['captured']['peak_concurrency']}），"
+        f"最大调度延迟 {meta['max_schedule_lag_ms']}ms\n"
+    )
+    print("回放 vs 录制（括号内为相对录制时的变化）：")
+    print_report(report, report["captured"])
+    mismatched = {route: r["status_mismatched"] for route, r in report["routes"].items() if r["status_mismatched"]}
+    if mismatched:
+        print(f"\n状态码与录制时不一致的请求数：{mismatched}")
+    if baseline is not None:
+        print(f"\n回放 vs 基线 {args.compare}：")
+        print_report(report, baseline)
+    print(f"\n结果已写入 {args.out}")
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/trigram_search.py
+
+"""
+三元组索引基准：测量用户名容错查找在不同数据量下的构建耗时与查询延迟
+
+运行方式：
+    cd backend
+    python -m benchmarks.trigram_search --sizes 10000 100000 --queries 500
+
+    - 用户名由随机小写字母组成（5~12 位），查询词为随机用户名改错一个字符（替换 / 删除 / 相邻交换）
+    - 命中率：正确的用户名出现在第一页（20 条）结果中的比例
+"""
+from imports import argparse, json, random, string, time
+from app.trigram import TrigramIndex
+from benchmarks.fts_search import percentile, PAGE_SIZE
+
+
+
+def make_typo(rng: random.Random, name: str) -> str:
+    """对用户名做一处随机改动：替换、删除或交换相邻字符"""
+    pos = rng.randrange(len(name) - 1)
+    kind = rng.choice(("replace", "delete", "swap"))
+    if kind == "replace":
+        return name[:pos] + rng.choice(string.ascii_lowercase) + name[pos + 1:]
+    if kind == "delete":
+        return name[:pos] + name[pos + 1:]
+    return name[:pos] + name[pos + 1] + name[pos] + name[pos + 2:]
+
+
+
+def run_size(size: int, query_count: int) -> dict:
+    rng = random.Random(size)
+    names = [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+        for _ in range(size)
+    ]
+    index = TrigramIndex("bench")
+    started = time.perf_counter()
+    index.rebuild(enumerate(names))
+    build_seconds = time.perf_counter() - started
+
+    samples, found = [], 0
+    for key in rng.sample(range(size), query_count):
+        query = make_typo(rng, names[key])
+        started = time.perf_counter()
+        matches = index.search(query)
+        samples.append((time.perf_counter() - started) * 1000)
+        found += any(match[0] == key for match in matches[:PAGE_SIZE])
+
+    return {
+        "entries": size,
+        "hit_rate": round(found / query_count, 4),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "build_seconds": round(build_seconds, 2),
+    }
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="三元组索引构建耗时与容错查询延迟基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="索引条目数（可多个）")
+    parser.add_argument("--queries", type=int, default=500, help="查询次数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    results = [run_size(size, args.queries) for size in args.sizes]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'entries':>10}{'hit_rate':>10}{'p50(ms)':>12}{'p95(ms)':>12}{'build(s)':>10}")
+    for r in results:
+        print(f"{r['entries']:>10}{r['hit_rate']:>10}{r['p50_ms']:>12}{r['p95_ms']:>12}{r['build_seconds']:>10}")
+
+
+
+if __name__ == "__main__":
+    main()
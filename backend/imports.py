@@ -8,15 +8,42 @@ import re
 import os
 import sys
 import time
+import math
 import json
+import base64
 import signal
+import random
+import string
 import asyncio
 import logging
+import logging.handlers
+import argparse
+import tempfile
+import threading
+import queue
+import bisect
+import hmac
+import hashlib
+import html
+import secrets
+import cProfile
+import pstats
+import socket
+import subprocess
+import sqlite3
+from http.client import HTTPConnection
+from email.utils import format_datetime, parsedate_to_datetime
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
+from collections import OrderedDict, Counter
+from contextvars import ContextVar, copy_context
+from functools import lru_cache
 from typing import (
+    Any,
     Optional,
     Union
 )
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 from datetime import (
     datetime, 
     timedelta, 
@@ -32,10 +59,14 @@ from fastapi import (
     APIRouter,
     Depends,
     status,
-    Response
+    Response,
+    Query
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
+from anyio import to_thread
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from fastapi.security import (
     HTTPBearer, 
     HTTPAuthorizationCredentials
@@ -48,19 +79,42 @@ from sqlalchemy import (
     Column,
     Integer,
     String,
+    Float,
     DateTime,
     Boolean,
     Text,
     ForeignKey,
     UniqueConstraint, 
     desc,
-    func
+    func,
+    event,
+    tuple_,
+    Index,
+    select,
+    exists,
+    update,
+    insert,
+    inspect,
+    text,
+    literal_column
 )
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import (
     sessionmaker, 
     Session, 
-    relationship
+    relationship,
+    selectinload,
+    joinedload,
+    contains_eager,
+    raiseload,
+    load_only
+)
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    async_sessionmaker,
+    AsyncSession
 )
 
 
@@ -69,10 +123,15 @@ from pydantic import (
     BaseModel, 
     EmailStr, 
     Field, 
-    field_validator
+    field_validator,
+    TypeAdapter
 )
 
 
+# ==================== JSON 序列化 ====================
+import orjson
+
+
 # ==================== 认证相关 ====================
 import uuid
 from passlib.context import CryptContext
@@ -83,4 +142,5 @@ from jose import (
 
 
 # ==================== uvicorn 相关 ====================
-import uvicorn
\ No newline at end of file
+import uvicorn
+
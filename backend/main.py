@@ -1,10 +1,21 @@
 # main.py
 
 from imports import (
-    FastAPI, Request, HTTPException, JSONResponse, os, sys, signal, asyncio,
-    CORSMiddleware, asynccontextmanager, logging, json, uvicorn
+    FastAPI, Request, HTTPException, ORJSONResponse, os, sys, signal, asyncio,
+    CORSMiddleware, asynccontextmanager, logging, uvicorn
+)
+from app.routers import users, articles, comments, categories, home, search, messages, interactions, monitor, metrics
+from app.pagination import NEXT_CURSOR_HEADER
+from app.middleware import (
+    TokenRefreshMiddleware, QueryStatsMiddleware, MetricsMiddleware, ProfilingMiddleware, TrafficCaptureMiddleware,
+    NEW_TOKEN_HEADER
+)
+from app.query_stats import QUERY_STATS_HEADER
+from app.profiling import PROFILE_ID_HEADER
+from app.config import (
+    TOKEN_REFRESH_BODY, QUERY_STATS_ENABLED, QUERY_STATS_HEADER_ENABLED, METRICS_ENABLED,
+    PROFILE_SECRET, PROFILE_SAMPLE_RATE, TRAFFIC_CAPTURE_ENABLED
 )
-from app.routers import users, articles, comments, categories, home, search, messages, interactions
 
 
 
@@ -22,13 +33,57 @@ logger = logging.getLogger("blog_api")      # 定义日志器名称
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时：创建数据库表
-    from app.database import engine, Base
-    Base.metadata.create_all(bind=engine)
+    from app.database import engine, read_engine, async_read_engine, DATABASE_MODE, describe_sqlite_profile
+    from app.migrations import upgrade_schema
+    added_columns = upgrade_schema(engine)
     print("数据库表创建成功（通过 lifespan）")
+    if added_columns:
+        print(f"数据库表结构已升级，新增列：{added_columns}")
+    print(f"数据库运行模式：{DATABASE_MODE}")
+    print(f"SQLite 引擎配置：{describe_sqlite_profile(engine)}")
+    # 构建用户名 / 文章作者名 / 文章标题三元组索引（之后由写事务增量维护）
+    from app.database import SessionLocal
+    from app.trigram import build_trigram_indexes, username_index, owner_index, title_index
+    with SessionLocal() as db:
+        build_trigram_indexes(db)
+    print(f"三元组索引已构建：用户名 {len(username_index)} 条，文章作者 {len(owner_index)} 条，文章标题 {len(title_index)} 条")
+    # 启动单写线程（所有写事务串行执行并合并提交）
+    from app.config import WRITER_QUEUE_ENABLED
+    from app.writer import write_queue, writer_engine
+    if WRITER_QUEUE_ENABLED:
+        write_queue.start()
+    print(f"单写线程：{'已启动' if write_queue.running else '未启用'}")
+    # 加载令牌黑名单到内存，并启动增量同步 / 过期清理后台任务
+    from app.token_blacklist import load_token_blacklist, start_blacklist_tasks
+    print(f"令牌黑名单已加载：{load_token_blacklist()} 条")
+    background_tasks = start_blacklist_tasks()
+    # 启动跨 worker 缓存失效事件的轮询线程与清理任务
+    from app.invalidation import invalidation_bus, start_invalidation_tasks
+    background_tasks += start_invalidation_tasks()
+    print(f"跨 worker 缓存失效轮询：{'已启动' if invalidation_bus.running else '未启用'}")
+    # 启动密码哈希进程池（登录 / 注册的 pbkdf2 计算不占用线程池和 GIL）
+    from app.hashing import hash_pool
+    hash_pool.start()
+    print(f"密码哈希：{f'进程池 {hash_pool.workers} 个进程' if hash_pool.running else '线程池'}")
     yield  # 应用运行期间
     # 关闭时：清理资源（根据实际需求添加）
     print("应用开始关闭，执行清理操作...")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    hash_pool.stop()
+    invalidation_bus.stop()
+    write_queue.stop()  # 先处理完已入队的写事务
+    from app.slow_queries import slow_query_log
+    slow_query_log.close()  # 写完已入队的慢查询日志
+    from app.traffic_capture import traffic_recorder
+    traffic_recorder.close()  # 写完已入队的流量记录
+    writer_engine.dispose()
     engine.dispose()  # 关闭连接池，释放资源
+    if read_engine is not None:
+        read_engine.dispose()
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
     print("清理完成，应用已关闭")
 
 
@@ -37,7 +92,8 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="Blog API",
     version="1.0.0",
-    lifespan=lifespan  # 绑定 lifespan
+    lifespan=lifespan,  # 绑定 lifespan
+    default_response_class=ORJSONResponse  # 由 FastAPI 序列化的响应使用 orjson 编码（热点接口见 app/serialization.py）
 )
 
 
@@ -49,43 +105,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 允许前端读取下一页游标、自动刷新的新令牌、SQL 统计与剖析编号，以及条件请求的校验器
+    expose_headers=[NEXT_CURSOR_HEADER, NEW_TOKEN_HEADER, QUERY_STATS_HEADER, PROFILE_ID_HEADER, "ETag", "Last-Modified"],
 )
 
 
 
 # -------------------------- 令牌刷新中间件 --------------------------
-@app.middleware("http")
-async def token_refresh_middleware(request: Request, call_next):
-    """令牌刷新中间件：同时在响应头和响应体中返回新令牌"""
-    response = await call_next(request)
-    
-    # 检查是否有新令牌需要返回
-    if hasattr(request.state, "new_token"):
-        new_token = request.state.new_token
-        # 1. 添加到响应头（保持原有逻辑）
-        response.headers["X-New-Access-Token"] = new_token
-        
-        # 2. 添加到响应体（仅对JSON响应生效）
-        if response.media_type == "application/json":
-            # 读取原始响应体内容
-            body = await response.body()
-            try:
-                # 解析为JSON字典
-                response_data = json.loads(body)
-                # 添加新令牌字段（与头字段保持一致，便于前端识别）
-                response_data["new_token"] = new_token
-                # 构建新的JSON响应（保留原始状态码、头信息）
-                return JSONResponse(
-                    content=response_data,
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    media_type=response.media_type
-                )
-            except json.JSONDecodeError:
-                # 若响应体不是有效JSON，不修改（避免破坏响应）
-                pass
-    
-    return response
+# 纯 ASGI 中间件：新令牌总是放在响应头中，TOKEN_REFRESH_BODY 开启时再流式拼接到 JSON 响应体
+app.add_middleware(TokenRefreshMiddleware, inject_body=TOKEN_REFRESH_BODY)
+
+
+
+# -------------------------- 请求剖析中间件 --------------------------
+# 带签名调试头 X-Debug-Profile 或按 PROFILE_SAMPLE_RATE 选中的请求在 cProfile 下执行，结果见 /monitor/profiles
+if PROFILE_SECRET or PROFILE_SAMPLE_RATE > 0:
+    app.add_middleware(ProfilingMiddleware)
+
+
+
+# -------------------------- 运行指标中间件 --------------------------
+# 按路由记录请求数 / 状态码 / 延迟直方图 / 数据库耗时，由 /metrics 导出（Prometheus 文本格式）
+# 先于 SQL 统计中间件挂载（位于其内层），以便读取当前请求的 SQL 统计
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+
+
+# -------------------------- SQL 统计中间件 --------------------------
+# 统计每个请求的 SQL 条数 / 耗时并检测疑似 N+1（汇总见 /monitor/queries），QUERY_STATS_HEADER 开启时返回 X-Query-Stats
+if QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware, header=QUERY_STATS_HEADER_ENABLED)
+
+
+
+# -------------------------- 流量录制中间件 --------------------------
+# TRAFFIC_CAPTURE 开启时把请求流量（匿名化）写入 NDJSON 文件，供 benchmarks.traffic_replay 离线回放；
+# 最后挂载（位于最外层），记录的耗时包含其它中间件
+if TRAFFIC_CAPTURE_ENABLED:
+    app.add_middleware(TrafficCaptureMiddleware)
 
 
 
@@ -96,7 +154,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     logger.error(
         f"HTTPException | 请求路径：{request.url.path} | 错误信息：{str(exc)}",
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "code": exc.status_code,    # 状态码
@@ -115,7 +173,7 @@ async def general_exception_handler(request: Request, exc: Exception):
         exc_info=True  # 打印完整堆栈信息
     )
     # 2. 返回用户友好的响应
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "code": 500,
@@ -136,6 +194,8 @@ app.include_router(categories.router, prefix="/categories", tags=["categories"])
 app.include_router(search.router, prefix="/search", tags=["search"])
 app.include_router(messages.router, prefix="/messages", tags=["messages"])
 app.include_router(interactions.router, prefix="/interactions", tags=["interactions"])
+app.include_router(monitor.router, prefix="/monitor", tags=["monitor"])
+app.include_router(metrics.router, tags=["monitor"])
 
 # 根路由
 @app.get("/")
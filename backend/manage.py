@@ -0,0 +1,103 @@
+# manage.py
+
+"""
+项目管理命令（在 backend 目录下运行）：
+    python manage.py reconcile-counters        # 从来源表重建文章的点赞/收藏/评论计数
+    python manage.py rebuild-search-index      # 从 articles 表全量重建全文索引
+    python manage.py purge-token-blacklist     # 分批删除已过期的令牌黑名单记录
+    python manage.py profile-token             # 生成请求剖析调试头 X-Debug-Profile 的值
+"""
+from imports import argparse
+from app.database import SessionLocal, engine
+from app.migrations import upgrade_schema
+from app.config import TOKEN_BLACKLIST_PURGE_BATCH
+
+
+
+def reconcile_counters(args):
+    """从 likes / collects / comments 表重建文章冗余计数"""
+    from app.counters import reconcile_article_counters
+
+    db = SessionLocal()
+    try:
+        fixed = reconcile_article_counters(db, args.article_ids or None)
+        db.commit()
+        print(f"计数校准完成：修正了 {fixed} 篇文章的计数")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+
+def rebuild_search_index(args):
+    """全量回填 FTS5 全文索引（索引损坏或批量导入文章后使用）"""
+    from app.fts import rebuild_fts_index
+
+    with engine.begin() as conn:
+        indexed = rebuild_fts_index(conn)
+    print(f"全文索引重建完成：已索引 {indexed} 篇文章")
+
+
+
+def purge_token_blacklist(args):
+    """分批删除已过期的令牌黑名单记录（服务运行时由后台任务定期执行，此命令用于手动清理）"""
+    from app.token_blacklist import _purge_expired_tokens
+
+    removed = 0
+    while True:
+        db = SessionLocal()
+        try:
+            batch_removed = _purge_expired_tokens(db, args.batch_size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        removed += batch_removed
+        if batch_removed < args.batch_size:
+            break
+    print(f"令牌黑名单清理完成：删除 {removed} 条过期记录")
+
+
+
+def profile_token(args):
+    """生成请求剖析调试头的值（需与服务使用相同的 PROFILE_SECRET）"""
+    from app.profiling import PROFILE_HEADER, sign_profile_token
+    from app.config import PROFILE_SECRET
+
+    if not PROFILE_SECRET:
+        raise SystemExit("未设置 PROFILE_SECRET，服务不接受剖析调试头")
+    print(f"{PROFILE_HEADER}: {sign_profile_token(args.minutes * 60)}")
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blog API 管理命令")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = subparsers.add_parser("reconcile-counters", help="从来源表重建文章的点赞/收藏/评论计数")
+    reconcile.add_argument("article_ids", nargs="*", type=int, help="仅校准指定文章（默认全部）")
+    reconcile.set_defaults(handler=reconcile_counters)
+
+    rebuild = subparsers.add_parser("rebuild-search-index", help="从 articles 表全量重建全文索引")
+    rebuild.set_defaults(handler=rebuild_search_index)
+
+    purge = subparsers.add_parser("purge-token-blacklist", help="分批删除已过期的令牌黑名单记录")
+    purge.add_argument("--batch-size", type=int, default=TOKEN_BLACKLIST_PURGE_BATCH, help="每批删除的记录数")
+    purge.set_defaults(handler=purge_token_blacklist)
+
+    token = subparsers.add_parser("profile-token", help="生成请求剖析调试头 X-Debug-Profile 的值")
+    token.add_argument("--minutes", type=int, default=10, help="有效期（分钟）")
+    token.set_defaults(handler=profile_token)
+
+    args = parser.parse_args()
+    upgrade_schema(engine)  # 确保表结构为最新
+    args.handler(args)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 // @store/article.js (If you see this message, that means this file has been checked and can be put into production environment)
 
 import { defineStore } from 'pinia'
-import request from '@/utils/request'
+import request, { fetchAllPages } from '@/utils/request'
 import { useUserStore } from '@/store/user'
 
 export const useArticleStore = defineStore('article', {
@@ -47,10 +47,10 @@ export const useArticleStore = defineStore('article', {
       if (!userStore.isLoggedIn) return
 
       try {
-        const likesRes = await request.get('/interactions/my/likes')
+        const likesRes = await fetchAllPages('/interactions/my/likes')
         this.myLikedArticleIds = likesRes.map(item => Number(item.id))
         
-        const collectsRes = await request.get('/interactions/my/collects')
+        const collectsRes = await fetchAllPages('/interactions/my/collects')
         this.myCollectedArticleIds = collectsRes.map(item => Number(item.id))
       } catch (err) {
         console.error('获取我的互动列表失败: ', err)
@@ -1,7 +1,7 @@
 // @/store/message.js (If you see this message, that means this file has been checked and can be put into production environment)
 
 import { defineStore } from 'pinia'
-import request from '@/utils/request'
+import request, { fetchAllPages } from '@/utils/request'
 
 export const useMessageStore = defineStore('message', {
   state: () => ({
@@ -41,7 +41,7 @@ export const useMessageStore = defineStore('message', {
     async getReceiveEmail() {
       try {
         this.loading = true
-        const res = await request.get('/messages/received')
+        const res = await fetchAllPages('/messages/received')
         this.receiveList = res || []
         this.showMessage('获取接收邮件成功')
       } catch (err) {
@@ -62,7 +62,7 @@ export const useMessageStore = defineStore('message', {
     async getSentEmail() {
       try {
         this.loading = true
-        const res = await request.get('/messages/sent')
+        const res = await fetchAllPages('/messages/sent')
         this.sentList = res || []
         this.showMessage('获取已发送邮件成功')
       } catch (err) {
@@ -1,7 +1,7 @@
 // @store/userInfo.js (If you see this message, that means this file has been checked and can be put into production environment)
 
 import { defineStore } from 'pinia'
-import request from '@/utils/request'
+import request, { fetchAllPages } from '@/utils/request'
 import { useUserStore } from '@/store/user'
 
 /**
@@ -155,7 +155,7 @@ export const useUserInfoStore = defineStore('userInfo', {
       this.clearError()
       try {
         // 1. 处理点赞数据
-        const likesRes = await request.get('/interactions/my/likes')
+        const likesRes = await fetchAllPages('/interactions/my/likes')
         this.likeArticles = likesRes.map(item => ({ // 存储基础展示信息
           id: Number(item.id),
           title: item.title || '无标题',
@@ -165,7 +165,7 @@ export const useUserInfoStore = defineStore('userInfo', {
         this.my_likes = this.likeArticles.map(art => art.id) // 仅存ID
 
         // 2. 处理收藏数据
-        const collectsRes = await request.get('/interactions/my/collects')
+        const collectsRes = await fetchAllPages('/interactions/my/collects')
         this.collectArticles = collectsRes.map(item => ({
           id: Number(item.id),
           title: item.title || '无标题',
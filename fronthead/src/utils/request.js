@@ -57,9 +57,9 @@ request.interceptors.response.use(
   /**
    * 响应成功的拦截处理逻辑
    * @param {Object} response - axios 完整响应对象（包含data、status、headers等）
-   * @returns {Object} 后端返回的业务数据（直接返回response.data，简化业务层调用）
+   * @returns {Object} 后端返回的业务数据（直接返回response.data，简化业务层调用）；请求配置带 fullResponse 时返回完整响应对象（需要读取响应头）
    */
-  (response) => response.data,
+  (response) => (response.config.fullResponse ? response : response.data),
 
   /**
    * 响应失败的拦截处理逻辑（适配双Token机制）
@@ -133,6 +133,30 @@ request.interceptors.response.use(
   }
 )
 
+// 列表接口每页条数（后端上限为 100）
+const PAGE_LIMIT = 100
+
+/**
+ * 按游标逐页获取列表接口的全部数据
+ * @param {string} url - 列表接口地址（如 /messages/received）
+ * @param {Object} [params] - 其他查询参数
+ * @returns {Promise<Array>} 所有页的数据按顺序拼接后的数组
+ * @description 列表接口每次只返回一页，下一页游标在响应头 X-Next-Cursor 中；没有该响应头表示已是最后一页
+ */
+export const fetchAllPages = async (url, params = {}) => {
+  const items = []
+  let cursor = null
+  do {
+    const response = await request.get(url, {
+      params: cursor ? { ...params, limit: PAGE_LIMIT, cursor } : { ...params, limit: PAGE_LIMIT },
+      fullResponse: true
+    })
+    items.push(...(response.data || []))
+    cursor = response.headers['x-next-cursor'] || null
+  } while (cursor)
+  return items
+}
+
 // 导出 axios 实例
 export default request
 